@@ -1,3 +1,4 @@
+import io
 import os
 import re
 import json
@@ -5,23 +6,48 @@ import time
 import logging
 from pathlib import Path
 
-import ollama
 from docling_core.types.doc import ImageRefMode, PictureItem
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions, EasyOcrOptions
-from docling.document_converter import DocumentConverter, PdfFormatOption
+from docling.datamodel.base_models import DocumentStream
 
-from sentence_transformers import SentenceTransformer, util
-from rapidfuzz import fuzz
-import numpy as np
 import fitz
 
+from pipeline_cache import pipeline_cache_key, sha256_bytes, load_cached_result, store_result
+from stage_graph import StageGraph
+from converter_pool import ConverterOptions, convert, converter_stats
+from parallel_convert import convert_pdf_parallel
+from boilerplate import strip_boilerplate_file, tokens_removed_per_section
+from image_export import ImageExportOptions, ImageWriter, numbered_images
+from image_describer import DEDUPE_IMAGES, TRIAGE_IMAGES, VISION_CONCURRENCY, describe_image_folder
+from section_parser import read_sections
+from section_scoring import clean_heading, score_sections
+from onnx_embedder import EMBEDDING_BACKEND, embedding_model_id, load_embedding_model
+from schema_registry import DEFAULT_DOC_TYPE, TargetSchema, get_schema
+from section_assignment import ASSIGNMENT_MODE, assign_sections
+from docling_sections import (DOCUMENT_FILE, descriptions_by_number, document_payload, document_sections,
+                              load_document_parts, write_document_parts)
+
 
 # ===============================
 # CONFIG
 # ===============================
 MODEL_NAME = "gemma3:4b"
+OLLAMA_HOST = "http://localhost:11434"
 IMAGE_RESOLUTION_SCALE = 2.0
+CROP_TOP_PERCENT = 0.08
+CROP_BOTTOM_PERCENT = 0.1
+# > 1 converts page ranges in a process pool (see parallel_convert.py)
+DOCLING_WORKERS = int(os.environ.get("DOCLING_WORKERS", "1"))
+# OCR only the pages without a usable text layer (see ocr_routing.py)
+OCR_ROUTING = os.environ.get("OCR_ROUTING", "1") == "1"
+IMAGE_PROMPT = "Describe this image in 50-150 words with meaningful detail."
+# write cropped_<name>.pdf next to the run artifacts (debugging only; cropping happens in memory)
+SAVE_CROPPED_PDF = os.environ.get("SAVE_CROPPED_PDF", "0") == "1"
+# drop lines repeated across many pages (banners, document-control blocks) from the markdown
+STRIP_BOILERPLATE = os.environ.get("STRIP_BOILERPLATE", "1") == "1"
+# format / max size / writer threads of the extracted pictures (see image_export.py)
+IMAGE_EXPORT = ImageExportOptions.from_env()
+# build sections from the saved DoclingDocument instead of re-parsing the markdown headings
+SECTIONS_FROM_DOCUMENT = os.environ.get("SECTIONS_FROM_DOCUMENT", "1") == "1"
 
 SENTENCE_TRANSFORMER_MODEL_PATH = "/home/aayush/Downloads/model"
 
@@ -34,6 +60,24 @@ logging.basicConfig(
 # =========
 # pdf pre processing
 
+def crop_pdf_bytes(pdf_bytes: bytes, top_percent=0.08, bottom_percent=0.1) -> bytes:
+    """Crop headers/footers of an in-memory PDF and return the cropped PDF bytes."""
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        for page in doc:
+            rect = page.rect
+            new_rect = fitz.Rect(
+                rect.x0,
+                rect.y0 + rect.height * top_percent,
+                rect.x1,
+                rect.y1 - rect.height * bottom_percent
+            )
+            page.set_cropbox(new_rect)
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
 def crop_pdf_headers_footers(input_pdf_path, output_dir, top_percent=0.08, bottom_percent=0.1):
     if output_dir is None:
         output_dir = os.path.dirname(input_pdf_path)
@@ -42,91 +86,84 @@ def crop_pdf_headers_footers(input_pdf_path, output_dir, top_percent=0.08, botto
     input_filename = os.path.basename(input_pdf_path)
     output_pdf_path = os.path.join(output_dir, f"cropped_{input_filename}")
 
-    doc = fitz.open(input_pdf_path)
-
-    for page in doc:
-        rect = page.rect
-        new_rect = fitz.Rect(
-            rect.x0,
-            rect.y0 + rect.height * top_percent,
-            rect.x1,
-            rect.y1 - rect.height * bottom_percent
-        )
-        page.set_cropbox(new_rect)
-
-    doc.save(output_pdf_path)
-    doc.close()
+    with open(input_pdf_path, "rb") as f:
+        cropped = crop_pdf_bytes(f.read(), top_percent, bottom_percent)
+    with open(output_pdf_path, "wb") as f:
+        f.write(cropped)
 
     return output_pdf_path
 # ===============================
 # PDF TO MARKDOWN & IMAGES EXTRACTION
 # ===============================
-def md_extract(pdf_path: str, output_dir: Path) -> Path:
+def md_extract(pdf_path, output_dir: Path, workers: int = DOCLING_WORKERS, ocr_routing: bool = OCR_ROUTING,
+               name: str | None = None, image_options: ImageExportOptions = IMAGE_EXPORT) -> Path:
+    """Convert a PDF to markdown + numbered images.
+
+    `pdf_path` is either a path or the PDF bytes; for bytes, `name` gives the document stem
+    used for the markdown file name.
+    """
     start = time.time()
-    pdf_path = Path(pdf_path)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    if not pdf_path.exists():
-        raise FileNotFoundError(f"PDF not found: {pdf_path}")
-
-    pipeline_options = PdfPipelineOptions(
-        images_scale=IMAGE_RESOLUTION_SCALE,
-        generate_page_images=True,
-        generate_picture_images=True,
-        ocr_options=EasyOcrOptions()
-    )
-    converter = DocumentConverter(
-        format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
-    )
-
-    conv_res = converter.convert(pdf_path)
+    if isinstance(pdf_path, (bytes, bytearray)):
+        name = name or "document"
+        source = DocumentStream(name=f"{name}.pdf", stream=io.BytesIO(pdf_path))
+    else:
+        pdf_path = Path(pdf_path)
+        if not pdf_path.exists():
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        source = pdf_path
+
+    if workers > 1 or ocr_routing:
+        return convert_pdf_parallel(pdf_path, output_dir, workers=workers, ocr_routing=ocr_routing,
+                                    options=ConverterOptions(images_scale=IMAGE_RESOLUTION_SCALE), name=name,
+                                    image_options=image_options)
+
+    # converters are pooled per process, so the docling models are only loaded once
+    conv_res = convert(source, ConverterOptions(images_scale=IMAGE_RESOLUTION_SCALE))
     doc_filename = conv_res.input.file.stem
     pic_count = 0
 
-    for element, _ in conv_res.document.iterate_items():
-        if isinstance(element, PictureItem):
-            pic_count += 1
-            filename = output_dir / f"{pic_count}.png"
-            try:
-                element.get_image(conv_res.document).save(filename, "PNG")
-            except Exception as e:
-                logging.warning(f"Failed to extract image: {e}")
+    # resizing, encoding and writing happen in the background while the walk continues
+    with ImageWriter(image_options) as writer:
+        for element, _ in conv_res.document.iterate_items():
+            if isinstance(element, PictureItem):
+                pic_count += 1
+                filename = output_dir / f"{pic_count}{image_options.extension}"
+                try:
+                    writer.submit(element.get_image(conv_res.document), filename)
+                except Exception as e:
+                    logging.warning(f"Failed to extract image: {e}")
 
     md_file = output_dir / f"{doc_filename}.md"
     conv_res.document.save_as_markdown(md_file)
+    # keep the document structure (headers, tables, pictures, page provenance) for the sections stage
+    write_document_parts([(0, document_payload(conv_res.document))], output_dir / DOCUMENT_FILE)
 
     logging.info(f"[md_extract] Exported {pic_count} images → {md_file} ({time.time()-start:.2f}s)")
+    for stats in converter_stats():
+        logging.info(f"[md_extract] Converter pool: load {stats['load_seconds']}s, "
+                     f"convert {stats['convert_seconds']}s over {stats['conversions']} document(s)")
     return md_file
 
 
 # ===============================
 # GENERATE IMAGE DESCRIPTIONS
 # ===============================
-def process_images(image_folder: Path, output_file: Path) -> Path:
+def process_images(image_folder: Path, output_file: Path, prompt: str = IMAGE_PROMPT,
+                   concurrency: int = VISION_CONCURRENCY) -> Path:
     start = time.time()
-    image_descriptions = []
-    client = ollama.Client("http://localhost:11434")
 
-    image_files = sorted([f for f in os.listdir(image_folder) if f.lower().endswith(('.png', '.jpg', '.jpeg'))])
+    # numeric order (2.png before 10.png), so a duplicate cluster's representative is its first picture
+    image_files = [p.name for p in numbered_images(image_folder)]
     if not image_files:
         logging.warning(f"[process_images] No images found in {image_folder}")
         return output_file
 
-    for image_file in image_files:
-        image_path = str(image_folder / image_file)
-        prompt = "Describe this image in 50-150 words with meaningful detail."
-
-        try:
-            response = client.generate(MODEL_NAME, prompt, images=[image_path], stream=False)
-            description = response.get("response", "").strip()
-            if not description:
-                raise ValueError("Empty description returned")
-
-            image_descriptions.append({"image": image_file, "description": description})
-            logging.info(f"[process_images] Processed {image_file}")
-
-        except Exception as e:
-            logging.error(f"Error processing {image_file}: {e}")
+    # near-duplicates are described once (image_clusters.json), decorative images are skipped
+    # (image_triage.json), up to `concurrency` requests in flight; entries keep image_files order
+    image_descriptions = describe_image_folder(image_folder, image_files, MODEL_NAME, prompt,
+                                               host=OLLAMA_HOST, concurrency=concurrency)
 
     if image_descriptions:
         with open(output_file, "w", encoding="utf-8") as f:
@@ -143,8 +180,10 @@ def process_images(image_folder: Path, output_file: Path) -> Path:
 # REPLACE IMAGE PLACEHOLDERS WITH DESCRIPTIONS
 # ===============================
 def get_description(image_name: str, data: list) -> str | None:
+    # match on the image number so 3.png, 3.jpg and 3.webp all resolve
+    stem = Path(image_name).stem
     for item in data:
-        if item["image"] == image_name:
+        if Path(item["image"]).stem == stem:
             return item["description"]
     return None
 
@@ -184,158 +223,254 @@ def replace_images_in_md(md_input_path: Path, md_output_path: Path, json_file: P
     return md_output_path, final_text
 
 
-# ===============================
-# EXTRACT HEADINGS AND SECTIONS FROM MARKDOWN
-# ===============================
-def heading_extraction(path):
-    heading = []
-    with open(path, "r", encoding="utf-8") as f:
-        i = 1
-        pattern1 = re.compile(rf"^## {i} ")
-        pattern2 = re.compile(rf"^## {i}\. ")
-        pattern3 = re.compile(rf"^## {i}\) ")
-        for line in f:
-            if pattern1.match(line) or pattern2.match(line) or pattern3.match(line):
-                heading.append(line)
-                i += 1
-                pattern1 = re.compile(rf"^## {i} ")
-                pattern2 = re.compile(rf"^## {i}\. ")
-                pattern3 = re.compile(rf"^## {i}\) ")
-    return heading
-
-
-def content_extraction(path, heading):
-    section = {}
-    with open(path, "r", encoding="utf-8") as f:
-        section_content = ""
-        counter = False
-        i = 0
-        for line in f:
-            if line == heading[i]:
-                if counter:
-                    section[heading[i]] = section_content
-                section_content = line
-                counter = True
-            elif counter:
-                # Check if next heading reached
-                if i + 1 < len(heading) and line == heading[i+1]:
-                    section[heading[i]] = section_content
-                    section_content = line
-                    i += 1
-                else:
-                    # section_content.append(line)
-                    section_content = section_content + line
-        # Add last section
-        if counter and i < len(heading):
-            section[heading[i]] = section_content
-    with open(path, "r", encoding="utf-8") as f:
-        section_content = ""
-        i = 0
-        for line in f:
-            if i < 50:
-                section_content = section_content + line
-                i = i + 1
-            else:
-                section['Cover Page'] = section_content
-                break
-    return section
-# print("".join(value.get("content", [])))
-
 # ===============================
 # SEMANTIC + FUZZY MAPPING OF SECTIONS TO TARGET KEYS
 # ===============================
-model = SentenceTransformer(SENTENCE_TRANSFORMER_MODEL_PATH)
+# PyTorch SentenceTransformer, or the int8 ONNX Runtime model with EMBEDDING_BACKEND=onnx
+model = load_embedding_model(SENTENCE_TRANSFORMER_MODEL_PATH)
+
+OPTIMAL_FUZZY_THRESHOLD = 60.0
+
 
 def normalize(text):
     text = text.lower()
     text = re.sub(r'[^a-z\s]', '', text)
     return text.strip()
 
-def map_sections_to_target(sections_dict, target_dict, semantic_threshold=0.5, fuzzy_threshold=0.5):
+def map_sections_to_target(sections_dict, target_dict, semantic_threshold=0.5, fuzzy_threshold=None,
+                           return_scores=False, schema: TargetSchema | None = None, mode: str = ASSIGNMENT_MODE):
+    """Assign each section to its best target key.
+
+    mode="greedy" gives every section its own best target (a later section replaces an earlier
+    one); mode="optimal" solves the whole assignment at once within the schema's capacities and
+    concatenates the sections that share a target (see section_assignment.py).
+    fuzzy_threshold is on the 0-100 scale; by default greedy keeps its old 0.5 (the best fuzzy
+    match is always taken) and optimal uses OPTIMAL_FUZZY_THRESHOLD, as oct8 and bench_assignment do.
+    Pass the `schema` target_dict came from to reuse its cached target embeddings / fuzzy keys.
+    With return_scores=True also returns the MatchScores (full semantic and fuzzy matrices).
+    """
+    if fuzzy_threshold is None:
+        # 0.5 would make nearly every heading/target pair eligible for the optimal assignment
+        fuzzy_threshold = OPTIMAL_FUZZY_THRESHOLD if mode == "optimal" else 0.5
     target_keys = list(target_dict.keys())
-    target_embeddings = model.encode(target_keys, convert_to_tensor=True)
-
-    for section_key, section_content in sections_dict.items():
-        section_emb = model.encode(section_key, convert_to_tensor=True)
-        cos_scores = util.cos_sim(section_emb, target_embeddings)[0].cpu().numpy()
-
-        best_idx = np.argmax(cos_scores)
-        best_sem_score = cos_scores[best_idx]
-        best_sem_key = target_keys[best_idx]
-
-        norm_section = normalize(section_key)
-        fuzzy_scores = [fuzz.ratio(norm_section, normalize(k)) for k in target_keys]
-        best_fuzzy_idx = np.argmax(fuzzy_scores)
-        best_fuzzy_score = fuzzy_scores[best_fuzzy_idx]
-        best_fuzzy_key = target_keys[best_fuzzy_idx]
-
-        if best_sem_score >= semantic_threshold:
-            target_dict[best_sem_key] = {
-                "content": section_content,
-                "semantic_score": round(float(best_sem_score), 3),
-                "fuzzy_score": best_fuzzy_score
-            }
-        elif best_fuzzy_score >= fuzzy_threshold:
-            target_dict[best_fuzzy_key] = {
-                "content": section_content,
-                "semantic_score": round(float(best_sem_score), 3),
-                "fuzzy_score": best_fuzzy_score
-            }
-        # else leave as is
+    section_keys = list(sections_dict.keys())
+    model_id = embedding_model_id(SENTENCE_TRANSFORMER_MODEL_PATH)
+    headings = [clean_heading(k) for k in section_keys]
 
+    # one batched encode + one matrix product for the semantic scores, one cdist for the fuzzy ones
+    if schema is not None and schema.keys == target_keys:
+        scores = schema.score_sections(model, model_id, headings, normalize)
+    else:
+        scores = score_sections(model, model_id, headings, target_keys, normalize)
+
+    capacities = schema.capacity_list() if schema is not None and schema.keys == target_keys else None
+    chosen = assign_sections(scores, semantic_threshold, fuzzy_threshold, mode, capacities)
+
+    for row, section_key in enumerate(section_keys):
+        target_idx = chosen[row]
+        if target_idx is None:
+            continue  # else leave as is
+        target_key = target_keys[target_idx]
+        section_content = sections_dict[section_key]
+        semantic_score = round(float(scores.semantic[row, target_idx]), 3)
+        previous = target_dict[target_key]
+        if mode == "optimal" and isinstance(previous, dict):
+            section_content = previous["content"] + section_content
+            semantic_score = max(semantic_score, previous["semantic_score"])
+        target_dict[target_key] = {
+            "content": section_content,
+            "semantic_score": semantic_score,
+            "fuzzy_score": float(scores.fuzzy[row, target_idx])
+        }
+
+    if return_scores:
+        return target_dict, scores
     return target_dict
 
 
 # ===============================
 # MAIN PIPELINE
 # ===============================
-def pdf_to_descriptive_mapped_sections(pdf_path: str, output_dir: str):
+def _with_desc_path(md_file: Path) -> Path:
+    return md_file.parent / (md_file.stem + "_with_desc.md")
+
+
+def _md_extract_stage(pdf_bytes: bytes, pdf_name: str, output_dir: Path, cropped: dict):
+    # drop images of a previous run so the numbering starts again at 1
+    for old_image in numbered_images(output_dir):
+        old_image.unlink()
+    # crop in memory and hand the bytes straight to docling
+    cropped_bytes = crop_pdf_bytes(pdf_bytes, CROP_TOP_PERCENT, CROP_BOTTOM_PERCENT)
+    cropped["bytes"] = cropped_bytes
+    if SAVE_CROPPED_PDF:
+        (output_dir / f"cropped_{pdf_name}").write_bytes(cropped_bytes)
+    md_file = md_extract(cropped_bytes, output_dir, name=f"cropped_{Path(pdf_name).stem}")
+    outputs = [md_file]
+    if STRIP_BOILERPLATE:
+        report_file = output_dir / "boilerplate.json"
+        strip_boilerplate_file(md_file, cropped_bytes, report_file)
+        outputs.append(report_file)
+    if (output_dir / DOCUMENT_FILE).exists():
+        outputs.append(output_dir / DOCUMENT_FILE)
+    return outputs + numbered_images(output_dir)
+
+
+def _process_images_stage(image_folder: Path, json_file: Path, prompt: str):
+    process_images(image_folder, json_file, prompt)
+    if not json_file.exists():
+        # no images / no descriptions: keep an empty list so the stage has an output
+        json_file.write_text("[]", encoding="utf-8")
+    return json_file
+
+
+def _sections_stage(md_with_desc: Path, sections_file: Path, output_dir: Path, json_file: Path):
+    document_file = output_dir / DOCUMENT_FILE
+    if SECTIONS_FROM_DOCUMENT and document_file.exists():
+        # one walk over the docling items: no markdown re-parse, page provenance for free
+        descriptions = descriptions_by_number(json.loads(json_file.read_text(encoding="utf-8")))
+        boilerplate_report = output_dir / "boilerplate.json"
+        signatures = []
+        if STRIP_BOILERPLATE and boilerplate_report.exists():
+            signatures = json.loads(boilerplate_report.read_text(encoding="utf-8"))["signatures"]
+        structure = document_sections(load_document_parts(document_file), descriptions, signatures)
+        sections = structure.sections
+        (output_dir / "document_structure.json").write_text(
+            json.dumps(structure.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+    else:
+        # one memory-mapped pass: headings, section offsets and the cover page
+        sections = read_sections(md_with_desc)
+    sections_file.write_text(json.dumps(sections, ensure_ascii=False, indent=2), encoding="utf-8")
+    return sections_file
+
+
+def _map_sections_stage(sections_file: Path, schema: TargetSchema, mapped_file: Path, scores_file: Path):
+    sections = json.loads(sections_file.read_text(encoding="utf-8"))
+    mapped_sections, scores = map_sections_to_target(sections, schema.target_dict(), return_scores=True, schema=schema)
+    mapped_file.write_text(json.dumps(mapped_sections, ensure_ascii=False, indent=2), encoding="utf-8")
+    # full heading x target matrices + runner-ups, for inspecting near misses without rescoring
+    scores_file.write_text(json.dumps(scores.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+    return [mapped_file, scores_file]
+
+
+def pipeline_settings(image_prompt: str = IMAGE_PROMPT, doc_type: str = DEFAULT_DOC_TYPE):
+    """Settings that change the pipeline output; part of the conversion cache key."""
+    return {
+        "top_percent": CROP_TOP_PERCENT,
+        "bottom_percent": CROP_BOTTOM_PERCENT,
+        "image_resolution_scale": IMAGE_RESOLUTION_SCALE,
+        "ocr_routing": OCR_ROUTING,
+        "strip_boilerplate": STRIP_BOILERPLATE,
+        "image_export": IMAGE_EXPORT.output_settings(),
+        "dedupe_images": DEDUPE_IMAGES,
+        "triage_images": TRIAGE_IMAGES,
+        "sections_from_document": SECTIONS_FROM_DOCUMENT,
+        "model_name": MODEL_NAME,
+        "image_prompt": image_prompt,
+        "sentence_model": SENTENCE_TRANSFORMER_MODEL_PATH,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "target_schema": get_schema(doc_type).cache_version,
+        "assignment_mode": ASSIGNMENT_MODE,
+    }
+
+
+def pdf_to_descriptive_mapped_sections(pdf_path, output_dir: str, use_cache: bool = True,
+                                       image_prompt: str = IMAGE_PROMPT, pdf_name: str | None = None,
+                                       doc_type: str = DEFAULT_DOC_TYPE):
+    """Run the full pipeline on a PDF given as a path or as bytes (e.g. a Streamlit upload).
+
+    For bytes input, `pdf_name` is the original file name used for the output file names.
+    Sections are mapped onto the target keys of the `doc_type` schema (see schema_registry.py).
+    """
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    #step:0 pre-processing
-    cropped_pdf = crop_pdf_headers_footers(pdf_path,output_dir)
 
-    # Step 1: Extract markdown + images
-    md_file = md_extract(cropped_pdf, output_dir)
+    if isinstance(pdf_path, (bytes, bytearray)):
+        pdf_bytes = bytes(pdf_path)
+        pdf_name = pdf_name or "document.pdf"
+    else:
+        pdf_bytes = Path(pdf_path).read_bytes()
+        pdf_name = pdf_name or os.path.basename(pdf_path)
+    pdf_sha256 = sha256_bytes(pdf_bytes)
+
+    # Re-uploads of an already processed PDF are served from the conversion cache
+    cache_key = None
+    if use_cache:
+        cache_key = pipeline_cache_key(pdf_sha256, pipeline_settings(image_prompt, doc_type))
+        cached = load_cached_result(cache_key)
+        if cached is not None:
+            return cached
+
+    # The steps below run as a stage graph: each stage writes a manifest under
+    # <output_dir>/.stages, so a rerun resumes at the first stale stage.
+    graph = StageGraph(output_dir)
+    json_file = output_dir / "image_descriptions.json"
+    sections_file = output_dir / "sections.json"
+    mapped_file = output_dir / "mapped_sections.json"
+    scores_file = output_dir / "match_scores.json"
+
+    #step:0+1 crop in memory, extract markdown + images
+    cropped = {}
+    graph.add_stage(
+        "md_extract",
+        lambda: _md_extract_stage(pdf_bytes, pdf_name, output_dir, cropped),
+        params={"pdf_sha256": pdf_sha256, "top_percent": CROP_TOP_PERCENT, "bottom_percent": CROP_BOTTOM_PERCENT,
+                "images_scale": IMAGE_RESOLUTION_SCALE, "ocr_routing": OCR_ROUTING,
+                "strip_boilerplate": STRIP_BOILERPLATE,
+                "image_export": IMAGE_EXPORT.output_settings()},
+    )
 
     # Step 2: Generate descriptions for extracted images
-    json_file = output_dir / "image_descriptions.json"
-    process_images(output_dir, json_file)
+    graph.add_stage(
+        "process_images",
+        lambda: _process_images_stage(output_dir, json_file, image_prompt),
+        deps=["md_extract"],
+        params={"model": MODEL_NAME, "prompt": image_prompt, "dedupe": DEDUPE_IMAGES, "triage": TRIAGE_IMAGES},
+    )
 
     # Step 3: Replace image placeholders with descriptions
-    md_with_desc = output_dir / (md_file.stem + "_with_desc.md")
-    output_path, final_text = replace_images_in_md(md_file, md_with_desc, json_file)
+    graph.add_stage(
+        "replace_images",
+        lambda: replace_images_in_md(
+            graph.outputs("md_extract")[0], _with_desc_path(graph.outputs("md_extract")[0]), json_file
+        )[0],
+        deps=["md_extract", "process_images"],
+    )
 
-    # Step 4: Extract headings & content from markdown with descriptions
-    headings = heading_extraction(md_with_desc)
-    sections = content_extraction(md_with_desc, headings)
-
-    # Step 5: Define target dictionary keys
-    target_dict = {
-        "Cover Page": "",
-        "1 Introduction": "",
-        "2 Acronyms": "",
-        "3 Reference Documents": "",
-        "4 Product Description": "",
-        "5 Assumptions": "",
-        "6 Hardware Requirements": "",
-        "7 States and Mode of Software": "",
-        "8 Detailed Software Requirement": "",
-        "9 Timing Requirements": "",
-        "10 Loadable Data Requirements": "",
-        "11 Internal and External Interface Requirement": "",
-        "12 Safety & Security Requirements": "",
-        "13 Software Testing Requirements": "",
-        "14 General Constraints": "",
-        "15 Traceability Matrix": "",
-        "16 Overview": "",
-        "17 SomethingElse": ""
-    }
+    # Step 4: Extract headings & content (from the docling document, or the markdown with descriptions)
+    graph.add_stage(
+        "sections",
+        lambda: _sections_stage(graph.outputs("replace_images")[0], sections_file, output_dir, json_file),
+        deps=["md_extract", "process_images", "replace_images"],
+        params={"from_document": SECTIONS_FROM_DOCUMENT},
+    )
+
+    # Step 5: Target keys of the document type (schemas/<doc_type>.json)
+    schema = get_schema(doc_type)
 
     # Step 6: Map sections to target keys
-    mapped_sections = map_sections_to_target(sections, target_dict)
-    # with open(f"{output_dir}/saved_mapped_dict.json", "w") as g:
-    #     json.dump(mapped_sections, g)
+    graph.add_stage(
+        "map_sections",
+        lambda: _map_sections_stage(sections_file, schema, mapped_file, scores_file),
+        deps=["sections"],
+        params={"schema": schema.cache_version, "targets": schema.keys, "capacities": schema.capacity_list(),
+                "sentence_model": SENTENCE_TRANSFORMER_MODEL_PATH, "embedding_backend": EMBEDDING_BACKEND,
+                "assignment": ASSIGNMENT_MODE},
+    )
+
+    outputs = graph.run()
+    md_file = outputs["md_extract"][0]
+    md_with_desc = outputs["replace_images"][0]
+    final_text = md_with_desc.read_text(encoding="utf-8")
+    mapped_sections = json.loads(mapped_file.read_text(encoding="utf-8"))
+    match_scores = json.loads(scores_file.read_text(encoding="utf-8"))
+
+    boilerplate_removed = {}
+    boilerplate_report = output_dir / "boilerplate.json"
+    if STRIP_BOILERPLATE and boilerplate_report.exists():
+        removed_by_heading = json.loads(boilerplate_report.read_text(encoding="utf-8"))["removed_tokens_by_heading"]
+        boilerplate_removed = tokens_removed_per_section(mapped_sections, removed_by_heading)
+        for key, n_tokens in boilerplate_removed.items():
+            logging.info(f"[boilerplate] {key}: {n_tokens} tokens removed")
 
     # Logging output info
     logging.info(f"Extracted Markdown: {md_file}")
@@ -351,44 +486,38 @@ def pdf_to_descriptive_mapped_sections(pdf_path: str, output_dir: str):
         else:
             print("[NO MATCH FOUND]")
 
-    return {
+    result = {
         "original_md": md_file,
         "image_descriptions_json": json_file,
         "md_with_descriptions": final_text,
-        "mapped_sections": mapped_sections
+        "md_with_descriptions_file": md_with_desc,
+        "mapped_sections": mapped_sections,
+        "match_scores": match_scores,
+        "boilerplate_tokens_removed": boilerplate_removed,
+        "cache_key": cache_key,
+        "cache_hit": False,
     }
 
+    if use_cache:
+        try:
+            store_result(cache_key, result, cropped.get("bytes"), md_file, md_with_desc, json_file,
+                         meta={"pdf_name": pdf_name, "settings": pipeline_settings(image_prompt, doc_type)})
+        except OSError as e:
+            logging.warning(f"[pdf_to_descriptive_mapped_sections] Could not store cache entry: {e}")
+
+    return result
+
 
-def pdf_to_descriptive_mapped_sections2(md_path: str):
+def pdf_to_descriptive_mapped_sections2(md_path: str, doc_type: str = DEFAULT_DOC_TYPE):
     # Step 4: Extract headings & content from markdown with descriptions
-    headings = heading_extraction(md_path)
-    sections = content_extraction(md_path, headings)
+    sections = read_sections(md_path)
     print(f'\n sections extracted from md file are {sections.keys()} \n')
 
-    # Step 5: Define target dictionary keys
-    target_dict = {
-        "Cover Page": "",
-        "1 Introduction": "",
-        "2 Acronyms": "",
-        "3 Reference Documents": "",
-        "4 Product Description": "",
-        "5 Assumptions": "",
-        "6 Hardware Requirements": "",
-        "7 States and Mode of Software": "",
-        "8 Detailed Software Requirement": "",
-        "9 Timing Requirements": "",
-        "10 Loadable Data Requirements": "",
-        "11 Internal and External Interface Requirement": "",
-        "12 Safety & Security Requirements": "",
-        "13 Software Testing Requirements": "",
-        "14 General Constraints": "",
-        "15 Traceability Matrix": "",
-        "16 Overview": "",
-        "17 SomethingElse": ""
-    }
+    # Step 5: Target keys of the document type
+    schema = get_schema(doc_type)
 
     # Step 6: Map sections to target keys
-    mapped_sections = map_sections_to_target(sections, target_dict)
+    mapped_sections = map_sections_to_target(sections, schema.target_dict(), schema=schema)
 
     print("\n=== MAPPED SECTIONS ===")
     for key, value in mapped_sections.items():
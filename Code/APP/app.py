@@ -12,6 +12,7 @@ from rich.markdown import Markdown
 import requests
 from datetime import datetime
 from ZFinal_md_with_section3 import *
+from ollama_client import OllamaError, default_client
 
 # Document types
 DOC_TYPES = ["SRS", "SDD", "ICD"]
@@ -194,26 +195,19 @@ def find_file(target_filename):
 
 def query_ollama(prompt):
     # print('\n\n',prompt,'\n\n')
+    # pooled session, timeouts, retries and circuit breaker (ollama_client.py, OLLAMA_HOST for the server)
     try:
-        url = "http://localhost:11434/api/generate"
-        # url = "http://10.144.177.192:12345/api/generate"
-        response = requests.post(url,
-                                 json={
-                                     #"model": "mistral-nemo:12b-instruct-2407-q4_K_M",
-                                     # "model": "mistral-nemo:12b-instruct-2407-q4_K_M",
-                                     "model": "glm4:latest",
-                                     "prompt": prompt,
-                                     "stream": False,
-                                     "options": {
-                                         "temperature": 0.1
-                                     }
-                                 })
-        result = response.json()
-        extracted_value = result['response']  # .strip().strip('"').strip()
-        return extracted_value if extracted_value else ""
-    except Exception as e:
+        return default_client().generate(
+            #"mistral-nemo:12b-instruct-2407-q4_K_M",
+            "glm4:latest",
+            prompt,
+            options={"temperature": 0.1},
+        )
+    except OllamaError as e:
+        # stop the run with the reason instead of handing "" to json.loads
         print(f"Error querying Ollama server: {str(e)}")
-        return ""
+        st.error(f"Error querying Ollama server: {e}")
+        st.stop()
 
 
 # Initialize session state
@@ -12,6 +12,14 @@ from rich.markdown import Markdown
 import requests
 from datetime import datetime
 from ZFinal_md_with_section3 import *
+from section_tree import load_section_tree
+from boilerplate import count_tokens
+from retrieval_index import RETRIEVAL_TOKEN_BUDGET, load_or_build_index, section_spans
+from question_eval import EVAL_MODE, EvalStats
+from prompt_templates import generate_payload
+from eval_engine import EvalEngine, QuestionJob
+from ollama_client import OllamaError, default_client
+from pipeline_cache import sha256_bytes, stage_work_dir
 
 # Document types
 DOC_TYPES = ["SRS", "SDD", "ICD"]
@@ -421,26 +429,14 @@ def find_file(target_filename):
 
 def query_ollama(prompt):
     # print('\n\n',prompt,'\n\n')
-    try:
-        url = "http://localhost:11434/api/generate"
-        # url = "http://10.144.177.192:12345/api/generate"
-        response = requests.post(url,
-                                 json={
-                                     #"model": "mistral-nemo:12b-instruct-2407-q4_K_M",
-                                     # "model": "mistral-nemo:12b-instruct-2407-q4_K_M",
-                                     "model": "glm4:latest",
-                                     "prompt": prompt,
-                                     "stream": False,
-                                     "options": {
-                                         "temperature": 0.1
-                                     }
-                                 })
-        result = response.json()
-        extracted_value = result['response']  # .strip().strip('"').strip()
-        return extracted_value if extracted_value else ""
-    except Exception as e:
-        print(f"Error querying Ollama server: {str(e)}")
-        return ""
+    # pooled session, timeouts, retries and circuit breaker (ollama_client.py); raises OllamaError
+    # keep_alive + a fixed num_ctx keep the model and its prompt cache loaded between calls
+    return default_client().generate(**generate_payload(
+        #"mistral-nemo:12b-instruct-2407-q4_K_M",
+        "glm4:latest",
+        prompt,
+        temperature=0.1,
+    ))
 
 
 # Initialize session state
@@ -814,6 +810,8 @@ elif page == "Verify SRS":
 
         with st.sidebar:
             pdf = st.file_uploader("Upload PDF below", type=['.pdf'])
+            # target sections the document is mapped onto (schemas/<doc_type>.json)
+            upload_doc_type = st.selectbox("Document Type", DOC_TYPES, key="upload_doc_type")
             Button = st.button("Submit")
 
         if Button:
@@ -821,25 +819,41 @@ elif page == "Verify SRS":
             if pdf is None:
                 st.warning("PDF not uploaded. Please upload the PDF file")
             else:
+                # logs/<timestamp> only holds this run's logs
                 out_dir = datetime.now().strftime("%Y-%m-%d-%H:%M:%S")
                 os.mkdir(f"logs/{out_dir}")
-                with open(f"logs/{out_dir}/{pdf.name}", "wb") as f1:
-                  f1.write(pdf.getbuffer())
 
-                # cache_file = find_file(pdf.name)  # Find converted file in logs
-                # if cache_file:
-                #     md_file_text = open(cache_file).read()
-                # else:
+                # The upload is processed in memory (no copy of the PDF is written to logs/).
+                # Conversion results are cached by PDF content + pipeline settings (see pipeline_cache.py);
+                # the stage work directory is keyed by the PDF content, so a resubmit resumes its stages
+                pdf_bytes = pdf.getvalue()
                 with st.spinner('Processing the SRS Document'):
-                    md = pdf_to_descriptive_mapped_sections(f'logs/{out_dir}/{pdf.name}', f'logs/{out_dir}')
+                    md = pdf_to_descriptive_mapped_sections(pdf_bytes, str(stage_work_dir(sha256_bytes(pdf_bytes))),
+                                                            pdf_name=pdf.name, doc_type=upload_doc_type)
+                if md.get('cache_hit'):
+                    st.info(f"Loaded cached conversion for {pdf.name}")
 
                 sections_to_search = md['mapped_sections'].keys()
                 print(f'\n\n {sections_to_search} \n\n')
                 # sections_to_search = list(loaded_dict.keys())
                 mapped_text_dict = md['mapped_sections']
+                # numbered subsections (8.3, 8.3.1, ...) so a reference like "8.3 Mode Transitions"
+                # only sends that subsection instead of the whole chapter
+                section_tree = load_section_tree(md['md_with_descriptions_file'])
+                # BM25 + embedding index over paragraph chunks, built once per document and saved next to
+                # the markdown; sub-questions get only their top chunks instead of whole documents/sections
+                with st.spinner('Indexing the document'):
+                    retrieval = load_or_build_index(md['md_with_descriptions_file'], model,
+                                                    embedding_model_id(SENTENCE_TRANSFORMER_MODEL_PATH))
 
                 log_file = open(f"logs/{out_dir}/logfile.txt", "w")
                 Main_Counter = 0
+                Score_final = 0.0
+                score = 0.0
+                # EVAL_MODE=batched asks all sub-questions of a main question in one call (see question_eval.py)
+                eval_stats = EvalStats(EVAL_MODE)
+                # contexts are picked here, in question order; the LLM calls run concurrently below (see eval_engine.py)
+                jobs = []
                 for i, q in enumerate(st.session_state.questions_data):
                     print('*' * 80)
                     print(q['question'])
@@ -854,9 +868,17 @@ elif page == "Verify SRS":
                     section_list = [s.strip() for s in sections.splitlines() if len(s) > 0]
                     print('\n', 'Entered section is  ', section_list, '\n\n')
 
+                    search_spans = []
                     if section_list:
                         content_to_search = ""
                         for entered_sec in section_list:
+                            node = section_tree.lookup(entered_sec)
+                            if node is not None and len(node.number) > 1:
+                                text = section_tree.section_text(node)
+                                log_file.write(f'\n Matched {entered_sec} with subsection {node.label} ({len(text)} chars) \n')
+                                content_to_search += text
+                                search_spans.append((node.start, node.end))
+                                continue
                             match_found = False
                             for key in sections_to_search:
                                 if fuzz.WRatio(entered_sec, key) >= 76 and not match_found:
@@ -868,6 +890,7 @@ elif page == "Verify SRS":
                                         # print(f'\n text is {text} \n')
                                         # print(f'\n Length of text is {len(text)} \n')
                                         content_to_search += text
+                                        search_spans.extend(section_spans(section_tree, text))
                                     except Exception as exp:
                                         # pass
                                         log_file.write(f'\n exception {exp} for {key} content not found \n')
@@ -877,6 +900,10 @@ elif page == "Verify SRS":
                         content_to_search = f'{md['md_with_descriptions']}'
 
                     log_file.write(f'\n {content_to_search} \n')  # write the text to log file
+                    # retrieve per sub-question when there is no reference section, or when the matched
+                    # sections (located in the index) are larger than the budget
+                    use_retrieval = not section_list or (
+                        search_spans and count_tokens(content_to_search) > RETRIEVAL_TOKEN_BUDGET)
                     sub_q = [line for line in q['sub_questions'].split('\n\n') if line != '']
                     sub_q = [section.strip() for section in sub_q]
                     # prompts = [line for line in q['special_instructions'].splitlines() if line != '']
@@ -887,96 +914,68 @@ elif page == "Verify SRS":
                     #     print(f'\n ********** Section {section_list[0]} not found in Table of Contents Page *********\n')
                     #     continue
 
-                    iteration_counter = 0
                     Main_Counter = Main_Counter + 1
-                     # 🟢 Prepare to store sub-question results
-                    current_results = []
-                    for j in range(len(sub_q)):
-                        # print(f'\n {st.session_state['table_rows']} \n')
-                        final_prompt2 = f"""
-                                        #########################p
-                                        Text: {content_to_search} 
-                                        #########################
-                                        Instructions:
-                                        You are given a document content in the above `Text` {prompts[j]}
-                                        Return the response strictly in the JSON format: {{ "Answer": "Yes/No", "Reason": "..." }}
-                                        """
-                        final_prompt = f"""
-                                        #########################
-                                        Text: {content_to_search}
-                                        #########################
-                                        Instructions:
-                                        You are given a document content in the above `Text`.
-
-                                        Now, follow the checklist below carefully:
-                                        {prompts[j]}
-
-                                        Your task:
-                                        Evaluate the document *practically*, not rigidly. 
-                                        If the information seems partially mentioned, inferred, or described indirectly, still consider it as **"Partially Yes"** (not strictly No).
-                                        Be lenient where technical meaning is clear even if phrasing differs.
-
-                                        Respond in **JSON** format as:
-                                        {{
-                                        "Answer": "Yes" / "Partially Yes" / "No",
-                                        "Reason": "Provide a clear, concise explanation (40–60 words) describing which aspects are mentioned, implied, or missing. Be objective and avoid repetition."
-                                        }}
-
-                                        Guidelines:
-                                        - If the content explicitly meets the criteria → "Yes".
-                                        - If it somewhat covers or implies it → "Partially Yes".
-                                        - If it is missing or unrelated → "No".
-                                        - Maintain neutral tone and professional phrasing.
-                                        """
-
-
-                        resp = query_ollama(final_prompt)
-                        iteration_counter += 1
-                        # print(f'Iter count is {iteration_counter}')
-                        # print(f'\n {resp} \n')
-                        # final_response = json.loads(resp)
-                        if resp.startswith("```json") and resp.endswith("```"):
-                            js = resp.replace("```json", "").replace("```", "")
-                            final_response = json.loads(js)
+                    # one context per main question: every prompt of the question starts with the same
+                    # document block, so Ollama only prefills the checklist item (see prompt_templates.py)
+                    question_content = content_to_search
+                    if use_retrieval:
+                        question_content = retrieval.context_many(
+                            [f"{sq}\n{ins}" for sq, ins in zip(sub_q, prompts)], model, spans=search_spans or None)
+                        log_file.write(f'\n [retrieval] {count_tokens(question_content)} of '
+                                       f'{count_tokens(content_to_search)} tokens \n')
+
+                    jobs.append(QuestionJob(
+                        Main_Counter, q['question'], sub_q, prompts, question_content,
+                        weights=weights[Main_Counter - 1] if len(weights) >= Main_Counter else None,
+                        main_weight=main_weights[Main_Counter - 1] if len(main_weights) >= Main_Counter else 0.0))
+
+                total_sub_questions = sum(len(job.sub_questions) for job in jobs)
+                answered = []
+                progress = st.progress(0.0, text="Evaluating sub-questions")
+
+                def on_answer(job, j, answer):
+                    # completion order; the table below is still filled in question order
+                    answered.append((job.number, j + 1))
+                    log_file.write(f'\n [answered] {job.number}.{j + 1}: {answer['Answer']} \n')
+                    progress.progress(len(answered) / max(total_sub_questions, 1),
+                                      text=f"Answered {len(answered)} of {total_sub_questions} sub-questions")
+
+                # EVAL_WORKERS sub-question calls in flight at once; each main question is scored when done
+                engine = EvalEngine(query_ollama, eval_stats)
+                try:
+                    for result in engine.run(jobs, on_answer=on_answer):
+                        job = result.job
+                        for j, final_response in enumerate(result.answers):
                             print(f'\n {final_response} {type(final_response)} \n')
-                            df_to_write=dict_to_markdown(f'{q['question']}', f'{sub_q[j]}', final_response, iteration_counter,Main_Counter)
-
-                        else:
-                            final_response = json.loads(resp)
-                            print(f'\n {final_response} {type(final_response)}\n')
-                            df_to_write=dict_to_markdown(f'{q['question']}', f'{sub_q[j]}', final_response, iteration_counter,Main_Counter)
-
-                        # Update the dictionary with the new response"**Score out of 10:  {score} **"
-
-
-                        if final_response['Answer'] == "Yes":
-                            yes_count = yes_count + 1
-                            current_results.append(1)
-                        else:
-                            no_count = no_count + 1
-                            current_results.append(0)
-
-                        # Save the responses to a csv file
-                        df_to_write.to_csv(f"logs/{out_dir}/responses_log.csv", index=False)
-                    # 🟢 After finishing all sub-questions for this main question
-                    results[Main_Counter - 1] = current_results
-                        # 🟢 Compute weighted score
-                    score = 0.0
-                    if len(weights) >= Main_Counter:
-                        w = weights[Main_Counter - 1]
-                        r = results[Main_Counter - 1]
-                        if len(w) == len(r):
-                            score = sum([wi * ri for wi, ri in zip(w, r)])
-                        else:
-                            st.warning(f"Weight length mismatch for Main {Main_Counter}")
-                    else:
-                        st.warning(f"No weights defined for Main {Main_Counter}")
-
-                    # 🟢 Append score to Main Question using table_render
-                    table_render(Main_Counter, score)
-                    Score_final += main_weights[Main_Counter-1]*score
+                            df_to_write=dict_to_markdown(f'{job.question}', f'{job.sub_questions[j]}', final_response, j + 1, job.number)
 
+                            if final_response['Answer'] == "Yes":
+                                yes_count = yes_count + 1
+                            else:
+                                no_count = no_count + 1
+
+                            # Save the responses to a csv file
+                            df_to_write.to_csv(f"logs/{out_dir}/responses_log.csv", index=False)
+                        # 🟢 After finishing all sub-questions for this main question
+                        results[job.number - 1] = result.results
+                        if result.warning:
+                            st.warning(result.warning)
+
+                        # 🟢 Append score to Main Question using table_render
+                        score = result.score
+                        table_render(job.number, score)
+                        Score_final += result.weighted
+                except OllamaError as e:
+                    # server down or not answering: stop with the reason, keep the questions scored so far
+                    log_file.write(f'\n [ollama] {e} \n')
+                    st.error(f"Error querying Ollama server: {e}")
+                progress.empty()
+
+                log_file.write(f'\n {eval_stats.summary()} \n')
                 log_file.close()
+                with open(f"logs/{out_dir}/eval_stats.json", "w") as stats_file:
+                    json.dump(eval_stats.to_dict(), stats_file, indent=2)
+                st.info(eval_stats.summary())
                 # st.markdown(f"**Total Yes: {yes_count}**")
                 # st.markdown(f"**Total Questions: {yes_count+no_count}**")
                 # score = 0
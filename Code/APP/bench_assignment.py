@@ -0,0 +1,157 @@
+"""
+Benchmark: greedy vs. optimal section-to-target assignment (section_assignment).
+
+Accuracy is measured on labelled headings: the built-in SRS-style documents below, or a
+--labels JSON file ({"heading": "target key" or null, ...}) scored with the real embedding
+model (--model). Without --model the scores are simulated: every heading gets its true
+target plus noise, so the greedy argmax makes mistakes the capacity constraints can fix.
+Timing runs on simulated matrices of growing size. The thresholds are the ones the pipeline
+uses for the optimal mode (oct8 and ZFinal: semantic 0.5, fuzzy 60 on the 0-100 scale).
+
+    python bench_assignment.py                                    # simulated scores
+    python bench_assignment.py --model ../../all-MiniLM-L6-v2     # built-in labelled headings
+    python bench_assignment.py --model ../../all-MiniLM-L6-v2 --labels labels.json
+"""
+import argparse
+import json
+import re
+import time
+
+import numpy as np
+
+from schema_registry import DEFAULT_DOC_TYPE, get_schema
+from section_assignment import greedy_assignment, optimal_assignment
+from section_scoring import MatchScores, clean_heading, fuzzy_scores
+
+SEMANTIC_THRESHOLD = 0.5
+FUZZY_THRESHOLD = 60.0  # ZFinal's OPTIMAL_FUZZY_THRESHOLD / oct8's default
+
+# heading -> expected SRS target key (None: should stay unmapped / go to the fallback)
+LABELLED_DOCUMENTS = [
+    {
+        "## 1 INTRODUCTION": "1 Introduction",
+        "## 2 ABBREVIATIONS AND ACRONYMS": "2 Acronyms",
+        "## 3 APPLICABLE DOCUMENTS": "3 Reference Documents",
+        "## 4 SYSTEM DESCRIPTION": "4 Product Description",
+        "## 5 ASSUMPTIONS AND DEPENDENCIES": "5 Assumptions",
+        "## 6 TARGET HARDWARE": "6 Hardware Requirements",
+        "## 7 OPERATING MODES": "7 States and Mode of Software",
+        "## 8 SOFTWARE REQUIREMENTS": "8 Detailed Software Requirement",
+        "## 9 TIMING AND SIZING": "9 Timing Requirements",
+        "## 10 PARAMETER DATA ITEMS": "10 Loadable Data Requirements",
+        "## 11 INTERFACES": "11 Internal and External Interface Requirement",
+        "## 12 SAFETY REQUIREMENTS": "12 Safety & Security Requirements",
+        "## 13 QUALIFICATION PROVISIONS": "13 Software Testing Requirements",
+        "## 14 DESIGN CONSTRAINTS": "14 General Constraints",
+        "## 15 REQUIREMENTS TRACEABILITY": "15 Traceability Matrix",
+        "## 16 NOTES": None,
+    },
+    {
+        "## 1 SCOPE": "1 Introduction",
+        "## 2 DEFINITIONS": "2 Acronyms",
+        "## 3 REFERENCES": "3 Reference Documents",
+        "## 4 OVERVIEW OF THE PRODUCT": "4 Product Description",
+        "## 5 SYSTEM OVERVIEW": "16 Overview",
+        "## 6 HARDWARE INTERFACE REQUIREMENTS": "6 Hardware Requirements",
+        "## 7 STATES AND MODES": "7 States and Mode of Software",
+        "## 8 FUNCTIONAL REQUIREMENTS": "8 Detailed Software Requirement",
+        "## 9 PERFORMANCE REQUIREMENTS": "8 Detailed Software Requirement",
+        "## 10 EXTERNAL INTERFACE REQUIREMENTS": "11 Internal and External Interface Requirement",
+        "## 11 SECURITY REQUIREMENTS": "12 Safety & Security Requirements",
+        "## 12 VERIFICATION REQUIREMENTS": "13 Software Testing Requirements",
+        "## 13 TRACEABILITY": "15 Traceability Matrix",
+        "## 14 APPENDIX": None,
+    },
+]
+
+
+def _normalize(text):
+    return re.sub(r"[^a-z\s]", "", text.lower()).strip()
+
+
+def simulated_scores(n_headings, target_keys, capacities, noise=0.08, seed=0):
+    """Scores where each heading's true target is slightly ahead, blurred by `noise`."""
+    rng = np.random.default_rng(seed)
+    limited = [j for j, cap in enumerate(capacities) if cap > 0]
+    unlimited = [j for j, cap in enumerate(capacities) if cap <= 0] or limited
+    # every limited target gets one heading, the rest go to the unlimited ones
+    truth = list(limited[:n_headings]) + list(rng.choice(unlimited, max(0, n_headings - len(limited))))
+    truth = rng.permutation(truth)
+    semantic = rng.uniform(0.2, 0.55, (n_headings, len(target_keys)))
+    semantic[np.arange(n_headings), truth] = 0.62
+    semantic = np.clip(semantic + rng.normal(0, noise, semantic.shape), -1, 1).astype(np.float32)
+    fuzzy = np.clip(semantic * 100 - 10 + rng.normal(0, 8, semantic.shape), 0, 100).astype(np.float32)
+    scores = MatchScores([f"heading {i}" for i in range(n_headings)], list(target_keys), semantic, fuzzy)
+    return scores, [int(t) for t in truth]
+
+
+def accuracy(chosen, truth):
+    return sum(c == t for c, t in zip(chosen, truth)) / max(len(truth), 1)
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def labelled_scores(model_path, documents, schema):
+    from onnx_embedder import embedding_model_id, load_embedding_model
+
+    model = load_embedding_model(model_path)
+    model_id = embedding_model_id(model_path)
+    for labels in documents:
+        headings = [clean_heading(h) for h in labels]
+        scores = schema.score_sections(model, model_id, headings, _normalize)
+        truth = [schema.keys.index(t) if t is not None else None for t in labels.values()]
+        yield scores, truth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="sentence-transformers model folder (real scores for the labelled headings)")
+    parser.add_argument("--labels", help='JSON {"heading": "target key" or null}; needs --model')
+    parser.add_argument("--doc-type", default=DEFAULT_DOC_TYPE)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    schema = get_schema(args.doc_type)
+    capacities = schema.capacity_list()
+
+    if args.model:
+        if args.doc_type != "SRS" and not args.labels:
+            parser.error("the built-in labelled headings are SRS headings; pass --labels for other doc types")
+        documents = LABELLED_DOCUMENTS
+        if args.labels:
+            with open(args.labels, "r", encoding="utf-8") as f:
+                documents = [json.load(f)]
+        runs = list(labelled_scores(args.model, documents, schema))
+        source = f"{sum(len(d) for d in documents)} labelled headings"
+    else:
+        runs = [simulated_scores(len(schema.keys) + 6, schema.keys, capacities, seed=s) for s in range(20)]
+        source = f"{len(runs)} simulated documents"
+
+    greedy_acc, optimal_acc = [], []
+    for scores, truth in runs:
+        greedy_acc.append(accuracy(greedy_assignment(scores, SEMANTIC_THRESHOLD, FUZZY_THRESHOLD), truth))
+        optimal_acc.append(accuracy(
+            optimal_assignment(scores, capacities, SEMANTIC_THRESHOLD, FUZZY_THRESHOLD), truth))
+    print(f"{args.doc_type} schema, {source}")
+    print(f"  accuracy  greedy {100 * np.mean(greedy_acc):5.1f}%   optimal {100 * np.mean(optimal_acc):5.1f}%")
+
+    print(f"  timing (best of {args.repeat}):")
+    for n in (20, 100, 300, 500):
+        scores, _ = simulated_scores(n, schema.keys, capacities, seed=n)
+        t_greedy, _ = _time(lambda: greedy_assignment(scores, SEMANTIC_THRESHOLD, FUZZY_THRESHOLD), args.repeat)
+        t_optimal, _ = _time(
+            lambda: optimal_assignment(scores, capacities, SEMANTIC_THRESHOLD, FUZZY_THRESHOLD), args.repeat)
+        t_fuzzy, _ = _time(lambda: fuzzy_scores(scores.headings, schema.keys, _normalize), args.repeat)
+        print(f"    {n:4d} headings  greedy {t_greedy * 1000:7.2f} ms   optimal {t_optimal * 1000:7.2f} ms"
+              f"   (fuzzy scoring {t_fuzzy * 1000:7.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: PyTorch SentenceTransformer vs. the int8 ONNX Runtime backend (onnx_embedder).
+
+Loads the model with both backends and reports load time, heading encode throughput, the
+mean cosine similarity between the two backends' vectors and how often map_sections_to_target
+would pick the same target key. Headings come from a *_sections.json file (--sections) or
+from a built-in list of typical SRS headings.
+
+    python bench_embeddings.py --model ../../all-MiniLM-L6-v2 --repeat 5
+    python bench_embeddings.py --model ../../all-MiniLM-L6-v2 --sections output/doc_sections.json
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from onnx_embedder import embedding_model_id, load_embedding_model
+from schema_registry import DEFAULT_DOC_TYPE, get_schema
+from section_scoring import best_matches, clean_heading, encode_normalized, semantic_scores
+
+TARGET_KEYS = get_schema(DEFAULT_DOC_TYPE).keys
+
+HEADINGS = [
+    "INTRODUCTION", "Purpose and Scope", "ABBREVIATIONS AND ACRONYMS", "Acronyms & Definitions",
+    "APPLICABLE DOCUMENTS", "Reference Documents", "PRODUCT DESCRIPTION", "System Overview",
+    "ASSUMPTIONS AND DEPENDENCIES", "HARDWARE REQUIREMENTS", "Target Hardware Description",
+    "OPERATING STATES AND MODES", "Software States and Modes", "DETAILED SOFTWARE REQUIREMENTS",
+    "Functional Requirements", "TIMING REQUIREMENTS", "Timing and Sizing", "LOADABLE DATA",
+    "Parameter Data Items", "EXTERNAL INTERFACE REQUIREMENTS", "Internal Interfaces",
+    "SAFETY REQUIREMENTS", "Security and Privacy Requirements", "SOFTWARE TEST REQUIREMENTS",
+    "Qualification Provisions", "DESIGN CONSTRAINTS", "GENERAL CONSTRAINTS",
+    "REQUIREMENTS TRACEABILITY", "Traceability Matrix", "NOTES", "APPENDIX A", "Glossary",
+]
+
+
+def _headings(sections_file, count, seed=0):
+    if sections_file:
+        with open(sections_file, "r", encoding="utf-8") as f:
+            base = [clean_heading(h) for h in json.load(f) if h != "Cover Page"]
+    else:
+        base = list(HEADINGS)
+    rng = random.Random(seed)
+    # numbered variants so the throughput run sees the spread of lengths real documents have
+    out = [f"{n} {h}" for n, h in enumerate(base, start=1)]
+    while len(out) < count:
+        out.append(f"{rng.randint(1, 20)}.{rng.randint(1, 9)} {rng.choice(base)}")
+    return out[:max(count, len(base))]
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True, help="sentence-transformers model folder")
+    parser.add_argument("--sections", help="*_sections.json to take the headings from")
+    parser.add_argument("--count", type=int, default=400, help="number of headings to encode")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    headings = _headings(args.sections, args.count)
+    results = {}
+    for backend in ("torch", "onnx"):
+        start = time.perf_counter()
+        model = load_embedding_model(args.model, backend)
+        load_time = time.perf_counter() - start
+        encode_normalized(model, headings[:8])  # warm-up
+        t_encode, vectors = _time(lambda: encode_normalized(model, headings), args.repeat)
+        scores = semantic_scores(model, embedding_model_id(args.model, backend), headings, TARGET_KEYS)
+        results[backend] = (load_time, t_encode, vectors, best_matches(scores))
+
+    print(f"{len(headings)} headings x {len(TARGET_KEYS)} targets (best of {args.repeat})")
+    for backend, (load_time, t_encode, _, _) in results.items():
+        print(f"  {backend:5s}  load {load_time:6.2f} s   encode {t_encode * 1000:8.1f} ms"
+              f"  ({len(headings) / t_encode:8.0f} headings/s)")
+
+    torch_vecs, onnx_vecs = results["torch"][2], results["onnx"][2]
+    cosine = np.sum(torch_vecs * onnx_vecs, axis=1)
+    torch_best, onnx_best = results["torch"][3], results["onnx"][3]
+    agree = sum(a == b for a, b in zip(torch_best, onnx_best))
+    print(f"  torch vs onnx cosine  : mean {cosine.mean():.4f}, min {cosine.min():.4f}")
+    print(f"  same mapped target    : {agree}/{len(headings)} ({100 * agree / len(headings):.1f}%)")
+    for heading, a, b in sorted({(h, a, b) for h, a, b in zip(headings, torch_best, onnx_best) if a != b}):
+        print(f"    {heading!r}: torch -> {TARGET_KEYS[a]!r}, onnx -> {TARGET_KEYS[b]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: Ollama prompt-cache reuse with the stable-prefix checklist layout (prompt_templates).
+
+Asks the sub-questions of each main question against one document context twice:
+
+    varying   the old layout: checklist item before the document, default request options
+    stable    checklist_prompt() + generate_payload(): document first, keep_alive, fixed num_ctx
+
+and reports what Ollama says it prefilled (prompt_eval_count / prompt_eval_duration of the
+/api/generate responses) next to the wall time. With the stable layout only the first prompt
+of a question should evaluate the whole document; the rest evaluate the checklist item.
+
+    python bench_prompt_cache.py --md logs/<run>/cropped_doc_with_desc.md --questions questions_data2.json
+    python bench_prompt_cache.py --md doc_with_desc.md --limit 3 --model glm4:latest
+"""
+import argparse
+import json
+import time
+
+from ollama_client import OLLAMA_HOST, default_client
+from prompt_templates import checklist_prompt, generate_payload
+
+
+def varying_prompt(content, instruction):
+    """The pre-cache layout: the part that changes comes first, so no two prompts share a prefix."""
+    return f"""Now, follow the checklist below carefully:
+{instruction}
+
+#########################
+Text: {content}
+#########################
+
+Respond in **JSON** format as:
+{{"Answer": "Yes" / "Partially Yes" / "No", "Reason": "40-60 words"}}
+"""
+
+
+def split_items(text):
+    return [item.strip() for item in text.split("\n\n") if item.strip()]
+
+
+def run(host, payloads):
+    client = default_client(host)
+    totals = {"calls": 0, "prompt_tokens": 0, "prompt_seconds": 0.0, "wall_seconds": 0.0}
+    for payload in payloads:
+        start = time.perf_counter()
+        result = client.request("/api/generate", payload)
+        totals["wall_seconds"] += time.perf_counter() - start
+        totals["calls"] += 1
+        totals["prompt_tokens"] += result.get("prompt_eval_count", 0)
+        totals["prompt_seconds"] += result.get("prompt_eval_duration", 0) / 1e9
+    return totals
+
+
+def report(name, totals):
+    per_call = totals["wall_seconds"] / max(totals["calls"], 1)
+    print(f"  {name:8s} {totals['calls']:4d} calls  prefilled {totals['prompt_tokens']:8d} tokens "
+          f"in {totals['prompt_seconds']:7.1f}s   wall {totals['wall_seconds']:7.1f}s ({per_call:.1f}s per call)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--md", required=True, help="markdown with image descriptions")
+    parser.add_argument("--questions", default="questions_data2.json")
+    parser.add_argument("--limit", type=int, default=3, help="only the first N main questions (0: all)")
+    parser.add_argument("--max-words", type=int, default=2500)
+    parser.add_argument("--host", default=OLLAMA_HOST)
+    parser.add_argument("--model", default="glm4:latest")
+    args = parser.parse_args()
+
+    with open(args.md, "r", encoding="utf-8") as f:
+        content = " ".join(f.read().split(" ")[:args.max_words])
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    if args.limit:
+        questions = questions[:args.limit]
+    instructions = [ins for q in questions
+                    for ins in split_items(q["special_instructions"])[:len(split_items(q["sub_questions"]))]]
+
+    varying = [{"model": args.model, "prompt": varying_prompt(content, ins), "stream": False,
+                "options": {"temperature": 0.1}} for ins in instructions]
+    stable = [generate_payload(args.model, checklist_prompt(content, ins)) for ins in instructions]
+
+    print(f"{len(questions)} main questions, {len(instructions)} sub-questions, {args.model}")
+    report("varying", run(args.host, varying))
+    report("stable", run(args.host, stable))
+
+
+if __name__ == "__main__":
+    main()
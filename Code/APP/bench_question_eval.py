@@ -0,0 +1,85 @@
+"""
+Benchmark: one LLM call per sub-question vs. one batched call per main question (question_eval).
+
+Runs the question bank against a markdown document (e.g. a run's *_with_desc.md) through a
+local Ollama server in both modes and reports LLM calls, fallback calls, wall time and how
+often the two modes give the same answer. The document is cut to --max-words words so both
+modes see the same, model-sized context. With --workers N the single mode is run once more
+through eval_engine with N concurrent calls, to compare its wall time with the sequential run.
+
+    python bench_question_eval.py --md logs/<run>/cropped_doc_with_desc.md --questions questions_data2.json
+    python bench_question_eval.py --md doc_with_desc.md --limit 5 --model glm4:latest
+    python bench_question_eval.py --md doc_with_desc.md --workers 4
+"""
+import argparse
+import json
+import time
+
+from eval_engine import EvalEngine, QuestionJob
+from ollama_client import OLLAMA_HOST, default_client
+from question_eval import EvalStats, evaluate_batched, evaluate_single
+
+
+def ollama_query(host, model):
+    client = default_client(host)
+
+    def query(prompt):
+        return client.generate(model, prompt, options={"temperature": 0.1})
+    return query
+
+
+def split_items(text):
+    return [item.strip() for item in text.split("\n\n") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--md", required=True, help="markdown with image descriptions")
+    parser.add_argument("--questions", default="questions_data2.json")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N main questions (0: all)")
+    parser.add_argument("--max-words", type=int, default=2500)
+    parser.add_argument("--host", default=OLLAMA_HOST)
+    parser.add_argument("--model", default="glm4:latest")
+    parser.add_argument("--workers", type=int, default=0, help="also run the single mode with N concurrent calls")
+    args = parser.parse_args()
+
+    with open(args.md, "r", encoding="utf-8") as f:
+        content = " ".join(f.read().split(" ")[:args.max_words])
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    if args.limit:
+        questions = questions[:args.limit]
+
+    query = ollama_query(args.host, args.model)
+    single, batched = EvalStats("single"), EvalStats("batched")
+    agree = total = 0
+    start = time.perf_counter()
+    for q in questions:
+        instructions = split_items(q["special_instructions"])[:len(split_items(q["sub_questions"]))]
+        a = evaluate_single(query, content, instructions, single)
+        b = evaluate_batched(query, content, instructions, batched)
+        agree += sum(x["Answer"] == y["Answer"] for x, y in zip(a, b))
+        total += len(instructions)
+        print(f"  {q['question'][:60]!r}: {[x['Answer'] for x in a]} vs {[y['Answer'] for y in b]}")
+
+    sequential = time.perf_counter() - start
+    print(f"{len(questions)} main questions, {total} sub-questions, {args.model}")
+    print(f"  {single.summary()}")
+    print(f"  {batched.summary()}")
+    if batched.seconds:
+        print(f"  speed-up {single.seconds / batched.seconds:.2f}x, "
+              f"{single.calls - batched.calls} fewer calls, same answer {agree}/{total}")
+
+    if args.workers:
+        jobs = [QuestionJob(n, q["question"], split_items(q["sub_questions"]), split_items(q["special_instructions"]),
+                            content) for n, q in enumerate(questions, start=1)]
+        engine = EvalEngine(query, workers=args.workers, mode="single")
+        for _ in engine.run(jobs):
+            pass
+        print(f"  {engine.stats.summary()}")
+        print(f"  sequential single + batched {sequential:.1f}s; concurrent single mode "
+              f"{single.seconds / max(engine.stats.wall_seconds, 1e-9):.2f}x faster than sequential single")
+
+
+if __name__ == "__main__":
+    main()
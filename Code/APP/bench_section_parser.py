@@ -0,0 +1,137 @@
+"""
+Benchmark: section_parser.parse_sections vs. the old heading_extraction + content_extraction.
+
+Generates a synthetic SRS markdown of roughly `--pages` pages (docling output: numbered
+top-level headings, sub-headings, paragraphs, tables and image descriptions), runs both
+implementations, checks that they return the same sections and prints the timings.
+
+    python bench_section_parser.py --pages 400 --repeat 5
+"""
+import argparse
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from section_parser import parse_sections, read_sections
+
+LINES_PER_PAGE = 45
+
+
+# The pre-section_parser implementations, kept here as the reference.
+def legacy_heading_extraction(path):
+    heading = []
+    with open(path, "r", encoding="utf-8") as f:
+        i = 1
+        pattern1 = re.compile(rf"^## {i} ")
+        pattern2 = re.compile(rf"^## {i}\. ")
+        pattern3 = re.compile(rf"^## {i}\) ")
+        for line in f:
+            if pattern1.match(line) or pattern2.match(line) or pattern3.match(line):
+                heading.append(line)
+                i += 1
+                pattern1 = re.compile(rf"^## {i} ")
+                pattern2 = re.compile(rf"^## {i}\. ")
+                pattern3 = re.compile(rf"^## {i}\) ")
+    return heading
+
+
+def legacy_content_extraction(path, heading):
+    section = {}
+    with open(path, "r", encoding="utf-8") as f:
+        section_content = ""
+        counter = False
+        i = 0
+        for line in f:
+            if line == heading[i]:
+                if counter:
+                    section[heading[i]] = section_content
+                section_content = line
+                counter = True
+            elif counter:
+                if i + 1 < len(heading) and line == heading[i+1]:
+                    section[heading[i]] = section_content
+                    section_content = line
+                    i += 1
+                else:
+                    section_content = section_content + line
+        if counter and i < len(heading):
+            section[heading[i]] = section_content
+    with open(path, "r", encoding="utf-8") as f:
+        section_content = ""
+        i = 0
+        for line in f:
+            if i < 50:
+                section_content = section_content + line
+                i = i + 1
+            else:
+                section['Cover Page'] = section_content
+                break
+    return section
+
+
+def synthetic_srs(pages: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    titles = ["Introduction", "Applicable Documents", "Requirements", "System Overview",
+              "Interface Requirements", "Performance", "Environmental Conditions", "Safety",
+              "Qualification Provisions", "Requirements Traceability", "Notes", "Appendix"]
+    words = ("the system shall provide interface data rate power mode telemetry command "
+             "status fault redundancy within ms accuracy temperature range operational").split()
+    lines = ["# SOFTWARE REQUIREMENTS SPECIFICATION", "", "Document No: XYZ-SRS-001", ""]
+    total = pages * LINES_PER_PAGE
+    # a few very long sections, as in real SRS documents (requirements chapters)
+    weights = [rng.choice([1, 1, 2, 8]) for _ in titles]
+    budget = [int(total * w / sum(weights)) for w in weights]
+    for n, (title, n_lines) in enumerate(zip(titles, budget), start=1):
+        lines += [f"## {n}{rng.choice(['', '.', ')'])} {title.upper()}", ""]
+        for k in range(n_lines):
+            r = rng.random()
+            if r < 0.05:
+                lines.append(f"### {n}.{k} {rng.choice(words).title()} {rng.choice(words)}")
+            elif r < 0.2:
+                lines.append("| " + " | ".join(rng.choices(words, k=5)) + " |")
+            elif r < 0.22:
+                lines.append("**Image Description:** " + " ".join(rng.choices(words, k=60)))
+            else:
+                lines.append(" ".join(rng.choices(words, k=rng.randint(8, 20))))
+    return "\n".join(lines) + "\n"
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        md_file = Path(tmp) / "synthetic_with_desc.md"
+        md_file.write_text(synthetic_srs(args.pages), encoding="utf-8")
+        size_mb = md_file.stat().st_size / 1e6
+
+        t_old, old = _time(lambda: legacy_content_extraction(md_file, legacy_heading_extraction(md_file)), args.repeat)
+        t_new, new = _time(lambda: read_sections(md_file), args.repeat)
+
+        def offsets_only():
+            with parse_sections(md_file) as parsed:
+                return len(parsed)
+        t_scan, _ = _time(offsets_only, args.repeat)
+
+    assert old == new, "section_parser output differs from content_extraction"
+    print(f"{args.pages} pages, {size_mb:.1f} MB, {len(new) - 1} sections (best of {args.repeat})")
+    print(f"  heading_extraction + content_extraction : {t_old * 1000:8.1f} ms")
+    print(f"  parse_sections + to_dict               : {t_new * 1000:8.1f} ms  ({t_old / t_new:.1f}x)")
+    print(f"  parse_sections (offsets only)          : {t_scan * 1000:8.1f} ms  ({t_old / t_scan:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Repeated-boilerplate detection.
+
+The fixed header/footer crop misses document-control blocks, classification banners and
+revision footers that sit inside the page body. Those lines then end up in every section
+that is sent to the LLM. find_repeated_lines() makes one pass over the fitz text blocks at
+the top and bottom of every page (EDGE_BAND) and counts on how many pages each normalised
+line occurs; lines that repeat there on a large share of the pages are treated as
+boilerplate. Only page and revision counters ("Page 3 of 40", "Rev 2") are normalised, so
+requirement IDs and table rows such as "SRS-FR-012" or "Priority: High" stay distinct.
+
+strip_boilerplate() removes those lines from the docling markdown before it is used
+downstream, and records how many tokens were removed under each top-level heading, so
+tokens_removed_per_section() can report the savings per mapped section.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Set, Tuple, Union
+
+import fitz
+
+logger = logging.getLogger(__name__)
+
+MIN_PAGE_RATIO = 0.4
+MIN_PAGES = 3
+MIN_SIGNATURE_LEN = 4
+EDGE_BAND = 0.2  # share of the page height at the top and at the bottom where headers/footers sit
+
+_TOP_HEADING = re.compile(r"^##\s*\d+[\.)]?\s")
+_MD_PREFIX = re.compile(r"^\s*(#+|[-*+]|\d+\.)\s+")
+# counters that change from page to page or between issues; every other digit is kept
+_PAGE_COUNTER = re.compile(r"\bpage\s*\d+(\s*(of|/)\s*\d+)?\b")
+_REVISION_COUNTER = re.compile(r"\b(rev|revision|version|issue)\.?\s*:?\s*\d+(\.\d+)*[a-z]?\b")
+_BARE_COUNTER = re.compile(r"^\d+(\s*(of|/)\s*\d+)?$")
+
+
+def line_signature(text: str) -> str:
+    """Normalise a line so that page numbers and revision counters compare equal."""
+    text = _MD_PREFIX.sub("", text)
+    text = text.replace("**", "").replace("|", " ").lower()
+    text = re.sub(r"\s+", " ", text).strip(" .:-_")
+    text = _PAGE_COUNTER.sub("page #", text)
+    text = _REVISION_COUNTER.sub(lambda m: f"{m.group(1)} #", text)
+    return _BARE_COUNTER.sub("#", text)
+
+
+def count_tokens(text: str) -> int:
+    """Whitespace token count; cheap and tokenizer independent."""
+    return len(text.split())
+
+
+def find_repeated_lines(
+    pdf: Union[bytes, str, Path, "fitz.Document"], min_page_ratio: float = MIN_PAGE_RATIO, min_pages: int = MIN_PAGES
+) -> Set[str]:
+    """Return the signatures of top/bottom-of-page lines that occur on at least `min_page_ratio` of the pages."""
+    if isinstance(pdf, fitz.Document):
+        doc = pdf
+    elif isinstance(pdf, (bytes, bytearray)):
+        doc = fitz.open(stream=pdf, filetype="pdf")
+    else:
+        doc = fitz.open(str(pdf))
+
+    try:
+        page_counts: Counter = Counter()
+        for page in doc:
+            signatures = set()
+            rect = page.rect
+            top, bottom = rect.y0 + EDGE_BAND * rect.height, rect.y1 - EDGE_BAND * rect.height
+            for block in page.get_text("blocks"):
+                if block[6] != 0:  # image block
+                    continue
+                if block[1] > top and block[3] < bottom:  # body text, not a header or footer
+                    continue
+                for line in block[4].splitlines():
+                    sig = line_signature(line)
+                    if len(sig) >= MIN_SIGNATURE_LEN:
+                        signatures.add(sig)
+            page_counts.update(signatures)
+        threshold = max(min_pages, math.ceil(min_page_ratio * doc.page_count))
+    finally:
+        if doc is not pdf:
+            doc.close()
+
+    return {sig for sig, count in page_counts.items() if count >= threshold}
+
+
+def strip_boilerplate(markdown: str, signatures: Iterable[str]) -> Tuple[str, Dict[str, int]]:
+    """Drop markdown lines whose signature is boilerplate.
+
+    Returns the cleaned markdown and the number of removed tokens per top-level heading line
+    ("Cover Page" for anything before the first heading).
+    """
+    signatures = set(signatures)
+    if not signatures:
+        return markdown, {}
+
+    kept = []
+    removed: Dict[str, int] = {}
+    current = "Cover Page"
+    for line in markdown.splitlines(keepends=True):
+        if _TOP_HEADING.match(line):
+            current = line.rstrip("\n")
+        elif line.strip() and line_signature(line) in signatures:
+            removed[current] = removed.get(current, 0) + count_tokens(line)
+            continue
+        kept.append(line)
+    return "".join(kept), removed
+
+
+def strip_boilerplate_file(md_file: Path, pdf, report_file: Path) -> Dict[str, object]:
+    """Detect boilerplate in `pdf`, strip it from `md_file` in place and write a JSON report."""
+    signatures = find_repeated_lines(pdf)
+    text, removed = strip_boilerplate(md_file.read_text(encoding="utf-8"), signatures)
+    md_file.write_text(text, encoding="utf-8")
+
+    report = {
+        "signatures": sorted(signatures),
+        "removed_tokens_by_heading": removed,
+        "removed_tokens_total": sum(removed.values()),
+    }
+    report_file.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info(
+        "[boilerplate] %d repeated line(s), %d tokens removed from %s",
+        len(signatures), report["removed_tokens_total"], md_file,
+    )
+    return report
+
+
+def tokens_removed_per_section(mapped_sections: Dict[str, object], removed_by_heading: Dict[str, int]) -> Dict[str, int]:
+    """Attribute removed tokens to the mapped target keys whose content holds the heading."""
+    per_section: Dict[str, int] = {}
+    for target, value in mapped_sections.items():
+        if not isinstance(value, dict) or not value.get("content"):
+            continue
+        if target == "Cover Page":
+            total = removed_by_heading.get("Cover Page", 0)
+        else:
+            lines = set(line.rstrip("\n") for line in value["content"].splitlines())
+            total = sum(n for heading, n in removed_by_heading.items() if heading in lines)
+        if total:
+            per_section[target] = total
+    return per_section
@@ -0,0 +1,176 @@
+"""
+Process-wide pool of warm docling DocumentConverters.
+
+Building a DocumentConverter and running its first conversion loads the layout, table
+and OCR models from disk, which costs several seconds per document. This module keeps
+converters alive for the lifetime of the process, keyed by their pipeline options, so
+the Streamlit apps and the oct8 CLI only pay that cost once.
+
+Usage:
+    conv_res = convert(pdf_path, ConverterOptions(images_scale=2.0))
+    print(converter_stats())
+
+A pool entry holds at most POOL_SIZE converters per option set (DOCLING_CONVERTER_POOL_SIZE,
+default 1). Threads lease a converter exclusively for the duration of one conversion and
+wait when all converters of that option set are busy, so the pool is safe to use from
+worker threads.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional
+
+try:
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions, EasyOcrOptions
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    DOC_LING_AVAILABLE = True
+except Exception:
+    InputFormat = None  # type: ignore
+    PdfPipelineOptions = None  # type: ignore
+    EasyOcrOptions = None  # type: ignore
+    DocumentConverter = None  # type: ignore
+    PdfFormatOption = None  # type: ignore
+    DOC_LING_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.environ.get("DOCLING_CONVERTER_POOL_SIZE", "1"))
+
+
+@dataclass(frozen=True)
+class ConverterOptions:
+    """Hashable subset of PdfPipelineOptions used as the pool key."""
+
+    images_scale: float = 2.0
+    generate_page_images: bool = True
+    generate_picture_images: bool = True
+    do_ocr: bool = True
+
+
+class _PoolEntry:
+    def __init__(self, options: ConverterOptions, max_size: int):
+        self.options = options
+        self.max_size = max(1, max_size)
+        self.idle: List[object] = []
+        self.created = 0
+        self.cond = threading.Condition()
+        self.load_seconds = 0.0
+        self.convert_seconds = 0.0
+        self.conversions = 0
+
+
+_pools: Dict[ConverterOptions, _PoolEntry] = {}
+_pools_lock = threading.Lock()
+
+
+def _build_converter(options: ConverterOptions):
+    pipeline_options = PdfPipelineOptions(
+        images_scale=options.images_scale,
+        generate_page_images=options.generate_page_images,
+        generate_picture_images=options.generate_picture_images,
+        do_ocr=options.do_ocr,
+        ocr_options=EasyOcrOptions(),
+    )
+    converter = DocumentConverter(
+        format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
+    )
+    # Load the layout/table/OCR models now instead of inside the first convert() call,
+    # so model load time is measured separately from conversion time.
+    initialize = getattr(converter, "initialize_pipeline", None)
+    if initialize is not None:
+        initialize(InputFormat.PDF)
+    return converter
+
+
+def _get_entry(options: ConverterOptions) -> _PoolEntry:
+    with _pools_lock:
+        entry = _pools.get(options)
+        if entry is None:
+            entry = _PoolEntry(options, POOL_SIZE)
+            _pools[options] = entry
+        return entry
+
+
+@contextmanager
+def lease_converter(options: ConverterOptions = ConverterOptions(), timeout: Optional[float] = None) -> Iterator[object]:
+    """Borrow a warm converter for `options`, building one if the pool is not full yet."""
+    if not DOC_LING_AVAILABLE:
+        raise RuntimeError("docling dependencies are missing. Install docling_core and related packages.")
+
+    entry = _get_entry(options)
+    converter = None
+    build = False
+    with entry.cond:
+        while converter is None and not build:
+            if entry.idle:
+                converter = entry.idle.pop()
+            elif entry.created < entry.max_size:
+                entry.created += 1
+                build = True
+            elif not entry.cond.wait(timeout):
+                raise TimeoutError(f"No docling converter available for {options} after {timeout}s")
+
+    if build:
+        start = time.time()
+        try:
+            converter = _build_converter(options)
+        except Exception:
+            with entry.cond:
+                entry.created -= 1
+                entry.cond.notify()
+            raise
+        elapsed = time.time() - start
+        with entry.cond:
+            entry.load_seconds += elapsed
+        logger.info("[converter_pool] Built converter for %s (model load %.2fs)", options, elapsed)
+
+    try:
+        yield converter
+    finally:
+        with entry.cond:
+            entry.idle.append(converter)
+            entry.cond.notify()
+
+
+def convert(source, options: ConverterOptions = ConverterOptions(), **kwargs):
+    """Convert `source` (path or DocumentStream) with a pooled converter and record the timing."""
+    entry = _get_entry(options)
+    with lease_converter(options) as converter:
+        start = time.time()
+        conv_res = converter.convert(source, **kwargs)
+        elapsed = time.time() - start
+    with entry.cond:
+        entry.convert_seconds += elapsed
+        entry.conversions += 1
+    logger.info("[converter_pool] Converted %s in %.2fs", getattr(source, "name", source), elapsed)
+    return conv_res
+
+
+def warm_up(options: ConverterOptions = ConverterOptions()) -> None:
+    """Build (and load the models of) one converter ahead of the first document."""
+    with lease_converter(options):
+        pass
+
+
+def converter_stats() -> List[Dict[str, object]]:
+    """Model-load vs conversion time per option set since process start."""
+    with _pools_lock:
+        entries = list(_pools.values())
+    stats = []
+    for entry in entries:
+        with entry.cond:
+            stats.append({
+                "options": asdict(entry.options),
+                "converters": entry.created,
+                "idle": len(entry.idle),
+                "load_seconds": round(entry.load_seconds, 3),
+                "convert_seconds": round(entry.convert_seconds, 3),
+                "conversions": entry.conversions,
+            })
+    return stats
@@ -0,0 +1,173 @@
+"""
+Persistent cross-document cache for vision-model image descriptions.
+
+The same interface and block diagrams appear in every revision of a programme's SRS, but the
+pipeline cache (pipeline_cache.py) only helps when the whole PDF is unchanged. This cache is
+keyed by (image content SHA-256, vision model, prompt SHA-256) and lives in one SQLite file
+shared by all runs, so describe_image_folder() only calls Ollama for images it has never seen.
+
+Entries are evicted least-recently-used first once the stored descriptions exceed
+`max_bytes`. Hit/miss counters are kept per process (DescriptionCache.stats) and summed
+across runs in the `counters` table.
+
+Configure with SRS_DESC_CACHE (file path, empty to disable) and SRS_DESC_CACHE_MAX_MB.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from pipeline_cache import CACHE_DIR, sha256_bytes
+
+logger = logging.getLogger(__name__)
+
+DESC_CACHE_PATH = os.environ.get("SRS_DESC_CACHE", str(CACHE_DIR / "image_descriptions.sqlite"))
+DESC_CACHE_MAX_BYTES = int(float(os.environ.get("SRS_DESC_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS descriptions (
+    image_sha   TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    prompt_sha  TEXT NOT NULL,
+    description TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    last_used   REAL NOT NULL,
+    PRIMARY KEY (image_sha, model, prompt_sha)
+);
+CREATE INDEX IF NOT EXISTS descriptions_last_used ON descriptions (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def prompt_hash(prompt: str) -> str:
+    return sha256_bytes(prompt.encode("utf-8"))
+
+
+class DescriptionCache:
+    """SQLite-backed (image sha, model, prompt) -> description store; safe to share between threads."""
+
+    def __init__(self, path: Union[str, Path] = DESC_CACHE_PATH, max_bytes: int = DESC_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, image_sha: str, model: str, prompt: str) -> Optional[str]:
+        found = self.get_many([image_sha], model, prompt)
+        return found.get(image_sha)
+
+    def get_many(self, image_shas: Iterable[str], model: str, prompt: str) -> Dict[str, str]:
+        """Look up several images at once; returns {image_sha: description} for the hits."""
+        image_shas = list(dict.fromkeys(image_shas))
+        p_sha = prompt_hash(prompt)
+        found: Dict[str, str] = {}
+        with self._lock:
+            for sha in image_shas:
+                row = self._conn.execute(
+                    "SELECT description FROM descriptions WHERE image_sha=? AND model=? AND prompt_sha=?",
+                    (sha, model, p_sha),
+                ).fetchone()
+                if row:
+                    found[sha] = row[0]
+            if found:
+                self._conn.executemany(
+                    "UPDATE descriptions SET last_used=? WHERE image_sha=? AND model=? AND prompt_sha=?",
+                    [(time.time(), sha, model, p_sha) for sha in found],
+                )
+            hits, misses = len(found), len(image_shas) - len(found)
+            self.hits += hits
+            self.misses += misses
+            self._bump_counters({"hits": hits, "misses": misses})
+            self._conn.commit()
+        return found
+
+    def put(self, image_sha: str, model: str, prompt: str, description: str) -> None:
+        self.put_many([(image_sha, description)], model, prompt)
+
+    def put_many(self, items: Iterable[Tuple[str, str]], model: str, prompt: str) -> None:
+        p_sha = prompt_hash(prompt)
+        now = time.time()
+        rows = [(sha, model, p_sha, desc, len(desc.encode("utf-8")), now, now) for sha, desc in items if desc]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO descriptions "
+                "(image_sha, model, prompt_sha, description, size, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM descriptions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        evicted = 0
+        for rowid, size in self._conn.execute("SELECT rowid, size FROM descriptions ORDER BY last_used").fetchall():
+            if excess <= 0:
+                break
+            self._conn.execute("DELETE FROM descriptions WHERE rowid=?", (rowid,))
+            excess -= size
+            evicted += 1
+        self.evictions += evicted
+        self._bump_counters({"evictions": evicted})
+        logger.info("[description_cache] Evicted %d entries to stay under %d bytes", evicted, self.max_bytes)
+
+    def _bump_counters(self, deltas: Dict[str, int]) -> None:
+        self._conn.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, n) for name, n in deltas.items() if n],
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for this process plus the lifetime totals stored in the database."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM descriptions").fetchone()
+            lifetime = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+            "lifetime_hits": lifetime.get("hits", 0),
+            "lifetime_misses": lifetime.get("misses", 0),
+            "lifetime_evictions": lifetime.get("evictions", 0),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[DescriptionCache] = None
+_default_lock = threading.Lock()
+
+
+def default_description_cache() -> Optional[DescriptionCache]:
+    """Process-wide cache at DESC_CACHE_PATH, or None when SRS_DESC_CACHE is set to ""."""
+    global _default_cache
+    if not DESC_CACHE_PATH:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DescriptionCache(DESC_CACHE_PATH, DESC_CACHE_MAX_BYTES)
+        return _default_cache
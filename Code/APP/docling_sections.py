@@ -0,0 +1,181 @@
+"""
+Sections straight from the DoclingDocument.
+
+The markdown route exports conv_res.document to disk and then has section_parser rebuild
+the structure with a "## <n>" regex. docling already knows which items are section headers,
+tables, list items and pictures, and on which page each one sits. document_sections()
+walks document.iterate_items() once and produces
+
+    sections      {"## <heading>\\n": markdown content, ..., "Cover Page": ...}, the same shape
+                  as section_parser.read_sections(), with image descriptions inserted
+    pictures      where every picture sits (number, section, page, caption)
+    pages         first/last page of every section
+
+md_extract saves the document (without the rendered images) as docling_document.json. For
+page-parallel conversions it holds one part per chunk with the chunk's page offset.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from docling_core.types.doc import (
+    DoclingDocument,
+    ListItem,
+    PictureItem,
+    SectionHeaderItem,
+    TableItem,
+    TextItem,
+    TitleItem,
+)
+
+from boilerplate import line_signature
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_FILE = "docling_document.json"
+COVER_PAGE = "Cover Page"
+COVER_PAGE_LINES = 50
+
+# a top-level heading is numbered with a single component: "1 Introduction", "2. Acronyms", "3) ..."
+_TOP_LEVEL = re.compile(r"^(\d+)[\.)]?\s+\S")
+# a heading may skip this many numbers (a section docling didn't tag as a header); a larger
+# jump is a stray number ("6407 VSH CC SRS", a year, "100 ms ...") and must not end the splitting
+MAX_SECTION_SKIP = 1
+
+
+@dataclass
+class PicturePosition:
+    number: int  # matches the exported image file name (1.png, 2.png, ...)
+    section: str
+    page: Optional[int]
+    caption: str = ""
+
+
+@dataclass
+class DocumentSections:
+    sections: Dict[str, str]
+    pictures: List[PicturePosition] = field(default_factory=list)
+    pages: Dict[str, List[int]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"pictures": [asdict(p) for p in self.pictures], "pages": self.pages}
+
+
+def document_payload(document: DoclingDocument) -> Dict[str, object]:
+    """Serialisable document without the rendered page / picture images (those are exported separately)."""
+    for picture in document.pictures:
+        picture.image = None
+    for page in document.pages.values():
+        page.image = None
+    return document.export_to_dict()
+
+
+def write_document_parts(parts: Sequence[Tuple[int, Dict[str, object]]], output_file: Path) -> Path:
+    """Save [(page_offset, document_payload), ...] in conversion order."""
+    data = [{"page_offset": offset, "document": payload} for offset, payload in parts]
+    output_file.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return output_file
+
+
+def load_document_parts(input_file: Path) -> List[Tuple[int, DoclingDocument]]:
+    data = json.loads(Path(input_file).read_text(encoding="utf-8"))
+    return [(part["page_offset"], DoclingDocument.model_validate(part["document"])) for part in data]
+
+
+def _page_of(item) -> Optional[int]:
+    prov = getattr(item, "prov", None)
+    return prov[0].page_no if prov else None
+
+
+def _item_markdown(item, document: DoclingDocument) -> Optional[str]:
+    # same rendering as docling's markdown export for the items the pipeline cares about
+    if isinstance(item, TableItem):
+        return item.export_to_markdown(doc=document)
+    if isinstance(item, TitleItem):
+        return f"# {item.text}"
+    if isinstance(item, SectionHeaderItem):
+        return f"## {item.text}"
+    if isinstance(item, ListItem):
+        return f"- {item.text}"
+    if isinstance(item, TextItem):
+        return item.text
+    return None
+
+
+def document_sections(
+    parts: Iterable[Tuple[int, DoclingDocument]],
+    descriptions: Optional[Dict[int, str]] = None,
+    boilerplate: Iterable[str] = (),
+) -> DocumentSections:
+    """Walk the document(s) once and split them at the numbered top-level section headers.
+
+    `descriptions` maps picture numbers to their image descriptions (pictures without one keep
+    docling's "<!-- image -->" placeholder); text items whose boilerplate.line_signature is in
+    `boilerplate` are dropped.
+    """
+    descriptions = descriptions or {}
+    boilerplate = set(boilerplate)
+    blocks: Dict[str, List[str]] = {COVER_PAGE: []}
+    pages: Dict[str, Set[int]] = {COVER_PAGE: set()}
+    pictures: List[PicturePosition] = []
+    current = COVER_PAGE
+    last_number = 0
+    pic_count = 0
+    n_parts = 0
+
+    for page_offset, document in parts:
+        n_parts += 1
+        for item, _level in document.iterate_items():
+            page = _page_of(item)
+            if page is not None:
+                page += page_offset
+
+            if isinstance(item, SectionHeaderItem):
+                m = _TOP_LEVEL.match(item.text)
+                if m and last_number < int(m.group(1)) <= last_number + 1 + MAX_SECTION_SKIP:
+                    last_number = int(m.group(1))
+                    current = f"## {item.text}\n"
+                    blocks[current] = []
+                    pages[current] = set()
+
+            if page is not None:
+                pages[current].add(page)
+
+            if isinstance(item, PictureItem):
+                pic_count += 1
+                pictures.append(PicturePosition(pic_count, current, page, item.caption_text(document)))
+                blocks[current].append(descriptions.get(pic_count) or "<!-- image -->")
+                continue
+
+            text = _item_markdown(item, document)
+            if not text:
+                continue
+            if boilerplate and not isinstance(item, (TableItem, SectionHeaderItem)) \
+                    and line_signature(text) in boilerplate:
+                continue
+            blocks[current].append(text)
+
+    cover = blocks.pop(COVER_PAGE)
+    sections = {heading: "\n\n".join(lines) + "\n\n" for heading, lines in blocks.items()}
+    sections[COVER_PAGE] = "\n".join("\n\n".join(cover).splitlines()[:COVER_PAGE_LINES])
+    page_ranges = {key: [min(p), max(p)] for key, p in pages.items() if p}
+
+    logger.info(
+        "[docling_sections] %d sections, %d pictures from %d document part(s)",
+        len(sections) - 1, len(pictures), n_parts,
+    )
+    return DocumentSections(sections, pictures, page_ranges)
+
+
+def descriptions_by_number(image_descriptions: Sequence[Dict[str, str]]) -> Dict[int, str]:
+    """image_descriptions.json entries -> {picture number: description}."""
+    return {
+        int(Path(entry["image"]).stem): entry["description"]
+        for entry in image_descriptions
+        if Path(entry["image"]).stem.isdigit()
+    }
@@ -0,0 +1,143 @@
+"""
+Concurrent evaluation of the question bank: sub-question calls go out in parallel, results come back in order.
+
+Verify SRS asked the 18 main questions and their sub-questions one call at a time from the
+Streamlit script thread, so the Ollama host idled between a reply and the next request.
+EvalEngine.run() submits every call of every main question to a thread pool of EVAL_WORKERS
+threads (one call per sub-question, or one per main question in EVAL_MODE=batched) and
+collects the replies in completion order. A main question is scored as soon as its last
+reply is in, but the QuestionResults are yielded in question order: a finished question
+waits until all questions before it are finished, so the table still grows row by row from
+question 1.
+
+Only the worker threads call query_fn; on_answer and everything the caller does with the
+yielded results runs in the calling thread, so Streamlit calls are safe there.
+
+Ollama runs at most OLLAMA_NUM_PARALLEL requests per model at a time and queues the rest;
+EVAL_WORKERS beyond that only lengthens the queue. EVAL_WORKERS=1 is the old sequential run.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from prompt_templates import checklist_prompt
+from question_eval import EVAL_MODE, EvalStats, evaluate_batched, parse_answer
+
+logger = logging.getLogger(__name__)
+
+EVAL_WORKERS = int(os.environ.get("EVAL_WORKERS", "4"))
+
+
+@dataclass
+class QuestionJob:
+    number: int  # Main No., 1-based
+    question: str
+    sub_questions: List[str]
+    instructions: List[str]
+    content: str
+    weights: Optional[List[float]] = None  # one per sub-question
+    main_weight: float = 0.0
+
+
+@dataclass
+class QuestionResult:
+    job: QuestionJob
+    answers: List[Dict[str, str]]
+    score: float = 0.0
+    warning: Optional[str] = None
+    results: List[int] = field(default_factory=list)  # 1 per "Yes", else 0
+
+    @property
+    def weighted(self) -> float:
+        return self.job.main_weight * self.score
+
+
+def weighted_score(weights: Optional[Sequence[float]], answers: Sequence[Dict[str, str]],
+                   number: int) -> Tuple[float, List[int], Optional[str]]:
+    """Sum of the weights of the "Yes" answers; 0 with a warning if the weights don't fit."""
+    results = [1 if answer["Answer"] == "Yes" else 0 for answer in answers]
+    if weights is None:
+        return 0.0, results, f"No weights defined for Main {number}"
+    if len(weights) != len(results):
+        return 0.0, results, f"Weight length mismatch for Main {number}"
+    return sum(w * r for w, r in zip(weights, results)), results, None
+
+
+class EvalEngine:
+    def __init__(self, query_fn: Callable[[str], str], stats: Optional[EvalStats] = None,
+                 workers: int = EVAL_WORKERS, mode: str = EVAL_MODE):
+        self.query_fn = query_fn
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.stats = stats if stats is not None else EvalStats(mode)
+        self.stats.workers = self.workers
+
+    def _ask(self, job: QuestionJob, j: int) -> Dict[str, str]:
+        with self.stats._lock:
+            self.stats.sub_questions += 1
+        return parse_answer(self.stats.query(self.query_fn, checklist_prompt(job.content, job.instructions[j])))
+
+    def _ask_batched(self, job: QuestionJob) -> List[Dict[str, str]]:
+        return evaluate_batched(self.query_fn, job.content, job.instructions[:len(job.sub_questions)], self.stats)
+
+    def _finish(self, job: QuestionJob, answers: List[Optional[Dict[str, str]]]) -> QuestionResult:
+        answers = [answer for answer in answers if answer is not None]
+        score, results, warning = weighted_score(job.weights, answers, job.number)
+        if warning:
+            logger.warning("[eval_engine] %s", warning)
+        return QuestionResult(job, answers, score, warning, results)
+
+    def run(self, jobs: Sequence[QuestionJob],
+            on_answer: Optional[Callable[[QuestionJob, int, Dict[str, str]], None]] = None
+            ) -> Iterator[QuestionResult]:
+        """QuestionResults in question order; on_answer(job, j, answer) is called in completion order."""
+        pending = {q: len(job.sub_questions) for q, job in enumerate(jobs)}
+        answers: List[List[Optional[Dict[str, str]]]] = [[None] * len(job.sub_questions) for job in jobs]
+        finished: Dict[int, QuestionResult] = {}
+        next_q = 0
+        start = time.perf_counter()
+
+        def in_order() -> Iterator[QuestionResult]:
+            nonlocal next_q
+            while next_q in finished:
+                yield finished.pop(next_q)
+                next_q += 1
+
+        # questions without sub-questions are done before they start
+        for q, job in enumerate(jobs):
+            if not pending[q]:
+                finished[q] = self._finish(job, [])
+        yield from in_order()
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="eval")
+        try:
+            # submitted in question order, so the first questions are answered (and shown) first
+            futures = {}
+            for q, job in enumerate(jobs):
+                if not pending[q]:
+                    continue
+                if self.mode == "batched":
+                    futures[pool.submit(self._ask_batched, job)] = (q, None)
+                else:
+                    for j in range(len(job.sub_questions)):
+                        futures[pool.submit(self._ask, job, j)] = (q, j)
+
+            for future in as_completed(futures):
+                q, j = futures[future]
+                reply = future.result()  # a failed call stops the run, as in the sequential loop
+                for k, answer in ([(j, reply)] if j is not None else enumerate(reply)):
+                    answers[q][k] = answer
+                    pending[q] -= 1
+                    if on_answer is not None:
+                        on_answer(jobs[q], k, answer)
+                if pending[q] <= 0 or j is None:
+                    finished[q] = self._finish(jobs[q], answers[q])
+                yield from in_order()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.stats.wall_seconds += time.perf_counter() - start
@@ -0,0 +1,79 @@
+"""
+Perceptual-hash deduplication of extracted images.
+
+Company logos, approval stamps and block diagrams repeated across sections all come out of
+md_extract as separate files. cluster_images() computes a 64-bit difference hash (dHash)
+per image and groups images whose hashes differ in at most `max_distance` bits, so each
+cluster only needs one vision-model call.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+MAX_HAMMING_DISTANCE = 6
+
+
+def dhash(image: Union[str, Path, Image.Image]) -> int:
+    """64-bit difference hash: compare horizontally adjacent pixels of a 9x8 grayscale thumbnail."""
+    img = image if isinstance(image, Image.Image) else Image.open(image)
+    small = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    px = np.asarray(small, dtype=np.int16)
+    bits = (px[:, 1:] > px[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def _hamming(hash_value: int, others: np.ndarray) -> np.ndarray:
+    xor = np.bitwise_xor(others, np.uint64(hash_value))
+    return np.unpackbits(xor.astype(">u8").view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def cluster_images(image_paths: Sequence[Union[str, Path]], max_distance: int = MAX_HAMMING_DISTANCE) -> List[List[str]]:
+    """Group near-duplicate images. Returns clusters of file names; the first member is the representative.
+
+    Clusters and their members keep the input order, so the representative is the first
+    occurrence in the document.
+    """
+    clusters: List[List[str]] = []
+    rep_hashes: List[int] = []  # hash of each hashable representative
+    rep_cluster: List[int] = []  # index into clusters for each entry of rep_hashes
+    for path in image_paths:
+        name = Path(path).name
+        try:
+            h = dhash(path)
+        except Exception as e:
+            # unreadable images stay on their own and get described individually
+            logger.warning("[image_dedup] Could not hash %s: %s", name, e)
+            clusters.append([name])
+            continue
+
+        if rep_hashes:
+            distances = _hamming(h, np.array(rep_hashes, dtype=np.uint64))
+            best = int(np.argmin(distances))
+            if distances[best] <= max_distance:
+                clusters[rep_cluster[best]].append(name)
+                continue
+        rep_hashes.append(h)
+        rep_cluster.append(len(clusters))
+        clusters.append([name])
+    return clusters
+
+
+def write_cluster_map(clusters: List[List[str]], output_file: Path) -> Dict[str, List[str]]:
+    """Save {representative: [all members]} and log how many descriptions the dedup saves."""
+    cluster_map = {members[0]: members for members in clusters}
+    output_file.write_text(json.dumps(cluster_map, indent=2), encoding="utf-8")
+    n_images = sum(len(m) for m in clusters)
+    logger.info(
+        "[image_dedup] %d image(s) in %d cluster(s): %d vision call(s) saved → %s",
+        n_images, len(clusters), n_images - len(clusters), output_file,
+    )
+    return cluster_map
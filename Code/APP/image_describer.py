@@ -0,0 +1,182 @@
+"""
+Bounded-concurrency image description through the shared Ollama client (ollama_client).
+
+process_images used to call client.generate once per image, strictly one after another.
+describe_images() keeps up to `concurrency` requests in flight (match it to the server's
+OLLAMA_NUM_PARALLEL), applies a per-request timeout and retries failed or empty replies
+with the same linear backoff as oct8. The requests share the pooled session and circuit
+breaker of ollama_client, so a server that is down fails the remaining images at once
+instead of costing a timeout each. Results are returned in the order of the input paths.
+
+describe_image_folder() is the entry point used by process_images: it clusters
+near-duplicate images first (image_dedup) and only describes one image per cluster,
+fanning the description out to the other members. The representatives are then triaged
+(image_triage): decorative images get a placeholder, simple graphics a short caption prompt.
+Descriptions already in the persistent description cache (description_cache) are reused
+across runs and documents; only the misses go to Ollama.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from description_cache import default_description_cache
+from image_dedup import cluster_images, write_cluster_map
+from image_triage import CAPTION, CAPTION_PROMPT, DESCRIBE, SKIP, SKIP_PLACEHOLDER, triage_images, write_triage_report
+from ollama_client import CircuitOpenError, OllamaClient, default_client
+from pipeline_cache import sha256_file
+
+logger = logging.getLogger(__name__)
+
+VISION_CONCURRENCY = int(os.environ.get("OLLAMA_VISION_CONCURRENCY", "4"))
+VISION_TIMEOUT = float(os.environ.get("OLLAMA_VISION_TIMEOUT", "300"))
+VISION_RETRIES = 3
+DEDUPE_IMAGES = os.environ.get("DEDUPE_IMAGES", "1") == "1"
+TRIAGE_IMAGES = os.environ.get("TRIAGE_IMAGES", "1") == "1"
+
+
+async def _describe_one(
+    client: OllamaClient,
+    semaphore: asyncio.Semaphore,
+    model: str,
+    prompt: str,
+    image_path: str,
+    timeout: float,
+    retries: int,
+) -> Optional[str]:
+    name = os.path.basename(image_path)
+    last_err: Optional[Exception] = None
+    for attempt in range(retries):
+        try:
+            async with semaphore:
+                start = time.time()
+                # the client bounds the request with `timeout`; retries happen here, one attempt per call
+                description = (await asyncio.to_thread(
+                    client.generate, model, prompt, images=[image_path], timeout=timeout, retries=0
+                )).strip()
+            if not description:
+                raise ValueError("empty description")
+            logger.info("[process_images] Processed %s (%.2fs)", name, time.time() - start)
+            return description
+        except CircuitOpenError as e:
+            last_err = e
+            break
+        except Exception as e:
+            last_err = e
+            logger.warning("[process_images] attempt %d for %s failed: %r", attempt + 1, name, e)
+            await asyncio.sleep(0.5 * (attempt + 1))
+    logger.error("[process_images] Failed to generate description for %s after retries: %r", name, last_err)
+    return None
+
+
+async def describe_images_async(
+    image_paths: Sequence[str],
+    model: str,
+    prompt: str,
+    host: Optional[str] = None,
+    concurrency: int = VISION_CONCURRENCY,
+    timeout: float = VISION_TIMEOUT,
+    retries: int = VISION_RETRIES,
+) -> List[Optional[str]]:
+    client = default_client(host)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [_describe_one(client, semaphore, model, prompt, str(p), timeout, retries) for p in image_paths]
+    # gather keeps the input order regardless of completion order
+    return await asyncio.gather(*tasks)
+
+
+def describe_images(
+    image_paths: Sequence[str],
+    model: str,
+    prompt: str,
+    host: Optional[str] = None,
+    concurrency: int = VISION_CONCURRENCY,
+    timeout: float = VISION_TIMEOUT,
+    retries: int = VISION_RETRIES,
+) -> List[Optional[str]]:
+    """Synchronous wrapper; returns one description (or None on failure) per image, in input order."""
+    start = time.time()
+    results = asyncio.run(describe_images_async(image_paths, model, prompt, host, concurrency, timeout, retries))
+    logger.info(
+        "[process_images] %d/%d image(s) described with concurrency %d (%.2fs)",
+        sum(r is not None for r in results), len(results), concurrency, time.time() - start,
+    )
+    return results
+
+
+def describe_image_folder(
+    image_folder: Path,
+    image_files: Sequence[str],
+    model: str,
+    prompt: str,
+    host: Optional[str] = None,
+    concurrency: int = VISION_CONCURRENCY,
+    dedupe: bool = DEDUPE_IMAGES,
+    triage: bool = TRIAGE_IMAGES,
+    use_cache: bool = True,
+) -> List[Dict[str, str]]:
+    """Describe `image_files` (names inside `image_folder`) and return image_descriptions.json entries.
+
+    With `dedupe`, near-duplicate images are described once; the other members of a cluster
+    get the same description plus a "duplicate_of" field, and the cluster map is saved as
+    image_clusters.json in the image folder. With `triage`, representatives classified as
+    decorative get SKIP_PLACEHOLDER and simple graphics are sent with CAPTION_PROMPT; the
+    decisions are saved as image_triage.json. With `use_cache`, descriptions are looked up in
+    and added to the persistent description cache.
+    """
+    image_folder = Path(image_folder)
+    if dedupe:
+        clusters = cluster_images([image_folder / f for f in image_files])
+        write_cluster_map(clusters, image_folder / "image_clusters.json")
+    else:
+        clusters = [[f] for f in image_files]
+
+    representatives = [members[0] for members in clusters]
+    if triage:
+        decisions = triage_images([image_folder / f for f in representatives])
+        write_triage_report(decisions, image_folder / "image_triage.json")
+        decision_of = [d["decision"] for d in decisions]
+    else:
+        decision_of = [DESCRIBE] * len(representatives)
+
+    cache = default_description_cache() if use_cache else None
+    results: List[Optional[str]] = [SKIP_PLACEHOLDER if d == SKIP else None for d in decision_of]
+    for decision, decision_prompt in ((DESCRIBE, prompt), (CAPTION, CAPTION_PROMPT)):
+        indices = [i for i, d in enumerate(decision_of) if d == decision]
+        if not indices:
+            continue
+        if cache is not None:
+            shas = {i: sha256_file(image_folder / representatives[i]) for i in indices}
+            cached = cache.get_many(shas.values(), model, decision_prompt)
+            for i in indices:
+                results[i] = cached.get(shas[i])
+            indices = [i for i in indices if results[i] is None]
+            if not indices:
+                continue
+        descriptions = describe_images(
+            [str(image_folder / representatives[i]) for i in indices],
+            model, decision_prompt, host=host, concurrency=concurrency,
+        )
+        for i, description in zip(indices, descriptions):
+            results[i] = description
+        if cache is not None:
+            cache.put_many([(shas[i], results[i]) for i in indices], model, decision_prompt)
+    if cache is not None:
+        logger.info("[description_cache] %s", cache.stats())
+
+    by_image: Dict[str, Dict[str, str]] = {}
+    for members, decision, description in zip(clusters, decision_of, results):
+        if not description:
+            continue
+        for name in members:
+            entry = {"image": name, "description": description}
+            if name != members[0]:
+                entry["duplicate_of"] = members[0]
+            if decision != DESCRIBE:
+                entry["triage"] = decision
+            by_image[name] = entry
+    return [by_image[f] for f in image_files if f in by_image]
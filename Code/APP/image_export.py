@@ -0,0 +1,138 @@
+"""
+Image export options for md_extract.
+
+docling renders pictures at IMAGE_RESOLUTION_SCALE, which gives images far larger than the
+vision model's input size; they are then base64-encoded and sent to Ollama as-is. This
+module downsizes every picture to at most `max_side` pixels, encodes it as PNG, JPEG or
+WebP, and writes it from a small background thread pool so that image I/O overlaps with the
+docling document walk. parallel_convert uses the same pool to encode the pictures of each
+chunk during its walk and to write the merged, renumbered images.
+
+Images keep the numeric naming used by replace_images_in_md (1.png, 2.jpg, ...); only the
+extension follows the chosen format. Configure via IMAGE_FORMAT, IMAGE_MAX_SIDE,
+IMAGE_QUALITY and IMAGE_WRITER_WORKERS.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+_EXTENSION_FOR_FORMAT = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+
+@dataclass(frozen=True)
+class ImageExportOptions:
+    format: str = "PNG"
+    max_side: Optional[int] = 896  # gemma3's vision encoder works on 896x896 inputs
+    quality: int = 85  # JPEG / WebP only
+    workers: int = 4
+
+    def __post_init__(self):
+        if self.format.upper() not in _EXTENSION_FOR_FORMAT:
+            raise ValueError(f"Unsupported image format {self.format!r}; use PNG, JPEG or WEBP")
+        object.__setattr__(self, "format", self.format.upper())
+
+    @property
+    def extension(self) -> str:
+        return _EXTENSION_FOR_FORMAT[self.format]
+
+    def output_settings(self) -> Dict[str, object]:
+        """The options that change the written files; `workers` does not and stays out of cache keys."""
+        return {"format": self.format, "max_side": self.max_side, "quality": self.quality}
+
+    @classmethod
+    def from_env(cls) -> "ImageExportOptions":
+        max_side = int(os.environ.get("IMAGE_MAX_SIDE", "896"))
+        return cls(
+            format=os.environ.get("IMAGE_FORMAT", "PNG"),
+            max_side=max_side if max_side > 0 else None,
+            quality=int(os.environ.get("IMAGE_QUALITY", "85")),
+            workers=int(os.environ.get("IMAGE_WRITER_WORKERS", "4")),
+        )
+
+
+def prepare_image(img: Image.Image, options: ImageExportOptions) -> Image.Image:
+    """Downscale to `max_side` (keeping aspect ratio) and convert the mode for the target format."""
+    if options.max_side and max(img.size) > options.max_side:
+        img = img.copy()
+        img.thumbnail((options.max_side, options.max_side), Image.LANCZOS)
+    if options.format == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    return img
+
+
+def encode_image(img: Image.Image, options: ImageExportOptions) -> bytes:
+    buf = io.BytesIO()
+    img = prepare_image(img, options)
+    if options.format == "PNG":
+        img.save(buf, "PNG", optimize=True)
+    else:
+        img.save(buf, options.format, quality=options.quality)
+    return buf.getvalue()
+
+
+def numbered_images(folder: Path) -> List[Path]:
+    """Extracted images (1.png, 2.jpg, ...) in numeric order."""
+    files = [p for p in Path(folder).iterdir() if p.stem.isdigit() and p.suffix.lower() in IMAGE_EXTENSIONS]
+    return sorted(files, key=lambda p: int(p.stem))
+
+
+class ImageWriter:
+    """Background pool that encodes and writes images while the caller keeps walking the document.
+
+    Use as a context manager; leaving the block waits for all pending writes.
+    """
+
+    def __init__(self, options: ImageExportOptions):
+        self.options = options
+        self._pool = ThreadPoolExecutor(max_workers=max(1, options.workers), thread_name_prefix="image-writer")
+        self._pending: List[Future] = []
+        self.bytes_written = 0
+
+    def _write(self, img: Image.Image, path: Path) -> int:
+        return self._write_bytes(encode_image(img, self.options), path)
+
+    @staticmethod
+    def _write_bytes(data: bytes, path: Path) -> int:
+        path.write_bytes(data)
+        return len(data)
+
+    def submit(self, img: Image.Image, path: Path) -> Future:
+        future = self._pool.submit(self._write, img, path)
+        self._pending.append(future)
+        return future
+
+    def submit_bytes(self, data: bytes, path: Path) -> Future:
+        """Write already encoded image bytes."""
+        future = self._pool.submit(self._write_bytes, data, path)
+        self._pending.append(future)
+        return future
+
+    def encode(self, img: Image.Image) -> Future:
+        """Encode in the background and return a Future with the bytes; the caller collects it."""
+        return self._pool.submit(encode_image, img, self.options)
+
+    def close(self) -> None:
+        for future in self._pending:
+            try:
+                self.bytes_written += future.result()
+            except Exception as e:
+                logger.warning("Failed to write image: %s", e)
+        self._pending.clear()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "ImageWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
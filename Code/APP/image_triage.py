@@ -0,0 +1,144 @@
+"""
+Cheap pre-filter for extracted images.
+
+Many docling PictureItems are tiny icons, horizontal rules or near-solid fills.
+triage_image() looks at a few NumPy pixel statistics (size, grey-level entropy, number of
+distinct colours, edge density, foreground coverage) and sorts every image into one of three
+buckets:
+
+    skip      decorative / empty; gets SKIP_PLACEHOLDER instead of a vision-model call
+    caption   simple graphic (logo, icon, flat filled shapes); gets a short one-line caption prompt
+    describe  everything else; gets the full IMAGE_PROMPT
+
+Entropy and colour count are no reason to skip: a black-on-white block diagram or state
+machine is almost all background, so both are tiny. Only an image with (almost) no edges
+or no foreground is a fill, and thin strokes on a plain background (line art) are always
+described in full.
+
+write_triage_report() saves the decisions and the calls saved as image_triage.json.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+SKIP, CAPTION, DESCRIBE = "skip", "caption", "describe"
+
+SKIP_PLACEHOLDER = "Decorative image with no informational content."
+CAPTION_PROMPT = "Give a one-sentence caption for this image. Mention any visible text."
+
+MIN_SIDE = 24  # px; smaller images are icons or bullets
+MIN_AREA = 48 * 48
+MAX_ASPECT = 12.0  # wider/taller than this is a rule or separator
+MIN_EDGE_DENSITY = 0.001  # below this, or below MIN_FOREGROUND, the image is a near-solid fill
+MIN_FOREGROUND = 0.002  # share of pixels that differ from the background grey level
+LINE_ART_FOREGROUND = 0.15  # strokes on a plain background: diagrams, charts, drawings
+CAPTION_AREA = 160 * 160
+CAPTION_ENTROPY = 3.0
+CAPTION_COLOURS = 16
+CAPTION_EDGE_DENSITY = 0.02
+EDGE_THRESHOLD = 32  # grey-level step that counts as an edge
+STATS_SIDE = 256  # statistics are computed on a thumbnail of at most this size
+
+
+@dataclass
+class ImageStats:
+    width: int
+    height: int
+    entropy: float
+    unique_colours: int
+    edge_density: float
+    foreground: float
+
+
+def image_stats(image: Union[str, Path, Image.Image]) -> ImageStats:
+    img = image if isinstance(image, Image.Image) else Image.open(image)
+    width, height = img.size
+    thumb = img.convert("RGB")
+    thumb.thumbnail((STATS_SIDE, STATS_SIDE))
+    rgb = np.asarray(thumb, dtype=np.uint8)
+    grey = np.asarray(thumb.convert("L"), dtype=np.int16)
+
+    hist = np.bincount(grey.ravel(), minlength=256).astype(np.float64)
+    p = hist[hist > 0] / grey.size
+    entropy = float(-(p * np.log2(p)).sum())
+
+    # 5 bits per channel so JPEG noise does not inflate the colour count
+    q = (rgb >> 3).astype(np.uint32)
+    unique_colours = int(np.unique((q[..., 0] << 10) | (q[..., 1] << 5) | q[..., 2]).size)
+
+    edges = 0
+    if grey.shape[1] > 1:
+        edges += int((np.abs(np.diff(grey, axis=1)) > EDGE_THRESHOLD).sum())
+    if grey.shape[0] > 1:
+        edges += int((np.abs(np.diff(grey, axis=0)) > EDGE_THRESHOLD).sum())
+    edge_density = edges / (2 * grey.size)
+
+    background = int(hist.argmax())
+    foreground = float((np.abs(grey - background) > EDGE_THRESHOLD).mean())
+
+    return ImageStats(width, height, round(entropy, 3), unique_colours, round(edge_density, 4),
+                      round(foreground, 4))
+
+
+def triage_image(stats: ImageStats) -> Tuple[str, str]:
+    """Return (decision, reason) for one image."""
+    short, long_ = sorted((stats.width, stats.height))
+    if short < MIN_SIDE or stats.width * stats.height < MIN_AREA:
+        return SKIP, "too small"
+    if long_ / max(short, 1) > MAX_ASPECT:
+        return SKIP, "rule or separator"
+    if stats.edge_density < MIN_EDGE_DENSITY or stats.foreground < MIN_FOREGROUND:
+        return SKIP, "near-solid fill"
+
+    if stats.width * stats.height < CAPTION_AREA:
+        return CAPTION, "small graphic"
+    if stats.foreground < LINE_ART_FOREGROUND:
+        return DESCRIBE, "line art"
+    if (
+        stats.entropy < CAPTION_ENTROPY
+        or stats.unique_colours < CAPTION_COLOURS
+        or stats.edge_density < CAPTION_EDGE_DENSITY
+    ):
+        return CAPTION, "simple graphic"
+    return DESCRIBE, "content image"
+
+
+def triage_images(image_paths: Sequence[Union[str, Path]]) -> List[Dict[str, object]]:
+    """Triage every image; unreadable images are sent to the vision model as usual."""
+    results = []
+    for path in image_paths:
+        name = Path(path).name
+        try:
+            stats = image_stats(path)
+        except Exception as e:
+            logger.warning("[image_triage] Could not read %s: %s", name, e)
+            results.append({"image": name, "decision": DESCRIBE, "reason": "unreadable"})
+            continue
+        decision, reason = triage_image(stats)
+        results.append({"image": name, "decision": decision, "reason": reason, **asdict(stats)})
+    return results
+
+
+def write_triage_report(triage: List[Dict[str, object]], output_file: Path) -> Dict[str, object]:
+    counts = {d: sum(t["decision"] == d for t in triage) for d in (SKIP, CAPTION, DESCRIBE)}
+    report = {
+        "counts": counts,
+        "vision_calls_saved": counts[SKIP],
+        "short_captions": counts[CAPTION],
+        "images": triage,
+    }
+    output_file.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info(
+        "[image_triage] %d skipped, %d caption-only, %d full descriptions → %s",
+        counts[SKIP], counts[CAPTION], counts[DESCRIBE], output_file,
+    )
+    return report
@@ -0,0 +1,104 @@
+"""
+Per-page OCR routing.
+
+Most SRS PDFs are born-digital: every page has a usable text layer and running EasyOCR
+over them only costs time. classify_pages() does a quick PyMuPDF pre-scan and labels
+every page as
+
+- "text":    enough extractable text and little raster content -> no OCR needed
+- "mixed":   a text layer plus large raster images (diagrams, screenshots) -> OCR optional
+- "scanned": (almost) no text layer but raster content -> needs OCR
+
+route_page_runs() turns the decisions into contiguous page runs that share the same OCR
+setting, which parallel_convert then converts with an OCR or non-OCR converter.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import fitz
+
+logger = logging.getLogger(__name__)
+
+MIN_TEXT_CHARS = 50
+SCANNED_IMAGE_COVERAGE = 0.3
+MIXED_IMAGE_COVERAGE = 0.25
+
+
+@dataclass
+class PageClass:
+    page: int  # 1-based
+    kind: str
+    text_chars: int
+    image_coverage: float
+    needs_ocr: bool
+
+
+def _image_coverage(page: "fitz.Page") -> float:
+    page_rect = page.rect
+    page_area = page_rect.width * page_rect.height
+    if page_area <= 0:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page_rect
+        if not bbox.is_empty:
+            covered += bbox.width * bbox.height
+    return min(1.0, covered / page_area)
+
+
+def classify_pages(pdf: Union[str, Path, "fitz.Document"], ocr_mixed: bool = True) -> List[PageClass]:
+    """Classify every page of `pdf` as text, scanned or mixed."""
+    doc = pdf if isinstance(pdf, fitz.Document) else fitz.open(str(pdf))
+    try:
+        classes = []
+        for page in doc:
+            text_chars = sum(1 for ch in page.get_text("text") if not ch.isspace())
+            coverage = _image_coverage(page)
+            if text_chars < MIN_TEXT_CHARS:
+                # a page without text and without images is blank, nothing to OCR
+                kind = "scanned" if coverage >= SCANNED_IMAGE_COVERAGE else "text"
+            elif coverage >= MIXED_IMAGE_COVERAGE:
+                kind = "mixed"
+            else:
+                kind = "text"
+            needs_ocr = kind == "scanned" or (kind == "mixed" and ocr_mixed)
+            classes.append(PageClass(page.number + 1, kind, text_chars, round(coverage, 3), needs_ocr))
+        return classes
+    finally:
+        if doc is not pdf:
+            doc.close()
+
+
+def route_page_runs(classes: List[PageClass]) -> List[Tuple[int, int, bool]]:
+    """Group consecutive pages with the same OCR decision into inclusive 0-based (first, last, do_ocr) runs."""
+    runs: List[Tuple[int, int, bool]] = []
+    for c in classes:
+        idx = c.page - 1
+        if runs and runs[-1][2] == c.needs_ocr and runs[-1][1] == idx - 1:
+            runs[-1] = (runs[-1][0], idx, c.needs_ocr)
+        else:
+            runs.append((idx, idx, c.needs_ocr))
+    return runs
+
+
+def write_routing_report(classes: List[PageClass], output_file: Path) -> dict:
+    """Save the per-page decisions and log a one-line summary."""
+    kinds = Counter(c.kind for c in classes)
+    report = {
+        "pages": len(classes),
+        "ocr_pages": sum(c.needs_ocr for c in classes),
+        "by_kind": dict(kinds),
+        "decisions": [asdict(c) for c in classes],
+    }
+    output_file.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    logger.info(
+        "[ocr_routing] %d/%d pages need OCR (text=%d, mixed=%d, scanned=%d) → %s",
+        report["ocr_pages"], report["pages"], kinds["text"], kinds["mixed"], kinds["scanned"], output_file,
+    )
+    return report
@@ -0,0 +1,195 @@
+"""
+One pooled HTTP client for every Ollama call: keep-alive sessions, timeouts, retries, circuit breaker.
+
+The apps posted each prompt with a bare requests.post: a new connection per call, no timeout
+(a stuck request hung the whole review run), and every error swallowed into "" that then
+failed in json.loads with a misleading traceback. OllamaClient keeps one requests.Session
+with a connection pool of OLLAMA_POOL_SIZE (sized for eval_engine's and image_describer's
+concurrency) and
+
+    - bounds every request with (OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT) seconds;
+    - retries transient failures (connection errors, timeouts, 429/5xx) up to
+      OLLAMA_RETRIES times with jittered exponential backoff;
+    - counts consecutive transient failures in a CircuitBreaker: after
+      OLLAMA_BREAKER_FAILURES of them the circuit opens and calls fail immediately with
+      CircuitOpenError for OLLAMA_BREAKER_COOLDOWN seconds, then one trial call decides
+      whether it closes again. A server that is down costs seconds, not a timeout per question.
+
+Failures raise OllamaError instead of returning "". Other 4xx replies (unknown model, bad
+request) are not retried and don't count against the server.
+
+default_client(host) returns the process-wide client for a host (OLLAMA_HOST by default).
+"""
+from __future__ import annotations
+
+import base64
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", "300"))
+OLLAMA_RETRIES = int(os.environ.get("OLLAMA_RETRIES", "2"))
+OLLAMA_BACKOFF = 0.5  # seconds; attempt n waits uniform(0, min(OLLAMA_BACKOFF_MAX, OLLAMA_BACKOFF * 2**n))
+OLLAMA_BACKOFF_MAX = 8.0
+OLLAMA_POOL_SIZE = int(os.environ.get("OLLAMA_POOL_SIZE", "16"))
+OLLAMA_BREAKER_FAILURES = int(os.environ.get("OLLAMA_BREAKER_FAILURES", "5"))
+OLLAMA_BREAKER_COOLDOWN = float(os.environ.get("OLLAMA_BREAKER_COOLDOWN", "30"))
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class OllamaError(RuntimeError):
+    """An Ollama request failed (after retries, if the failure was transient)."""
+
+
+class CircuitOpenError(OllamaError):
+    """The circuit breaker is open: the server failed repeatedly and is not being called."""
+
+
+class CircuitBreaker:
+    """Closed → open after `failures` consecutive failures → one trial call after `cooldown` seconds."""
+
+    def __init__(self, failures: int = OLLAMA_BREAKER_FAILURES, cooldown: float = OLLAMA_BREAKER_COOLDOWN):
+        self.failures = max(1, failures)
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial:
+                wait = f"retrying in {remaining:.0f}s" if remaining > 0 else "trial call in progress"
+                raise CircuitOpenError(f"Ollama circuit open after {self._consecutive} failures ({wait})")
+            self._trial = True  # half-open: let exactly one call through
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("[ollama_client] Circuit closed")
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or (self._opened_at is None and self._consecutive >= self.failures):
+                logger.warning("[ollama_client] Circuit open for %.0fs after %d consecutive failures",
+                               self.cooldown, self._consecutive)
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+def _encode_image(image: Union[str, Path, bytes]) -> str:
+    data = image if isinstance(image, bytes) else Path(image).read_bytes()
+    return base64.b64encode(data).decode("ascii")
+
+
+class OllamaClient:
+    def __init__(self, host: str = OLLAMA_HOST, pool_size: int = OLLAMA_POOL_SIZE,
+                 connect_timeout: float = OLLAMA_CONNECT_TIMEOUT, read_timeout: float = OLLAMA_READ_TIMEOUT,
+                 retries: int = OLLAMA_RETRIES, breaker: Optional[CircuitBreaker] = None):
+        self.host = host.rstrip("/")
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.session = requests.Session()
+        # pool_block: callers beyond pool_size wait for a connection instead of opening throwaway ones
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats: Dict[str, int] = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def request(self, path: str, payload: Dict[str, object], timeout: Optional[float] = None,
+                retries: Optional[int] = None) -> Dict[str, object]:
+        """POST `payload` to `path` and return the JSON reply; raises OllamaError."""
+        url = f"{self.host}/{path.lstrip('/')}"
+        timeout_pair = (self.timeout[0], timeout) if timeout is not None else self.timeout
+        retries = max(0, self.retries if retries is None else retries)
+        for attempt in range(retries + 1):
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            self._count("requests")
+            try:
+                response = self.session.post(url, json=payload, timeout=timeout_pair)
+                if response.status_code in _RETRY_STATUS:
+                    raise OllamaError(f"HTTP {response.status_code} from {url}: {response.text[:200]}")
+            except (requests.ConnectionError, requests.Timeout, OllamaError) as e:
+                self.breaker.record_failure()
+                self._count("failures")
+                if attempt == retries:
+                    raise OllamaError(f"Ollama request to {url} failed after {attempt + 1} attempt(s): {e}") from e
+                delay = random.uniform(0, min(OLLAMA_BACKOFF_MAX, OLLAMA_BACKOFF * 2 ** attempt))
+                logger.warning("[ollama_client] Attempt %d for %s failed (%s); retrying in %.1fs",
+                               attempt + 1, url, e, delay)
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            except requests.RequestException as e:
+                self.breaker.record_success()  # the server answered; the request itself is wrong
+                raise OllamaError(f"Ollama request to {url} failed: {e}") from e
+
+            self.breaker.record_success()
+            if not response.ok:
+                raise OllamaError(f"HTTP {response.status_code} from {url}: {response.text[:200]}")
+            try:
+                return response.json()
+            except ValueError as e:
+                raise OllamaError(f"Ollama reply from {url} is not JSON: {response.text[:200]}") from e
+
+    def generate(self, model: str, prompt: str, images: Optional[Sequence[Union[str, Path, bytes]]] = None,
+                 timeout: Optional[float] = None, retries: Optional[int] = None, **fields) -> str:
+        """Non-streaming /api/generate; returns the response text ("" if the model said nothing).
+
+        `fields` go into the request body as they are (options, keep_alive, format, ...);
+        `images` are file paths or raw bytes.
+        """
+        payload: Dict[str, object] = {"model": model, "prompt": prompt, "stream": False, **fields}
+        if images:
+            payload["images"] = [_encode_image(image) for image in images]
+        result = self.request("/api/generate", payload, timeout=timeout, retries=retries)
+        return str(result.get("response") or "")
+
+
+_default_clients: Dict[str, OllamaClient] = {}
+_default_lock = threading.Lock()
+
+
+def default_client(host: Optional[str] = None) -> OllamaClient:
+    """Process-wide client (one session pool and circuit breaker) per host."""
+    host = (host or OLLAMA_HOST).rstrip("/")
+    with _default_lock:
+        if host not in _default_clients:
+            _default_clients[host] = OllamaClient(host)
+        return _default_clients[host]
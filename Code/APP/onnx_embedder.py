@@ -0,0 +1,194 @@
+"""
+ONNX Runtime embedding backend with int8 dynamic quantisation.
+
+On CPU-only servers the PyTorch SentenceTransformer is slow to load and slow to run for the
+few hundred short headings map_sections_to_target embeds. OnnxEmbedder runs the same
+transformer through ONNX Runtime, with weights dynamically quantised to int8, and applies the
+model's own pooling (mean or CLS, read from the sentence-transformers config), so the vectors
+stay comparable to the PyTorch ones.
+
+The first use exports <model>/ (a sentence-transformers folder) to ONNX with torch and
+quantises it with onnxruntime.quantization; the int8 file is kept under
+<SRS_CACHE_DIR>/onnx (or SRS_ONNX_CACHE) and reused afterwards. The export is checked against
+the PyTorch model on a padded batch; below ONNX_MIN_COSINE it is deleted and raises.
+
+load_embedding_model() picks the backend from EMBEDDING_BACKEND ("torch" by default, or
+"onnx"); both objects have the model.encode(...) interface section_scoring uses.
+"""
+from __future__ import annotations
+
+import inspect
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+from pipeline_cache import CACHE_DIR, sha256_bytes
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch").lower()
+ONNX_CACHE_DIR = Path(os.environ.get("SRS_ONNX_CACHE", str(CACHE_DIR / "onnx")))
+ONNX_THREADS = int(os.environ.get("ONNX_THREADS", "0"))  # 0: let ONNX Runtime decide
+ONNX_OPSET = 14
+ONNX_MIN_COSINE = float(os.environ.get("ONNX_MIN_COSINE", "0.98"))  # worst int8 vs. PyTorch embedding
+
+# different lengths, so the check runs with padding and a non-trivial attention mask
+_CHECK_TEXTS = [
+    "mode transitions",
+    "Software requirements for the vehicle stability controller in degraded operating modes",
+    "Acronyms",
+]
+
+
+def _read_json(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+
+def _pooling_mode(model_dir: Path) -> str:
+    for module in _read_json(model_dir / "modules.json") or []:
+        if module.get("type", "").endswith("Pooling"):
+            config = _read_json(model_dir / module["path"] / "config.json")
+            if config.get("pooling_mode_cls_token"):
+                return "cls"
+    return "mean"
+
+
+def _pool(hidden: np.ndarray, mask: np.ndarray, pooling: str) -> np.ndarray:
+    if pooling == "cls":
+        return hidden[:, 0]
+    mask = mask[..., None].astype(hidden.dtype)
+    return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sum(a * b, axis=1) / np.clip(np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12, None)
+
+
+def _onnx_paths(model_path: str) -> Tuple[Path, Path]:
+    digest = sha256_bytes(str(Path(model_path).resolve()).encode("utf-8"))[:12]
+    stem = re.sub(r"[^A-Za-z0-9_-]+", "_", Path(model_path).name)[:40] + f"-{digest}"
+    # v2: inputs named in forward() order (v1 files could have attention_mask / token_type_ids swapped)
+    return ONNX_CACHE_DIR / f"{stem}.fp32.onnx", ONNX_CACHE_DIR / f"{stem}.v2.int8.onnx"
+
+
+def export_quantized(model_path: str) -> Path:
+    """Export the transformer of `model_path` to ONNX and quantise it to int8; returns the int8 file."""
+    fp32_file, int8_file = _onnx_paths(model_path)
+    if int8_file.exists():
+        return int8_file
+
+    import onnxruntime as ort
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    start = time.time()
+    ONNX_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    hf_model = AutoModel.from_pretrained(model_path).eval()
+    dummy = dict(tokenizer(["mode transitions"], return_tensors="pt"))
+    # the exported graph takes its inputs positionally in forward() order, whatever order the tokenizer uses
+    params = list(inspect.signature(hf_model.forward).parameters)
+    input_names = [name for name in params if name in dummy]
+    if input_names != params[:len(input_names)]:
+        raise RuntimeError(f"Cannot export {model_path}: tokenizer outputs {list(dummy)} are not "
+                           f"the leading arguments of forward{tuple(params)}")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            hf_model, tuple(dummy[name] for name in input_names), str(fp32_file),
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET,
+        )
+    quantize_dynamic(str(fp32_file), str(int8_file), weight_type=QuantType.QInt8)
+    fp32_file.unlink()
+
+    pooling = _pooling_mode(Path(model_path))
+    enc = tokenizer(_CHECK_TEXTS, padding=True, return_tensors="np")
+    with torch.no_grad():
+        expected = hf_model(**{name: torch.from_numpy(enc[name]) for name in input_names}).last_hidden_state.numpy()
+    session = ort.InferenceSession(str(int8_file), providers=["CPUExecutionProvider"])
+    feeds = {i.name: enc[i.name].astype(np.int64) for i in session.get_inputs()}
+    actual = session.run(None, feeds)[0]
+    cosine = _cosine(_pool(expected, enc["attention_mask"], pooling), _pool(actual, enc["attention_mask"], pooling))
+    if cosine.min() < ONNX_MIN_COSINE:
+        int8_file.unlink()
+        raise RuntimeError(f"ONNX export of {model_path} does not match PyTorch: "
+                           f"cosine {cosine.min():.4f} < ONNX_MIN_COSINE {ONNX_MIN_COSINE}")
+    logger.info("[onnx_embedder] Exported int8 model %s (%.1fs, min cosine vs. PyTorch %.4f)",
+                int8_file, time.time() - start, cosine.min())
+    return int8_file
+
+
+class OnnxEmbedder:
+    """Drop-in for SentenceTransformer.encode on top of an int8 ONNX Runtime session."""
+
+    def __init__(self, model_path: str, threads: int = ONNX_THREADS):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise RuntimeError("EMBEDDING_BACKEND=onnx needs onnxruntime and transformers installed") from e
+
+        model_dir = Path(model_path)
+        self.model_path = model_path
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.max_seq_length = _read_json(model_dir / "sentence_bert_config.json").get("max_seq_length", 256)
+        self.pooling = _pooling_mode(model_dir)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(export_quantized(model_path)), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [i.name for i in self.session.get_inputs()]
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        enc = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np")
+        feeds = {name: enc[name].astype(np.int64) for name in self._input_names}
+        hidden = self.session.run(None, feeds)[0]
+        return _pool(hidden, enc["attention_mask"], self.pooling)
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # like sentence-transformers: batch by length so padding stays small, then restore the order
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        pooled = np.vstack([
+            self._embed_batch([texts[i] for i in order[b:b + batch_size]]) for b in range(0, len(order), batch_size)
+        ]).astype(np.float32)
+        embeddings = np.empty_like(pooled)
+        embeddings[order] = pooled
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+
+def embedding_model_id(model_path: str, backend: str = EMBEDDING_BACKEND) -> str:
+    """Identifier for caches keyed by the embedding model (the backend changes the vectors slightly)."""
+    return model_path if backend == "torch" else f"{model_path}#onnx-int8"
+
+
+def load_embedding_model(model_path: str, backend: str = EMBEDDING_BACKEND):
+    """SentenceTransformer (backend="torch") or OnnxEmbedder (backend="onnx") for `model_path`."""
+    start = time.time()
+    if backend == "onnx":
+        model = OnnxEmbedder(model_path)
+    elif backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_path)
+    else:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; use 'torch' or 'onnx'")
+    logger.info("[onnx_embedder] Loaded %s with the %s backend (%.2fs)", model_path, backend, time.time() - start)
+    return model
@@ -0,0 +1,228 @@
+"""
+Page-parallel docling conversion.
+
+The (cropped) PDF is split with fitz into contiguous page ranges, each range is converted
+in a separate worker process and the markdown is merged back in page order. Pictures are
+renumbered globally (1.png, 2.png, ... or the extension of the chosen image format) in
+document order, so the `<!-- image -->`
+placeholders still line up with replace_images_in_md. The chunk documents are saved in page
+order as docling_document.json (see docling_sections). Inside a chunk the pictures are
+encoded by an ImageWriter pool while the walk continues, and merge_chunks writes the
+renumbered files through one as well.
+
+Every worker process keeps its own warm converter through converter_pool, so the model
+load cost is paid once per worker, not once per chunk.
+
+With ocr_routing=True the pages are first classified by ocr_routing.classify_pages and
+only the page runs that need OCR are converted with an OCR-enabled converter. This also
+works with a single worker, in which case the chunks are converted in-process.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import fitz
+
+from converter_pool import ConverterOptions, convert
+from image_export import ImageExportOptions, ImageWriter
+from ocr_routing import classify_pages, route_page_runs, write_routing_report
+
+try:
+    from docling.datamodel.base_models import DocumentStream
+    from docling_core.types.doc import PictureItem
+
+    from docling_sections import DOCUMENT_FILE, document_payload, write_document_parts
+except Exception:
+    DocumentStream = None  # type: ignore
+    PictureItem = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+MIN_PAGES_PER_CHUNK = 4
+
+
+@dataclass
+class ChunkResult:
+    index: int
+    first_page: int
+    last_page: int
+    markdown: str
+    images: List[Optional[bytes]] = field(default_factory=list)
+    document: Dict[str, object] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def _default_chunk_size(page_count: int, workers: int) -> int:
+    if workers <= 1:
+        return max(1, page_count)
+    return max(MIN_PAGES_PER_CHUNK, math.ceil(page_count / (workers * 2)))
+
+
+def split_page_ranges(page_count: int, workers: int, pages_per_chunk: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Return inclusive (first, last) 0-based page ranges covering the document.
+
+    By default each worker gets about two chunks so that a slow chunk does not leave
+    the other workers idle at the end.
+    """
+    if page_count <= 0:
+        return []
+    pages_per_chunk = pages_per_chunk or _default_chunk_size(page_count, workers)
+    return [(first, min(first + pages_per_chunk, page_count) - 1) for first in range(0, page_count, pages_per_chunk)]
+
+
+def _split_run(first: int, last: int, pages_per_chunk: int) -> List[Tuple[int, int]]:
+    return [(a, min(a + pages_per_chunk, last + 1) - 1) for a in range(first, last + 1, pages_per_chunk)]
+
+
+def _extract_pages(doc: "fitz.Document", first: int, last: int) -> bytes:
+    part = fitz.open()
+    try:
+        part.insert_pdf(doc, from_page=first, to_page=last)
+        return part.tobytes()
+    finally:
+        part.close()
+
+
+def _init_worker(threads: int) -> None:
+    # keep torch from spawning one thread per core in every worker process
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+
+
+def _convert_chunk(index: int, first: int, last: int, pdf_bytes: bytes, name: str,
+                   options: ConverterOptions, image_options: ImageExportOptions) -> ChunkResult:
+    start = time.time()
+    source = DocumentStream(name=f"{name}_p{first + 1}-{last + 1}.pdf", stream=io.BytesIO(pdf_bytes))
+    conv_res = convert(source, options)
+
+    images: List[Optional[bytes]] = []
+    # encoding runs in the writer threads while the walk renders the next pictures
+    with ImageWriter(image_options) as writer:
+        encoded = []
+        for element, _level in conv_res.document.iterate_items():
+            if isinstance(element, PictureItem):
+                try:
+                    encoded.append(writer.encode(element.get_image(conv_res.document)))
+                except Exception as e:
+                    logger.warning("Failed to extract image in pages %d-%d: %s", first + 1, last + 1, e)
+                    encoded.append(None)
+        for future in encoded:
+            try:
+                images.append(future.result() if future is not None else None)
+            except Exception as e:
+                logger.warning("Failed to encode image in pages %d-%d: %s", first + 1, last + 1, e)
+                images.append(None)
+
+    return ChunkResult(
+        index=index,
+        first_page=first,
+        last_page=last,
+        markdown=conv_res.document.export_to_markdown(),
+        images=images,
+        document=document_payload(conv_res.document),
+        seconds=time.time() - start,
+    )
+
+
+def merge_chunks(chunks: Sequence[ChunkResult], output_dir: Path, md_name: str,
+                 image_options: ImageExportOptions = ImageExportOptions()) -> Tuple[Path, int]:
+    """Write images with global numbering, the page-ordered markdown and the chunk documents.
+
+    Returns (md_file, picture count).
+    """
+    pic_count = 0
+    parts = []
+    chunks = sorted(chunks, key=lambda c: c.first_page)
+    # the image files are written in the background while the markdown and documents are saved
+    with ImageWriter(image_options) as writer:
+        for chunk in chunks:
+            for data in chunk.images:
+                pic_count += 1
+                if data is not None:
+                    writer.submit_bytes(data, output_dir / f"{pic_count}{image_options.extension}")
+            parts.append(chunk.markdown.strip("\n"))
+
+        md_file = output_dir / md_name
+        md_file.write_text("\n\n".join(p for p in parts if p) + "\n", encoding="utf-8")
+        write_document_parts([(c.first_page, c.document) for c in chunks], output_dir / DOCUMENT_FILE)
+    return md_file, pic_count
+
+
+def convert_pdf_parallel(
+    pdf_path, output_dir: Path, workers: Optional[int] = None, pages_per_chunk: Optional[int] = None,
+    options: ConverterOptions = ConverterOptions(), ocr_routing: bool = False, name: Optional[str] = None,
+    image_options: ImageExportOptions = ImageExportOptions(),
+) -> Path:
+    """Convert `pdf_path` page range by page range and merge the result.
+
+    Chunks run in a process pool when workers > 1, otherwise in-process. With ocr_routing the
+    per-page OCR decisions are written to ocr_routing.json next to the markdown.
+
+    `pdf_path` may also be the PDF bytes, in which case `name` is the document stem.
+
+    Returns the path of the merged markdown file, named like md_extract's output.
+    """
+    if DocumentStream is None:
+        raise RuntimeError("docling dependencies are missing. Install docling_core and related packages.")
+
+    start = time.time()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    if isinstance(pdf_path, (bytes, bytearray)):
+        stem = name or "document"
+        doc = fitz.open(stream=pdf_path, filetype="pdf")
+    else:
+        stem = name or Path(pdf_path).stem
+        doc = fitz.open(str(pdf_path))
+    try:
+        if ocr_routing:
+            classes = classify_pages(doc)
+            write_routing_report(classes, output_dir / "ocr_routing.json")
+            chunk_size = pages_per_chunk or _default_chunk_size(doc.page_count, workers)
+            ranges = [
+                (first, last, replace(options, do_ocr=do_ocr))
+                for run_first, run_last, do_ocr in route_page_runs(classes)
+                for first, last in _split_run(run_first, run_last, chunk_size)
+            ]
+        else:
+            ranges = [(first, last, options) for first, last in split_page_ranges(doc.page_count, workers, pages_per_chunk)]
+        payloads = [(i, first, last, _extract_pages(doc, first, last), opts) for i, (first, last, opts) in enumerate(ranges)]
+    finally:
+        doc.close()
+
+    workers = min(workers, len(ranges)) or 1
+    logger.info("[parallel_convert] %s: %d chunk(s) on %d worker(s)", stem, len(ranges), workers)
+
+    if workers == 1:
+        chunks = [_convert_chunk(i, first, last, data, stem, opts, image_options) for i, first, last, data, opts in payloads]
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # spawn: docling/torch state does not survive fork reliably
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = [
+                pool.submit(_convert_chunk, i, first, last, data, stem, opts, image_options)
+                for i, first, last, data, opts in payloads
+            ]
+            chunks = [f.result() for f in futures]
+
+    md_file, pic_count = merge_chunks(chunks, output_dir, f"{stem}.md", image_options)
+    logger.info(
+        "[parallel_convert] Exported %d images → %s (%.2fs wall, %.2fs summed over chunks)",
+        pic_count, md_file, time.time() - start, sum(c.seconds for c in chunks),
+    )
+    return md_file
@@ -0,0 +1,164 @@
+"""
+Content-addressed cache for the PDF -> descriptive mapped sections pipeline.
+
+A cache entry is keyed by the SHA-256 of the uploaded PDF plus the pipeline
+settings that influence the output (crop percentages, image scale, vision model, ...).
+Each entry stores the artifacts of one full run:
+
+    <cache_dir>/<key[:2]>/<key>/
+        cropped.pdf
+        document.md
+        document_with_desc.md
+        image_descriptions.json
+        mapped_sections.json
+        match_scores.json
+        meta.json
+
+Interrupted or partial runs are resumed from a stage work directory keyed by the PDF hash
+alone, <cache_dir>/work/<pdf_sha256>/ (see stage_work_dir); its .stages manifests decide
+which steps are still current.
+
+The cache directory can be configured with the SRS_CACHE_DIR environment variable.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.environ.get("SRS_CACHE_DIR", "cache"))
+
+# Bump when the pipeline code changes in a way that invalidates old entries.
+CACHE_VERSION = 2
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pipeline_cache_key(pdf_sha256: str, settings: Dict[str, object]) -> str:
+    """Combine the PDF hash and the pipeline settings into a single cache key."""
+    payload = json.dumps(
+        {"pdf": pdf_sha256, "settings": settings, "version": CACHE_VERSION},
+        sort_keys=True,
+        default=str,
+    )
+    return sha256_bytes(payload.encode("utf-8"))
+
+
+def stage_work_dir(pdf_sha256: str, cache_dir: Union[str, Path] = CACHE_DIR) -> Path:
+    """Working directory of the stage graph for one PDF, the same for every upload of it."""
+    return Path(cache_dir) / "work" / pdf_sha256
+
+
+def _entry_dir(key: str, cache_dir: Union[str, Path]) -> Path:
+    return Path(cache_dir) / key[:2] / key
+
+
+def load_cached_result(key: str, cache_dir: Union[str, Path] = CACHE_DIR) -> Optional[Dict[str, object]]:
+    """Return the cached pipeline result for `key`, or None on a miss.
+
+    The returned dict has the same shape as pdf_to_descriptive_mapped_sections' result,
+    with the file paths pointing into the cache entry.
+    """
+    entry = _entry_dir(key, cache_dir)
+    meta_file = entry / "meta.json"
+    if not meta_file.exists():
+        return None
+
+    start = time.time()
+    try:
+        meta = json.loads(meta_file.read_text(encoding="utf-8"))
+        mapped_sections = json.loads((entry / "mapped_sections.json").read_text(encoding="utf-8"))
+        final_text = (entry / "document_with_desc.md").read_text(encoding="utf-8")
+        scores_file = entry / "match_scores.json"
+        match_scores = json.loads(scores_file.read_text(encoding="utf-8")) if scores_file.exists() else {}
+    except (OSError, ValueError) as e:
+        logger.warning("[pipeline_cache] Ignoring unreadable cache entry %s: %s", entry, e)
+        return None
+
+    logger.info("[pipeline_cache] Cache hit %s (%.3fs)", key[:12], time.time() - start)
+    return {
+        "original_md": entry / "document.md",
+        "image_descriptions_json": entry / "image_descriptions.json",
+        "md_with_descriptions": final_text,
+        "md_with_descriptions_file": entry / "document_with_desc.md",
+        "mapped_sections": mapped_sections,
+        "match_scores": match_scores,
+        "boilerplate_tokens_removed": meta.get("boilerplate_tokens_removed", {}),
+        "cache_key": key,
+        "cache_hit": True,
+    }
+
+
+def store_result(
+    key: str,
+    result: Dict[str, object],
+    cropped_pdf: Union[str, Path, bytes, None],
+    md_file: Union[str, Path],
+    md_with_desc: Union[str, Path],
+    json_file: Union[str, Path],
+    meta: Optional[Dict[str, object]] = None,
+    cache_dir: Union[str, Path] = CACHE_DIR,
+) -> Path:
+    """Copy the artifacts of a finished run into the cache.
+
+    `cropped_pdf` may be a path or the cropped PDF bytes (None when the stage was skipped).
+    The entry is assembled in a temporary directory and renamed into place, so a
+    crashed run never leaves a half-written entry behind.
+    """
+    entry = _entry_dir(key, cache_dir)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=entry.parent))
+    try:
+        if isinstance(cropped_pdf, (bytes, bytearray)):
+            (tmp_dir / "cropped.pdf").write_bytes(cropped_pdf)
+        elif cropped_pdf and Path(cropped_pdf).exists():
+            shutil.copyfile(cropped_pdf, tmp_dir / "cropped.pdf")
+        shutil.copyfile(md_file, tmp_dir / "document.md")
+        shutil.copyfile(md_with_desc, tmp_dir / "document_with_desc.md")
+        if Path(json_file).exists():
+            shutil.copyfile(json_file, tmp_dir / "image_descriptions.json")
+        else:
+            (tmp_dir / "image_descriptions.json").write_text("[]", encoding="utf-8")
+        (tmp_dir / "mapped_sections.json").write_text(
+            json.dumps(result["mapped_sections"], ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        if result.get("match_scores"):
+            (tmp_dir / "match_scores.json").write_text(
+                json.dumps(result["match_scores"], ensure_ascii=False, indent=2), encoding="utf-8"
+            )
+        # meta.json is written last: its presence marks the entry as complete
+        meta = dict(meta or {})
+        meta["boilerplate_tokens_removed"] = result.get("boilerplate_tokens_removed", {})
+        meta.update({"key": key, "version": CACHE_VERSION, "created_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+        (tmp_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+
+        if entry.exists():
+            shutil.rmtree(entry)
+        os.replace(tmp_dir, entry)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logger.info("[pipeline_cache] Stored %s → %s", key[:12], entry)
+    return entry
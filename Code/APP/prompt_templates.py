@@ -0,0 +1,100 @@
+"""
+Prompt layout for the checklist evaluation, arranged for Ollama's prompt (KV) cache.
+
+Ollama keeps the evaluated prompt of the last request of a loaded model and only prefills
+the tokens after the longest common prefix with the next one. That only pays off when
+
+    - every prompt of a main question starts with the same bytes: the fixed preamble, then
+      the document block, and only then the checklist item that changes per sub-question;
+    - the model stays loaded between calls (keep_alive) with the same context size: a
+      different num_ctx reloads the runner and drops the cache.
+
+checklist_prompt() / batched_prompt() build prompts as document_prefix(content) + suffix,
+and generate_payload() is the /api/generate body with OLLAMA_KEEP_ALIVE and a fixed
+OLLAMA_NUM_CTX. The content itself has to be the same string for all sub-questions of a
+question (app0 retrieves one shared context per main question for this reason).
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Dict, Sequence
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+# fixed on purpose: changing num_ctx between calls reloads the model and loses the prompt cache
+OLLAMA_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", "8192"))
+CHARS_PER_TOKEN = 3.5  # rough, for the context-size warning only
+
+_RULE = "#########################"
+
+_PREAMBLE = """You are reviewing a software document against a checklist.
+Evaluate the document *practically*, not rigidly.
+If the information seems partially mentioned, inferred, or described indirectly, still consider it as **"Partially Yes"** (not strictly No).
+Be lenient where technical meaning is clear even if phrasing differs.
+
+Guidelines:
+- If the content explicitly meets the criteria → "Yes".
+- If it somewhat covers or implies it → "Partially Yes".
+- If it is missing or unrelated → "No".
+- Maintain neutral tone and professional phrasing.
+"""
+
+_REASON = ("Provide a clear, concise explanation (40–60 words) describing which aspects are mentioned, "
+           "implied, or missing. Be objective and avoid repetition.")
+
+
+def document_prefix(content: str) -> str:
+    """Preamble + document block; identical for every prompt about the same content."""
+    return f"{_PREAMBLE}\n{_RULE}\nText: {content}\n{_RULE}\n"
+
+
+def checklist_prompt(content: str, instruction: str) -> str:
+    """Prompt for one checklist item; the reply is a single {"Answer", "Reason"} object."""
+    return document_prefix(content) + f"""
+Instructions:
+You are given a document content in the above `Text`.
+
+Now, follow the checklist below carefully:
+{instruction}
+
+Respond in **JSON** format as:
+{{
+"Answer": "Yes" / "Partially Yes" / "No",
+"Reason": "{_REASON}"
+}}
+"""
+
+
+def batched_prompt(content: str, instructions: Sequence[str]) -> str:
+    """Prompt for all checklist items of a main question; the reply is a JSON array, one object per item."""
+    items = "\n\n".join(f"Item {n}:\n{instruction}" for n, instruction in enumerate(instructions, start=1))
+    return document_prefix(content) + f"""
+Instructions:
+You are given a document content in the above `Text`.
+
+Now, evaluate each of the {len(instructions)} checklist items below separately:
+{items}
+
+Respond with a **JSON array** of exactly {len(instructions)} objects, one per item and in the same order:
+[
+{{"Item": 1, "Answer": "Yes" / "Partially Yes" / "No", "Reason": "{_REASON}"}},
+...
+]
+"""
+
+
+def generate_payload(model: str, prompt: str, temperature: float = 0.1, **options) -> Dict[str, object]:
+    """/api/generate request body that keeps the model (and its prompt cache) loaded between calls."""
+    estimated = int(len(prompt) / CHARS_PER_TOKEN)
+    if estimated > OLLAMA_NUM_CTX:
+        logger.warning("[prompt_templates] Prompt of ~%d tokens exceeds num_ctx=%d; Ollama will truncate it",
+                       estimated, OLLAMA_NUM_CTX)
+    return {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"temperature": temperature, "num_ctx": OLLAMA_NUM_CTX, **options},
+    }
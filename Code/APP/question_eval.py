@@ -0,0 +1,132 @@
+"""
+Checklist evaluation of a main question: one LLM call per sub-question, or one per question.
+
+Verify SRS asked every sub-question in its own query_ollama call, and every call re-sent the
+same multi-thousand-token content_to_search. In "batched" mode evaluate_batched() asks all
+checklist prompts of a main question in one request and expects a JSON array with one
+{"Answer", "Reason"} object per prompt, in order. Items that are missing or malformed are
+asked again one by one with the single checklist prompt, so a sloppy reply costs extra calls
+but never an answer. The prompts come from prompt_templates.
+
+EvalStats counts calls, fallbacks and time in either mode; summary() puts the call count next
+to the one-call-per-sub-question baseline. It is shared by the worker threads of eval_engine,
+so the counters are updated under a lock; `seconds` adds up the calls and exceeds the wall
+time when calls overlap.
+
+EVAL_MODE selects "single" (default, one call per sub-question) or "batched".
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, List, Optional, Sequence
+
+from prompt_templates import batched_prompt, checklist_prompt
+
+logger = logging.getLogger(__name__)
+
+EVAL_MODE = os.environ.get("EVAL_MODE", "single").lower()
+EVAL_MODES = ("single", "batched")
+ANSWERS = ("Yes", "Partially Yes", "No")
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+
+def _strip_fence(resp: str) -> str:
+    return _FENCE.sub("", resp.strip())
+
+
+def parse_answer(resp: str) -> Dict[str, str]:
+    """The reply of a single checklist prompt; raises ValueError (json.JSONDecodeError) if it isn't JSON."""
+    return json.loads(_strip_fence(resp))
+
+
+def _valid(item) -> bool:
+    return isinstance(item, dict) and item.get("Answer") in ANSWERS and isinstance(item.get("Reason"), str)
+
+
+def parse_batch(resp: str, n_items: int) -> List[Optional[Dict[str, str]]]:
+    """The items of a batched reply, in order; None for every item that is missing or malformed."""
+    try:
+        data = json.loads(_strip_fence(resp))
+    except ValueError:
+        return [None] * n_items
+    if isinstance(data, dict):  # {"results": [...]} and the like
+        data = next((v for v in data.values() if isinstance(v, list)), [data])
+    if not isinstance(data, list):
+        return [None] * n_items
+
+    items: List[Optional[Dict[str, str]]] = [None] * n_items
+    numbered = all(isinstance(d, dict) and isinstance(d.get("Item"), int) for d in data)
+    for pos, item in enumerate(data):
+        idx = item["Item"] - 1 if numbered else pos
+        if 0 <= idx < n_items and items[idx] is None and _valid(item):
+            items[idx] = {"Answer": item["Answer"], "Reason": item["Reason"]}
+    return items
+
+
+@dataclass
+class EvalStats:
+    mode: str = EVAL_MODE
+    sub_questions: int = 0
+    calls: int = 0
+    fallback_calls: int = 0
+    seconds: float = 0.0
+    workers: int = 1
+    wall_seconds: float = 0.0  # set by eval_engine; 0 for sequential runs
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def query(self, query_fn: Callable[[str], str], prompt: str, fallback: bool = False) -> str:
+        start = time.perf_counter()
+        try:
+            return query_fn(prompt)
+        finally:
+            with self._lock:
+                self.seconds += time.perf_counter() - start
+                self.calls += 1
+                self.fallback_calls += fallback
+
+    def summary(self) -> str:
+        per_call = self.seconds / self.calls if self.calls else 0.0
+        text = (f"{self.mode} mode: {self.calls} LLM calls for {self.sub_questions} sub-questions "
+                f"(one call per sub-question: {self.sub_questions}; {self.fallback_calls} fallback calls), "
+                f"{self.seconds:.1f}s total, {per_call:.1f}s per call")
+        if self.wall_seconds:
+            text += f"; {self.workers} workers, {self.wall_seconds:.1f}s wall time"
+        return text
+
+    def to_dict(self) -> Dict[str, object]:
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.init}
+
+
+def evaluate_single(query_fn: Callable[[str], str], content: str, instructions: Sequence[str],
+                    stats: Optional[EvalStats] = None) -> List[Dict[str, str]]:
+    stats = stats if stats is not None else EvalStats("single")
+    with stats._lock:
+        stats.sub_questions += len(instructions)
+    return [parse_answer(stats.query(query_fn, checklist_prompt(content, instruction)))
+            for instruction in instructions]
+
+
+def evaluate_batched(query_fn: Callable[[str], str], content: str, instructions: Sequence[str],
+                     stats: Optional[EvalStats] = None) -> List[Dict[str, str]]:
+    """All items in one call; items the reply gets wrong are re-asked one by one."""
+    stats = stats if stats is not None else EvalStats("batched")
+    with stats._lock:
+        stats.sub_questions += len(instructions)
+    if len(instructions) == 1:
+        return [parse_answer(stats.query(query_fn, checklist_prompt(content, instructions[0])))]
+
+    items = parse_batch(stats.query(query_fn, batched_prompt(content, instructions)), len(instructions))
+    missing = [i for i, item in enumerate(items) if item is None]
+    if missing:
+        logger.warning("[question_eval] %d of %d batched answers malformed; asking them one by one",
+                       len(missing), len(instructions))
+    for i in missing:
+        items[i] = parse_answer(stats.query(query_fn, checklist_prompt(content, instructions[i]), fallback=True))
+    return items
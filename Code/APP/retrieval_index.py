@@ -0,0 +1,317 @@
+"""
+Chunk-level hybrid retrieval over the markdown with image descriptions.
+
+Verify SRS used to send the whole md_with_descriptions when a question has no
+reference_section, and the full text of every matched section otherwise, so most prompts
+carried thousands of tokens that had nothing to do with the sub-question. RetrievalIndex
+splits the document into paragraph-sized chunks (never across a heading) and keeps
+
+    a BM25 inverted index       term -> [(chunk, term frequency), ...]
+    sentence-transformer vectors one L2-normalised row per chunk
+
+context() ranks the chunks for a sub-question with both, fuses the two rankings (reciprocal
+rank fusion, so the BM25 and cosine scales never have to be compared) and returns the best
+chunks, in document order, until RETRIEVAL_TOP_K chunks or RETRIEVAL_TOKEN_BUDGET tokens
+(boilerplate.count_tokens) are reached.
+
+The index is built once per document and saved next to the markdown as
+<stem>.retrieval.json (chunk offsets + postings) and <stem>.retrieval.npy (float16 vectors);
+load_or_build_index() reuses them while the markdown and the embedding model are unchanged.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from boilerplate import count_tokens
+from pipeline_cache import sha256_bytes
+from section_scoring import encode_normalized
+from section_tree import SectionTree
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS = int(os.environ.get("RETRIEVAL_CHUNK_TOKENS", "180"))
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "8"))
+RETRIEVAL_TOKEN_BUDGET = int(os.environ.get("RETRIEVAL_TOKEN_BUDGET", "2500"))
+INDEX_VERSION = "1"
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # reciprocal rank fusion constant
+
+_TERM = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or shall should that the this to was "
+    "were will with which document does given text".split()
+)
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+
+def terms(text: str) -> List[str]:
+    return [t for t in _TERM.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+@dataclass
+class Chunk:
+    start: int  # character offsets into the markdown
+    end: int
+    section: str  # nearest heading line above the chunk ("" before the first heading)
+    tokens: int
+
+
+def _paragraphs(text: str) -> List[Tuple[int, int]]:
+    spans, pos = [], 0
+    for m in _PARAGRAPH_BREAK.finditer(text):
+        if text[pos:m.start()].strip():
+            spans.append((pos, m.start()))
+        pos = m.end()
+    if text[pos:].strip():
+        spans.append((pos, len(text)))
+    return spans
+
+
+def _split_long(text: str, start: int, end: int, max_tokens: int) -> List[Tuple[int, int]]:
+    # big tables / image descriptions: cut at line ends once the piece is full
+    pieces, piece_start, n_tokens = [], start, 0
+    line_start = start
+    while line_start < end:
+        line_end = text.find("\n", line_start, end)
+        line_end = end if line_end == -1 else line_end + 1
+        n_tokens += count_tokens(text[line_start:line_end])
+        if n_tokens >= max_tokens:
+            pieces.append((piece_start, line_end))
+            piece_start, n_tokens = line_end, 0
+        line_start = line_end
+    if piece_start < end and text[piece_start:end].strip():
+        pieces.append((piece_start, end))
+    return pieces
+
+
+def chunk_markdown(text: str, chunk_tokens: int = CHUNK_TOKENS) -> List[Chunk]:
+    """Paragraph-sized chunks; a heading always starts a new chunk and becomes its `section`."""
+    chunks: List[Chunk] = []
+    section = ""
+    cur_start: Optional[int] = None
+    cur_end = 0
+    cur_tokens = 0
+
+    def flush():
+        nonlocal cur_start, cur_tokens
+        if cur_start is not None:
+            chunks.append(Chunk(cur_start, cur_end, section, cur_tokens))
+        cur_start, cur_tokens = None, 0
+
+    for p_start, p_end in _paragraphs(text):
+        paragraph = text[p_start:p_end]
+        if paragraph.lstrip().startswith("#"):
+            flush()
+            section = paragraph.strip().splitlines()[0]
+        n_tokens = count_tokens(paragraph)
+        if n_tokens > 2 * chunk_tokens:
+            flush()
+            for s, e in _split_long(text, p_start, p_end, chunk_tokens):
+                chunks.append(Chunk(s, e, section, count_tokens(text[s:e])))
+            continue
+        if cur_start is not None and cur_tokens + n_tokens > chunk_tokens:
+            flush()
+        if cur_start is None:
+            cur_start = p_start
+        cur_end = p_end
+        cur_tokens += n_tokens
+    flush()
+    return chunks
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return ranks
+
+
+class RetrievalIndex:
+    def __init__(self, text: str, chunks: List[Chunk], postings: Dict[str, List[Tuple[int, int]]],
+                 vectors: np.ndarray, meta: Dict[str, object]):
+        self.text = text
+        self.chunks = chunks
+        self.postings = postings
+        self.vectors = vectors
+        self.meta = meta
+        lengths = np.array([c.tokens for c in chunks], dtype=np.float32)
+        self._lengths = lengths
+        self._avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def chunk_text(self, i: int) -> str:
+        return self.text[self.chunks[i].start:self.chunks[i].end]
+
+    def bm25(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        n = len(self.chunks)
+        for term in set(terms(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            ids = np.fromiter((i for i, _ in posting), dtype=np.int64, count=len(posting))
+            tf = np.fromiter((f for _, f in posting), dtype=np.float32, count=len(posting))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[ids] / max(self._avg_length, 1e-9))
+            scores[ids] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, model, k: int = RETRIEVAL_TOP_K, token_budget: int = RETRIEVAL_TOKEN_BUDGET,
+               spans: Optional[Sequence[Tuple[int, int]]] = None) -> List[int]:
+        """Chunk ids for `query`, best first, within `k` chunks and `token_budget` tokens.
+
+        `spans` limits the candidates to chunks starting inside those character ranges.
+        """
+        if not self.chunks:
+            return []
+        candidates = np.arange(len(self.chunks))
+        if spans:
+            starts = np.array([c.start for c in self.chunks])
+            inside = np.zeros(len(self.chunks), dtype=bool)
+            for s, e in spans:
+                inside |= (starts >= s) & (starts < e)
+            candidates = candidates[inside]
+            if not len(candidates):
+                return []
+
+        lexical = self.bm25(query)[candidates]
+        dense = self.vectors[candidates].astype(np.float32) @ encode_normalized(model, [query])[0]
+        # chunks without a single query term get no BM25 vote
+        fused = np.where(lexical > 0, 1.0 / (RRF_K + _ranks(lexical)), 0.0) + 1.0 / (RRF_K + _ranks(dense))
+
+        chosen, used = [], 0
+        for i in candidates[np.argsort(-fused)]:
+            if len(chosen) >= k:
+                break
+            n_tokens = self.chunks[i].tokens
+            if used + n_tokens > token_budget:
+                continue  # a smaller chunk further down may still fit
+            chosen.append(int(i))
+            used += n_tokens
+        return chosen
+
+    def search_many(self, queries: Sequence[str], model, k: int = RETRIEVAL_TOP_K,
+                    token_budget: int = RETRIEVAL_TOKEN_BUDGET,
+                    spans: Optional[Sequence[Tuple[int, int]]] = None) -> List[int]:
+        """Chunks for several queries sharing one budget: their top chunks taken in turn, best first."""
+        rankings = [self.search(query, model, k, token_budget, spans) for query in queries]
+        chosen, used = [], 0
+        for rank in range(max(map(len, rankings), default=0)):
+            for ranking in rankings:
+                if rank < len(ranking) and ranking[rank] not in chosen:
+                    n_tokens = self.chunks[ranking[rank]].tokens
+                    if used + n_tokens <= token_budget:
+                        chosen.append(ranking[rank])
+                        used += n_tokens
+        return chosen
+
+    def context(self, query: str, model, k: int = RETRIEVAL_TOP_K, token_budget: int = RETRIEVAL_TOKEN_BUDGET,
+                spans: Optional[Sequence[Tuple[int, int]]] = None) -> str:
+        """Text of the retrieved chunks in document order, each section heading written once."""
+        return self.render(self.search(query, model, k, token_budget, spans))
+
+    def context_many(self, queries: Sequence[str], model, k: int = RETRIEVAL_TOP_K,
+                     token_budget: int = RETRIEVAL_TOKEN_BUDGET,
+                     spans: Optional[Sequence[Tuple[int, int]]] = None) -> str:
+        """One context for several queries (e.g. all sub-questions of a batched evaluation)."""
+        return self.render(self.search_many(queries, model, k, token_budget, spans))
+
+    def render(self, chunk_ids: Sequence[int]) -> str:
+        parts, last_section = [], None
+        for i in sorted(chunk_ids):
+            chunk = self.chunks[i]
+            body = self.chunk_text(i)
+            if chunk.section and chunk.section != last_section and not body.lstrip().startswith("#"):
+                parts.append(chunk.section)
+            parts.append(body.strip())
+            last_section = chunk.section
+        return "\n\n".join(parts) + "\n"
+
+    def save(self, json_file: Path, vectors_file: Path) -> None:
+        data = {"meta": self.meta, "chunks": [asdict(c) for c in self.chunks], "postings": self.postings}
+        _atomic_write(json_file, lambda f: f.write(json.dumps(data, ensure_ascii=False).encode("utf-8")))
+        _atomic_write(vectors_file, lambda f: np.save(f, self.vectors.astype(np.float16)))
+
+
+def section_spans(tree: SectionTree, content: str) -> List[Tuple[int, int]]:
+    """Character spans (in tree.text) of the top-level sections whose headings appear in `content`.
+
+    Turns a mapped section's content back into offsets so search() can stay inside it.
+    """
+    spans: List[Tuple[int, int]] = []
+    for line in content.splitlines():
+        if not line.startswith("#"):
+            continue
+        node = tree.lookup(line.lstrip("#").strip())
+        if node is not None and len(node.number) == 1 and (node.start, node.end) not in spans:
+            spans.append((node.start, node.end))
+    return spans
+
+
+def _atomic_write(path: Path, write) -> None:
+    fd, tmp = tempfile.mkstemp(suffix=path.suffix, dir=path.parent)
+    with os.fdopen(fd, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _index_files(md_file: Path) -> Tuple[Path, Path]:
+    return md_file.parent / f"{md_file.stem}.retrieval.json", md_file.parent / f"{md_file.stem}.retrieval.npy"
+
+
+def build_index(text: str, model, model_id: str, chunk_tokens: int = CHUNK_TOKENS) -> RetrievalIndex:
+    start = time.time()
+    chunks = chunk_markdown(text, chunk_tokens)
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for i, chunk in enumerate(chunks):
+        for term, tf in Counter(terms(chunk.section + "\n" + text[chunk.start:chunk.end])).items():
+            postings.setdefault(term, []).append((i, tf))
+    # the heading goes into the embedding too: "shall be 5 ms" means little without "9 Timing Requirements"
+    vectors = encode_normalized(model, [f"{c.section}\n{text[c.start:c.end]}".strip() for c in chunks])
+    meta = {"version": INDEX_VERSION, "md_sha256": sha256_bytes(text.encode("utf-8")), "model_id": model_id,
+            "chunk_tokens": chunk_tokens}
+    logger.info("[retrieval_index] %d chunks, %d terms indexed (%.2fs)", len(chunks), len(postings), time.time() - start)
+    return RetrievalIndex(text, chunks, postings, vectors, meta)
+
+
+def load_or_build_index(md_file: Union[str, Path], model, model_id: str,
+                        chunk_tokens: int = CHUNK_TOKENS) -> RetrievalIndex:
+    """Index of `md_file`, read from <stem>.retrieval.json/.npy when still valid, built (and saved) otherwise."""
+    md_file = Path(md_file)
+    text = md_file.read_text(encoding="utf-8")
+    json_file, vectors_file = _index_files(md_file)
+    expected = {"version": INDEX_VERSION, "md_sha256": sha256_bytes(text.encode("utf-8")), "model_id": model_id,
+                "chunk_tokens": chunk_tokens}
+    if json_file.exists() and vectors_file.exists():
+        try:
+            data = json.loads(json_file.read_text(encoding="utf-8"))
+            vectors = np.load(vectors_file)
+            if data["meta"] == expected and len(vectors) == len(data["chunks"]):
+                chunks = [Chunk(**c) for c in data["chunks"]]
+                postings = {t: [tuple(p) for p in ps] for t, ps in data["postings"].items()}
+                logger.info("[retrieval_index] Loaded %d chunks from %s", len(chunks), json_file)
+                return RetrievalIndex(text, chunks, postings, vectors, expected)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("[retrieval_index] Rebuilding unreadable index %s: %s", json_file, e)
+
+    index = build_index(text, model, model_id, chunk_tokens)
+    try:
+        index.save(json_file, vectors_file)
+    except OSError as e:
+        logger.warning("[retrieval_index] Could not save index next to %s: %s", md_file, e)
+    return index
@@ -0,0 +1,175 @@
+"""
+Target-section schemas, one per document type.
+
+The target keys sections are mapped onto used to be an 18-entry dict pasted into every
+pipeline entry point, and every document type was mapped against the SRS keys. Each schema
+now lives in schemas/<doc_type>.json (or .yaml when PyYAML is installed):
+
+    {"doc_type": "SRS", "version": "1", "fallback": "17 SomethingElse",
+     "default_capacity": 1, "capacities": {"8 Detailed Software Requirement": 0}, "keys": ["Cover Page", ...]}
+
+Capacities are how many sections a target takes in the optimal assignment mode (see
+section_assignment.py); 0 means unlimited.
+
+The registry only lists the schema directory at startup; a schema is parsed the first time
+its doc_type is asked for, and its target-key embeddings and normalised fuzzy keys are built
+on first use and then kept on the schema (the embeddings also go to section_scoring's
+on-disk cache), so adding a document type costs nothing until it is used. Bump "version"
+when the keys change meaning without changing their text.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from section_scoring import MatchScores, score_sections, target_embeddings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_DIR = Path(os.environ.get("SRS_SCHEMA_DIR", str(Path(__file__).resolve().parent / "schemas")))
+DEFAULT_DOC_TYPE = "SRS"
+SCHEMA_SUFFIXES = (".json", ".yaml", ".yml")
+
+
+@dataclass
+class TargetSchema:
+    doc_type: str
+    version: str
+    keys: List[str]
+    fallback: Optional[str] = None  # target key for sections that match nothing
+    description: str = ""
+    default_capacity: int = 0
+    capacities: Dict[str, int] = field(default_factory=dict)
+    _embeddings: Dict[str, np.ndarray] = field(default_factory=dict, repr=False)
+    _fuzzy_keys: Dict[Callable[[str], str], List[str]] = field(default_factory=dict, repr=False)
+
+    @property
+    def cache_version(self) -> str:
+        return f"{self.doc_type}-{self.version}"
+
+    def target_dict(self) -> Dict[str, str]:
+        """Fresh {key: ""} dict, the shape map_sections_to_target fills in."""
+        return {key: "" for key in self.keys}
+
+    def capacity_list(self) -> List[int]:
+        """Capacity of every key, in key order (0: unlimited)."""
+        return [self.capacities.get(key, self.default_capacity) for key in self.keys]
+
+    def embeddings(self, model, model_id: str) -> np.ndarray:
+        """Normalised target-key embeddings for `model_id`, computed (or read from disk) once."""
+        if model_id not in self._embeddings:
+            self._embeddings[model_id] = target_embeddings(model, model_id, self.keys, self.cache_version)
+        return self._embeddings[model_id]
+
+    def fuzzy_keys(self, normalize: Optional[Callable[[str], str]] = None) -> List[str]:
+        if normalize is None:
+            return self.keys
+        if normalize not in self._fuzzy_keys:
+            self._fuzzy_keys[normalize] = [normalize(key) for key in self.keys]
+        return self._fuzzy_keys[normalize]
+
+    def score_sections(self, model, model_id: str, headings: Sequence[str],
+                       normalize: Optional[Callable[[str], str]] = None) -> MatchScores:
+        """section_scoring.score_sections against this schema's cached target artifacts."""
+        return score_sections(
+            model, model_id, headings, self.keys, normalize, self.cache_version,
+            target_vectors=self.embeddings(model, model_id),
+            normalized_targets=self.fuzzy_keys(normalize),
+        )
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"doc_type": self.doc_type, "version": self.version, "fallback": self.fallback,
+                "description": self.description, "default_capacity": self.default_capacity,
+                "capacities": self.capacities, "keys": self.keys}
+
+
+def _read_schema_file(path: Path) -> dict:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        return json.loads(text)
+    try:
+        import yaml
+    except ImportError as e:
+        raise RuntimeError(f"{path} is YAML; install PyYAML or convert it to JSON") from e
+    return yaml.safe_load(text)
+
+
+def load_schema(path: Path) -> TargetSchema:
+    data = _read_schema_file(Path(path))
+    keys = [str(key) for key in data.get("keys") or []]
+    if not keys:
+        raise ValueError(f"Schema {path} has no target keys")
+    if len(set(keys)) != len(keys):
+        raise ValueError(f"Schema {path} has duplicate target keys")
+    fallback = data.get("fallback")
+    if fallback is not None and fallback not in keys:
+        raise ValueError(f"Schema {path}: fallback {fallback!r} is not one of its keys")
+    capacities = {str(key): int(cap) for key, cap in (data.get("capacities") or {}).items()}
+    unknown = set(capacities) - set(keys)
+    if unknown:
+        raise ValueError(f"Schema {path}: capacities for unknown keys {sorted(unknown)}")
+    return TargetSchema(
+        doc_type=str(data.get("doc_type") or Path(path).stem),
+        version=str(data.get("version", "1")),
+        keys=keys,
+        fallback=fallback,
+        description=data.get("description", ""),
+        default_capacity=int(data.get("default_capacity", 0)),
+        capacities=capacities,
+    )
+
+
+class SchemaRegistry:
+    """doc_type -> TargetSchema, parsed from `schema_dir` on first lookup."""
+
+    def __init__(self, schema_dir: Path = SCHEMA_DIR):
+        self.schema_dir = Path(schema_dir)
+        self._files = {
+            path.stem: path
+            for path in sorted(self.schema_dir.glob("*")) if path.suffix in SCHEMA_SUFFIXES
+        } if self.schema_dir.is_dir() else {}
+        self._schemas: Dict[str, TargetSchema] = {}
+        self._lock = threading.Lock()
+
+    def doc_types(self) -> List[str]:
+        return list(self._files)
+
+    def get(self, doc_type: str = DEFAULT_DOC_TYPE) -> TargetSchema:
+        with self._lock:
+            schema = self._schemas.get(doc_type)
+            if schema is None:
+                if doc_type not in self._files:
+                    raise ValueError(
+                        f"No target schema for doc_type {doc_type!r} in {self.schema_dir}; "
+                        f"available: {', '.join(self._files) or 'none'}"
+                    )
+                schema = self._schemas[doc_type] = load_schema(self._files[doc_type])
+                logger.info("[schema_registry] Loaded %s schema v%s (%d keys)",
+                            doc_type, schema.version, len(schema.keys))
+            return schema
+
+    def warm(self, model, model_id: str, doc_types: Optional[Sequence[str]] = None) -> None:
+        """Precompute the target embeddings of every (or the given) schema, e.g. at deploy time."""
+        for doc_type in doc_types or self.doc_types():
+            self.get(doc_type).embeddings(model, model_id)
+
+
+_registry: Optional[SchemaRegistry] = None
+
+
+def default_registry() -> SchemaRegistry:
+    global _registry
+    if _registry is None:
+        _registry = SchemaRegistry()
+    return _registry
+
+
+def get_schema(doc_type: str = DEFAULT_DOC_TYPE) -> TargetSchema:
+    return default_registry().get(doc_type)
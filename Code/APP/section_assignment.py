@@ -0,0 +1,126 @@
+"""
+Heading -> target assignment over the whole score matrix.
+
+map_sections_to_target used to give every section its own argmax target ("greedy"): two
+sections that both look like "4 Product Description" both land there (ZFinal keeps only the
+last one), and a section that narrowly loses its best target never gets its second best.
+optimal_assignment() instead picks the assignment with the highest total score, using
+scipy's linear_sum_assignment (Hungarian / Jonker-Volgenant) on
+
+    rows     the headings
+    columns  every capacity-limited target, repeated `capacity` times, plus one
+             "outside" column per heading: unassigned, or the best target with unlimited
+             capacity (capacity 0), which never competes for a slot
+
+A pair is only eligible when it passes the same semantic / fuzzy thresholds as the greedy
+mode; its value is the semantic score plus FUZZY_WEIGHT * fuzzy / 100. For a few hundred
+headings and the ~20 targets of a schema the matrix stays in the low thousands of columns
+and solves in milliseconds.
+
+ASSIGNMENT_MODE selects "greedy" (default, the old behaviour) or "optimal".
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from section_scoring import MatchScores
+
+logger = logging.getLogger(__name__)
+
+ASSIGNMENT_MODE = os.environ.get("ASSIGNMENT_MODE", "greedy").lower()
+ASSIGNMENT_MODES = ("greedy", "optimal")
+FUZZY_WEIGHT = 0.2  # share of the fuzzy ratio in the pair value; semantics dominate
+
+_FORBIDDEN = -1e6
+
+
+def greedy_assignment(scores: MatchScores, semantic_threshold: float, fuzzy_threshold: float) -> List[Optional[int]]:
+    """Per heading: best semantic target if it passes, else best fuzzy target if that passes, else None."""
+    chosen: List[Optional[int]] = []
+    for row in range(len(scores.headings)):
+        best_sem = int(np.argmax(scores.semantic[row]))
+        best_fuzzy = int(np.argmax(scores.fuzzy[row]))
+        if scores.semantic[row, best_sem] >= semantic_threshold:
+            chosen.append(best_sem)
+        elif scores.fuzzy[row, best_fuzzy] >= fuzzy_threshold:
+            chosen.append(best_fuzzy)
+        else:
+            chosen.append(None)
+    return chosen
+
+
+def pair_values(scores: MatchScores, semantic_threshold: float, fuzzy_threshold: float,
+                fuzzy_weight: float = FUZZY_WEIGHT) -> np.ndarray:
+    """(headings, targets) value matrix; ineligible pairs are _FORBIDDEN, eligible ones > 0."""
+    eligible = (scores.semantic >= semantic_threshold) | (scores.fuzzy >= fuzzy_threshold)
+    # +1 keeps every eligible value above the "unassigned" value 0, so a match is preferred
+    values = 1.0 + scores.semantic + fuzzy_weight * scores.fuzzy / 100.0
+    return np.where(eligible, values, _FORBIDDEN)
+
+
+def optimal_assignment(scores: MatchScores, capacities: Optional[Sequence[int]] = None,
+                       semantic_threshold: float = 0.5, fuzzy_threshold: float = 60.0,
+                       fuzzy_weight: float = FUZZY_WEIGHT) -> List[Optional[int]]:
+    """Target index (or None) per heading, maximising the total pair value.
+
+    `capacities[j]` is how many headings target j may take; 0 means unlimited. Without
+    capacities every target is unlimited and the result is the per-heading best eligible target.
+    """
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError as e:
+        raise RuntimeError("ASSIGNMENT_MODE=optimal needs scipy installed") from e
+
+    start = time.time()
+    n_rows, n_targets = scores.semantic.shape
+    if n_rows == 0:
+        return []
+    capacities = list(capacities) if capacities is not None else [0] * n_targets
+    if len(capacities) != n_targets:
+        raise ValueError(f"{len(capacities)} capacities for {n_targets} targets")
+
+    values = pair_values(scores, semantic_threshold, fuzzy_threshold, fuzzy_weight)
+
+    # unlimited targets don't compete: each heading's outside option is its best one (or unassigned)
+    unlimited = [j for j, cap in enumerate(capacities) if cap <= 0]
+    outside_value = np.zeros(n_rows)
+    outside_target: List[Optional[int]] = [None] * n_rows
+    if unlimited:
+        sub = values[:, unlimited]
+        best = np.argmax(sub, axis=1)
+        for row, k in enumerate(best):
+            if sub[row, k] > 0:
+                outside_value[row] = sub[row, k]
+                outside_target[row] = unlimited[k]
+
+    slot_targets = [j for j, cap in enumerate(capacities) if cap > 0 for _ in range(min(cap, n_rows))]
+    matrix = np.concatenate(
+        [values[:, slot_targets], np.repeat(outside_value[:, None], n_rows, axis=1)], axis=1
+    )
+    rows, cols = linear_sum_assignment(matrix, maximize=True)
+
+    chosen: List[Optional[int]] = [None] * n_rows
+    for row, col in zip(rows, cols):
+        if col < len(slot_targets) and matrix[row, col] > 0:
+            chosen[row] = slot_targets[col]
+        else:
+            chosen[row] = outside_target[row]
+    logger.info(
+        "[section_assignment] %d headings x %d targets (%d slots) assigned in %.3fs",
+        n_rows, n_targets, len(slot_targets), time.time() - start,
+    )
+    return chosen
+
+
+def assign_sections(scores: MatchScores, semantic_threshold: float, fuzzy_threshold: float,
+                    mode: str = ASSIGNMENT_MODE, capacities: Optional[Sequence[int]] = None) -> List[Optional[int]]:
+    if mode == "greedy":
+        return greedy_assignment(scores, semantic_threshold, fuzzy_threshold)
+    if mode == "optimal":
+        return optimal_assignment(scores, capacities, semantic_threshold, fuzzy_threshold)
+    raise ValueError(f"Unknown ASSIGNMENT_MODE {mode!r}; use one of {', '.join(ASSIGNMENT_MODES)}")
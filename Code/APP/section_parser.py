@@ -0,0 +1,141 @@
+"""
+Single-pass section parser for the docling markdown.
+
+heading_extraction + content_extraction read the *_with_desc.md file three times and
+built every section with `section_content = section_content + line`, which can go
+quadratic on long sections. parse_sections() memory-maps the file and walks it once,
+recording
+
+    headings     the sequential top-level headings ("## 1 ", "## 2. ", "## 3) ", ...)
+    spans        (start, end) byte offsets of every section, heading line included
+    cover_span   byte range of the first 50 lines (the "Cover Page")
+
+Sections are only decoded when asked for; section_bytes() returns a zero-copy memoryview
+into the mapping. to_dict() has the shape content_extraction(heading_extraction(path))
+returned. One difference: the old reader split on line equality, so a heading line that
+repeated later in the file started a new section there; here sections only break at the
+next heading in sequence, and a repeated heading line stays inside its section.
+"""
+from __future__ import annotations
+
+import logging
+import mmap
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+COVER_PAGE_LINES = 50
+
+# "## <n> ", "## <n>. " or "## <n>) "; <n> must be the next number in sequence
+_HEADING = re.compile(rb"## (\d+)(?: |\. |\) )")
+
+
+class MarkdownSections:
+    """Result of parse_sections(); keeps the file mapped until close() (or the end of a with-block)."""
+
+    def __init__(self, path: Path, buffer, headings: List[str], spans: List[Tuple[int, int]],
+                 cover_span: Optional[Tuple[int, int]], mapping: Optional[mmap.mmap] = None):
+        self.path = path
+        self.headings = headings
+        self.spans = spans
+        self.cover_span = cover_span
+        self._buffer = buffer
+        self._mapping = mapping
+
+    def __len__(self) -> int:
+        return len(self.headings)
+
+    def section_bytes(self, index: int) -> memoryview:
+        start, end = self.spans[index]
+        return memoryview(self._buffer)[start:end]
+
+    def section_text(self, index: int) -> str:
+        return _decode(self.section_bytes(index))
+
+    def cover_page(self) -> Optional[str]:
+        if self.cover_span is None:
+            return None
+        start, end = self.cover_span
+        return _decode(memoryview(self._buffer)[start:end])
+
+    def to_dict(self) -> Dict[str, str]:
+        """{heading line: section text, ..., "Cover Page": first 50 lines}, like content_extraction."""
+        sections = {heading: self.section_text(i) for i, heading in enumerate(self.headings)}
+        cover = self.cover_page()
+        if cover is not None:
+            sections["Cover Page"] = cover
+        return sections
+
+    def close(self) -> None:
+        self._buffer = b""
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self) -> "MarkdownSections":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _decode(data: memoryview) -> str:
+    # text-mode reads translate \r\n; keep the section text identical to the old readers
+    return str(data, "utf-8").replace("\r\n", "\n")
+
+
+def _next_candidate(buffer, start: int) -> int:
+    i = buffer.find(b"\n## ", start)
+    return -1 if i == -1 else i + 1
+
+
+def parse_sections(path: Union[str, Path]) -> MarkdownSections:
+    """Scan `path` once and return its headings, section byte offsets and cover page span."""
+    path = Path(path)
+    start_time = time.time()
+    with open(path, "rb") as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            mapping = None
+    buffer = mapping if mapping is not None else b""
+
+    size = len(buffer)
+    headings: List[str] = []
+    starts: List[int] = []
+    expected = b"1"
+    # find() jumps between lines starting with "## "; only those reach the regex
+    pos = 0 if buffer[:3] == b"## " else _next_candidate(buffer, 0)
+    while pos != -1:
+        end = buffer.find(b"\n", pos)
+        end = size if end == -1 else end + 1
+        m = _HEADING.match(buffer, pos, end)
+        if m and m.group(1) == expected:
+            headings.append(_decode(memoryview(buffer)[pos:end]))
+            starts.append(pos)
+            expected = str(len(headings) + 1).encode()
+        pos = _next_candidate(buffer, end - 1)
+
+    # the old reader only set the Cover Page once it had read past line 50
+    cover_span: Optional[Tuple[int, int]] = None
+    pos = 0
+    for _ in range(COVER_PAGE_LINES):
+        pos = buffer.find(b"\n", pos) + 1
+        if pos == 0:
+            break
+    else:
+        if pos < size:
+            cover_span = (0, pos)
+
+    spans = list(zip(starts, starts[1:] + [size]))
+    logger.info("[section_parser] %d headings in %s (%.3fs)", len(headings), path, time.time() - start_time)
+    return MarkdownSections(path, buffer, headings, spans, cover_span, mapping)
+
+
+def read_sections(path: Union[str, Path]) -> Dict[str, str]:
+    """Parse `path` and return the sections dict; the mapping is released before returning."""
+    with parse_sections(path) as parsed:
+        return parsed.to_dict()
@@ -0,0 +1,165 @@
+"""
+Batched, cached heading-to-target similarity for map_sections_to_target.
+
+map_sections_to_target used to call model.encode once per section heading and re-encode
+the fixed target keys on every call. semantic_scores() encodes all cleaned headings in one
+batched call, loads the target-key embeddings from a float16 .npy cache (keyed by sentence
+model, schema version and the keys themselves) and gets the whole cosine similarity matrix
+from one matrix product of L2-normalised embeddings.
+
+fuzzy_scores() builds the matching fuzz.ratio matrix with rapidfuzz's process.cdist on all
+cores, against target keys that are normalised once. score_sections() returns both matrices
+as MatchScores, so callers can look at runner-up targets without rescoring.
+
+The embedding cache lives in <SRS_CACHE_DIR>/embeddings unless SRS_EMBEDDING_CACHE is set.
+schema_registry keeps the target artifacts of each document type in memory and passes them
+in as target_vectors / normalized_targets.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from pipeline_cache import CACHE_DIR, sha256_bytes
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_DIR = Path(os.environ.get("SRS_EMBEDDING_CACHE", str(CACHE_DIR / "embeddings")))
+ENCODE_BATCH_SIZE = 64
+FUZZY_WORKERS = int(os.environ.get("FUZZY_WORKERS", "-1"))  # -1: all cores
+
+# Cache version for ad-hoc target keys; schemas from schema_registry use "<doc_type>-<version>".
+TARGET_SCHEMA_VERSION = "1"
+
+
+def clean_heading(section_key: str) -> str:
+    """Heading text used for embedding: no leading '##', no trailing newline."""
+    return re.sub(r"^#+\s*", "", section_key).strip()
+
+
+def encode_normalized(model, texts: Sequence[str], batch_size: int = ENCODE_BATCH_SIZE) -> np.ndarray:
+    """One batched encode call; rows are L2-normalised so a dot product is the cosine similarity."""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    embeddings = model.encode(
+        list(texts), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _target_cache_file(model_id: str, target_keys: Sequence[str], schema_version: str) -> Path:
+    digest = sha256_bytes("\n".join([model_id, schema_version, *target_keys]).encode("utf-8"))
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", Path(model_id).name or model_id)[:40]
+    return EMBEDDING_CACHE_DIR / f"{slug}-v{schema_version}-{digest[:16]}.npy"
+
+
+def target_embeddings(model, model_id: str, target_keys: Sequence[str],
+                      schema_version: str = TARGET_SCHEMA_VERSION) -> np.ndarray:
+    """Normalised target-key embeddings, computed once per (model, schema) and kept on disk as float16."""
+    cache_file = _target_cache_file(model_id, target_keys, schema_version)
+    if cache_file.exists():
+        cached = np.load(cache_file)
+        if cached.shape[0] == len(target_keys):
+            return cached.astype(np.float32)
+        logger.warning("[section_scoring] Ignoring stale embedding cache %s", cache_file)
+
+    embeddings = encode_normalized(model, target_keys)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".npy", dir=cache_file.parent)
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, embeddings.astype(np.float16))
+        os.replace(tmp, cache_file)
+        logger.info("[section_scoring] Cached %d target embeddings → %s", len(target_keys), cache_file)
+    except OSError as e:
+        logger.warning("[section_scoring] Could not cache target embeddings: %s", e)
+    return embeddings
+
+
+def semantic_scores(model, model_id: str, headings: Sequence[str], target_keys: Sequence[str],
+                    schema_version: str = TARGET_SCHEMA_VERSION,
+                    target_vectors: Optional[np.ndarray] = None) -> np.ndarray:
+    """Cosine similarity matrix of shape (len(headings), len(target_keys)).
+
+    `target_vectors` are already computed target_embeddings(); when omitted they come from the cache.
+    """
+    start = time.time()
+    targets = target_vectors if target_vectors is not None else \
+        target_embeddings(model, model_id, target_keys, schema_version)
+    if not headings:
+        return np.zeros((0, len(target_keys)), dtype=np.float32)
+    scores = encode_normalized(model, headings) @ targets.T
+    logger.info(
+        "[section_scoring] %d headings x %d targets scored (%.2fs)", len(headings), len(target_keys), time.time() - start
+    )
+    return scores
+
+
+def best_matches(scores: np.ndarray) -> List[int]:
+    """Index of the best target for every heading row."""
+    return [int(i) for i in np.argmax(scores, axis=1)] if scores.size else []
+
+
+@lru_cache(maxsize=32)
+def _normalized_targets(target_keys: Tuple[str, ...], normalize: Optional[Callable[[str], str]]) -> List[str]:
+    return [normalize(k) for k in target_keys] if normalize else list(target_keys)
+
+
+def fuzzy_scores(headings: Sequence[str], target_keys: Sequence[str],
+                 normalize: Optional[Callable[[str], str]] = None, workers: int = FUZZY_WORKERS,
+                 normalized_targets: Optional[Sequence[str]] = None) -> np.ndarray:
+    """fuzz.ratio matrix of shape (len(headings), len(target_keys)), 0-100."""
+    norm_targets = normalized_targets if normalized_targets is not None else \
+        _normalized_targets(tuple(target_keys), normalize)
+    norm_headings = [normalize(h) for h in headings] if normalize else list(headings)
+    return process.cdist(norm_headings, norm_targets, scorer=fuzz.ratio, dtype=np.float32, workers=workers)
+
+
+@dataclass
+class MatchScores:
+    headings: List[str]
+    targets: List[str]
+    semantic: np.ndarray  # cosine similarity, (headings, targets)
+    fuzzy: np.ndarray  # fuzz.ratio 0-100, (headings, targets)
+
+    def runner_ups(self, row: int, k: int = 3) -> List[Dict[str, object]]:
+        """Top-k targets for one heading by semantic score, with both scores."""
+        order = np.argsort(-self.semantic[row])[:k]
+        return [
+            {"target": self.targets[j], "semantic_score": round(float(self.semantic[row, j]), 3),
+             "fuzzy_score": round(float(self.fuzzy[row, j]), 1)}
+            for j in order
+        ]
+
+    def to_dict(self, top_k: int = 3) -> Dict[str, object]:
+        return {
+            "headings": self.headings,
+            "targets": self.targets,
+            "semantic": np.round(self.semantic, 3).tolist(),
+            "fuzzy": np.round(self.fuzzy, 1).tolist(),
+            "runner_ups": {h: self.runner_ups(i, top_k) for i, h in enumerate(self.headings)},
+        }
+
+
+def score_sections(model, model_id: str, headings: Sequence[str], target_keys: Sequence[str],
+                   normalize: Optional[Callable[[str], str]] = None,
+                   schema_version: str = TARGET_SCHEMA_VERSION,
+                   target_vectors: Optional[np.ndarray] = None,
+                   normalized_targets: Optional[Sequence[str]] = None) -> MatchScores:
+    """Semantic and fuzzy score matrices for every heading x target pair."""
+    return MatchScores(
+        headings=list(headings),
+        targets=list(target_keys),
+        semantic=semantic_scores(model, model_id, headings, target_keys, schema_version, target_vectors),
+        fuzzy=fuzzy_scores(headings, target_keys, normalize, normalized_targets=normalized_targets),
+    )
@@ -0,0 +1,137 @@
+"""
+Hierarchical section tree over the numbered headings of the docling markdown.
+
+section_parser only splits on the top-level "## <n>" headings, so a question whose
+reference_section is "8.3 Mode Transitions" used to get the whole "8 Detailed Software
+Requirement" chapter. build_section_tree() also picks up "## 8.3", "### 8.3.1", ... (docling
+does not reliably encode the depth in the number of '#', so the hierarchy comes from the
+heading number) and records the character offsets of every subtree.
+
+SectionTree.lookup() returns the smallest subtree that matches a reference such as
+"8.3 Mode Transitions", "8.3" or "Mode Transitions".
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from rapidfuzz import fuzz
+
+# "## 8.3 Mode Transitions", "### 8.3.1. Startup", "## 4) Product Description"
+_HEADING = re.compile(r"^(#{1,6})\s*(\d+(?:\.\d+)*)[\.)]?\s+(\S.*?)\s*$", re.MULTILINE)
+_REFERENCE = re.compile(r"^\s*(\d+(?:\.\d+)*)[\.)]?(?:\s+(.*?))?\s*$")
+
+TITLE_MATCH_THRESHOLD = 76  # same WRatio cut-off app0 uses for reference sections
+
+
+@dataclass
+class SectionNode:
+    number: Tuple[int, ...]
+    title: str
+    start: int  # offset of the heading line
+    end: int  # offset just past the last line of the subtree
+    children: List["SectionNode"] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        return f"{'.'.join(map(str, self.number))} {self.title}".strip()
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+    def walk(self) -> Iterator["SectionNode"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "number": ".".join(map(str, self.number)),
+            "title": self.title,
+            "start": self.start,
+            "end": self.end,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def _is_ancestor(parent: Tuple[int, ...], child: Tuple[int, ...]) -> bool:
+    return len(parent) < len(child) and child[:len(parent)] == parent
+
+
+class SectionTree:
+    def __init__(self, text: str, root: SectionNode):
+        self.text = text
+        self.root = root
+        self._by_number: Dict[Tuple[int, ...], List[SectionNode]] = {}
+        for node in root.walk():
+            if node is not root:
+                self._by_number.setdefault(node.number, []).append(node)
+
+    def nodes(self) -> Iterator[SectionNode]:
+        return (node for node in self.root.walk() if node is not self.root)
+
+    def section_text(self, node: SectionNode) -> str:
+        return self.text[node.start:node.end]
+
+    def find(self, number: Tuple[int, ...]) -> Optional[SectionNode]:
+        # a number can occur twice (e.g. a heading repeated in a table of contents); keep the larger subtree
+        candidates = self._by_number.get(number)
+        return max(candidates, key=lambda n: n.size) if candidates else None
+
+    def lookup(self, reference: str) -> Optional[SectionNode]:
+        """Smallest subtree matching `reference`, or None.
+
+        "8.3 Mode Transitions" -> node 8.3 if its title matches; "8.3" -> node 8.3;
+        "Mode Transitions" -> the deepest node whose title matches.
+        """
+        m = _REFERENCE.match(reference)
+        if m:
+            number = tuple(int(x) for x in m.group(1).split("."))
+            title = m.group(2) or ""
+            node = self.find(number)
+            # the reference numbering comes from the question template; only trust it when the title agrees
+            if node is not None and (not title or fuzz.WRatio(title, node.title) >= TITLE_MATCH_THRESHOLD):
+                return node
+            if not title:
+                return None
+            reference = title
+
+        best: Optional[SectionNode] = None
+        best_key = None
+        for node in self.nodes():
+            score = fuzz.WRatio(reference, node.title)
+            if score < TITLE_MATCH_THRESHOLD:
+                continue
+            key = (score, len(node.number), -node.size)
+            if best_key is None or key > best_key:
+                best, best_key = node, key
+        return best
+
+    def to_dict(self) -> List[Dict[str, object]]:
+        return [child.to_dict() for child in self.root.children]
+
+
+def build_section_tree(text: str) -> SectionTree:
+    root = SectionNode(number=(), title="", start=0, end=len(text))
+    stack = [root]
+    for m in _HEADING.finditer(text):
+        number = tuple(int(x) for x in m.group(2).split("."))
+        while len(stack) > 1 and not _is_ancestor(stack[-1].number, number):
+            stack.pop().end = m.start()
+        node = SectionNode(number=number, title=m.group(3), start=m.start(), end=len(text))
+        stack[-1].children.append(node)
+        stack.append(node)
+    return SectionTree(text, root)
+
+
+def load_section_tree(md_file: Union[str, Path]) -> SectionTree:
+    return build_section_tree(Path(md_file).read_text(encoding="utf-8"))
+
+
+def write_section_tree(tree: SectionTree, output_file: Path) -> Path:
+    output_file.write_text(json.dumps(tree.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+    return output_file
@@ -0,0 +1,181 @@
+"""
+Small resumable stage graph for the PDF -> descriptive mapped sections pipeline.
+
+Every stage declares the stages it depends on, the external input files it reads and
+the parameters that influence its output. After a stage finishes, a manifest is written
+to <work_dir>/.stages/<name>.json recording:
+
+- a hash of the parameters
+- the SHA-256 of every external input file
+- the output digest of every upstream stage
+- the SHA-256 of every file the stage produced
+
+On a rerun a stage is skipped when all of the above still match, so a crashed or
+re-parameterised run resumes at the first stale stage. Because downstream stages depend
+on the *output digest* of their parents, a stage that reruns but produces identical files
+does not invalidate the stages after it.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from graphlib import TopologicalSorter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from pipeline_cache import sha256_bytes, sha256_file
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_DIRNAME = ".stages"
+
+StageResult = Union[str, Path, Sequence[Union[str, Path]], None]
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[], StageResult]
+    deps: Sequence[str] = ()
+    inputs: Sequence[Union[str, Path]] = ()
+    params: Dict[str, object] = field(default_factory=dict)
+
+
+def _params_hash(params: Dict[str, object]) -> str:
+    return sha256_bytes(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+
+
+def _outputs_digest(outputs: Dict[str, str]) -> str:
+    return sha256_bytes(json.dumps(outputs, sort_keys=True).encode("utf-8"))
+
+
+def _as_paths(result: StageResult) -> List[Path]:
+    if result is None:
+        return []
+    if isinstance(result, (str, Path)):
+        return [Path(result)]
+    return [Path(p) for p in result]
+
+
+class StageGraph:
+    """Runs a DAG of stages in dependency order, skipping stages whose manifest is current."""
+
+    def __init__(self, work_dir: Union[str, Path]):
+        self.work_dir = Path(work_dir)
+        self.manifest_dir = self.work_dir / MANIFEST_DIRNAME
+        self.stages: Dict[str, Stage] = {}
+        self._outputs: Dict[str, List[Path]] = {}
+        self._digests: Dict[str, str] = {}
+
+    def add_stage(
+        self,
+        name: str,
+        run: Callable[[], StageResult],
+        deps: Iterable[str] = (),
+        inputs: Iterable[Union[str, Path]] = (),
+        params: Optional[Dict[str, object]] = None,
+    ) -> Stage:
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage name: {name}")
+        stage = Stage(name=name, run=run, deps=tuple(deps), inputs=tuple(inputs), params=dict(params or {}))
+        self.stages[name] = stage
+        return stage
+
+    def outputs(self, name: str) -> List[Path]:
+        """Files produced by a stage that has already been run or skipped in this execution."""
+        if name not in self._outputs:
+            raise KeyError(f"Stage '{name}' has not run yet")
+        return self._outputs[name]
+
+    # ----------------------
+    # Manifest helpers
+    # ----------------------
+
+    def _manifest_path(self, name: str) -> Path:
+        return self.manifest_dir / f"{name}.json"
+
+    def _rel(self, path: Path) -> str:
+        try:
+            return str(path.resolve().relative_to(self.work_dir.resolve()))
+        except ValueError:
+            return str(path.resolve())
+
+    def _abs(self, rel: str) -> Path:
+        p = Path(rel)
+        return p if p.is_absolute() else self.work_dir / p
+
+    def _expected_state(self, stage: Stage) -> Dict[str, object]:
+        return {
+            "params_hash": _params_hash(stage.params),
+            "inputs": {str(Path(p)): sha256_file(p) for p in stage.inputs},
+            "deps": {d: self._digests[d] for d in stage.deps},
+        }
+
+    def _stale_reason(self, stage: Stage, expected: Dict[str, object]) -> Optional[str]:
+        manifest_file = self._manifest_path(stage.name)
+        if not manifest_file.exists():
+            return "no manifest"
+        try:
+            manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+        except ValueError:
+            return "unreadable manifest"
+
+        if manifest.get("params_hash") != expected["params_hash"]:
+            return "parameters changed"
+        if manifest.get("inputs") != expected["inputs"]:
+            return "input files changed"
+        if manifest.get("deps") != expected["deps"]:
+            return "upstream stage changed"
+        for rel, digest in manifest.get("outputs", {}).items():
+            out = self._abs(rel)
+            if not out.exists() or sha256_file(out) != digest:
+                return f"output {rel} missing or modified"
+        return None
+
+    def _load_outputs(self, name: str) -> Dict[str, str]:
+        manifest = json.loads(self._manifest_path(name).read_text(encoding="utf-8"))
+        return manifest["outputs"]
+
+    # ----------------------
+    # Execution
+    # ----------------------
+
+    def run(self, force: Iterable[str] = ()) -> Dict[str, List[Path]]:
+        """Execute the graph. Stages listed in `force` are rerun even if their manifest is current."""
+        force = set(force)
+        order = TopologicalSorter({name: set(s.deps) for name, s in self.stages.items()}).static_order()
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+
+        for name in order:
+            if name not in self.stages:
+                raise KeyError(f"Unknown dependency stage: {name}")
+            stage = self.stages[name]
+            expected = self._expected_state(stage)
+            reason = "forced" if name in force else self._stale_reason(stage, expected)
+
+            if reason is None:
+                outputs = self._load_outputs(name)
+                logger.info("[stage_graph] %s is up to date, skipping", name)
+            else:
+                logger.info("[stage_graph] Running %s (%s)", name, reason)
+                start = time.time()
+                produced = _as_paths(stage.run())
+                outputs = {self._rel(p): sha256_file(p) for p in produced}
+                manifest = dict(expected)
+                manifest.update({
+                    "stage": name,
+                    "params": stage.params,
+                    "outputs": outputs,
+                    "duration_s": round(time.time() - start, 3),
+                    "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                })
+                self._manifest_path(name).write_text(
+                    json.dumps(manifest, ensure_ascii=False, indent=2, default=str), encoding="utf-8"
+                )
+
+            self._outputs[name] = [self._abs(rel) for rel in outputs]
+            self._digests[name] = _outputs_digest(outputs)
+
+        return dict(self._outputs)
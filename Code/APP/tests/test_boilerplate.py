@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from boilerplate import find_repeated_lines, line_signature  # noqa: E402
+
+
+def test_only_page_and_revision_counters_are_folded():
+    assert line_signature("Page 3 of 40") == line_signature("Page 17 of 40")
+    assert line_signature("VSH-CC-SRS Rev 2") == line_signature("VSH-CC-SRS Rev. 3")
+    assert line_signature("SRS-FR-012 The system shall log faults") != \
+        line_signature("SRS-FR-013 The system shall log faults")
+
+
+def _pdf(n_pages=5):
+    doc = fitz.open()
+    for n in range(1, n_pages + 1):
+        page = doc.new_page()
+        page.insert_text((72, 40), "ACME Confidential")
+        page.insert_text((72, 420), "Priority: High")  # body table row on every page
+        page.insert_text((72, 420 + 20 * n), f"SRS-FR-{n:03d} The system shall log faults")
+        page.insert_text((72, page.rect.height - 30), f"Page {n} of {n_pages}")
+    return doc.tobytes()
+
+
+def test_repeated_lines_come_from_page_edges():
+    signatures = find_repeated_lines(_pdf())
+    assert signatures == {line_signature("ACME Confidential"), line_signature("Page 1 of 5")}
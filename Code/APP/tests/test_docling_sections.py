@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("docling_core")
+from docling_core.types.doc import DocItemLabel, DoclingDocument  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from docling_sections import COVER_PAGE, document_sections  # noqa: E402
+
+
+def _document(headings):
+    document = DoclingDocument(name="srs")
+    for heading in headings:
+        document.add_heading(heading, level=1)
+        document.add_text(label=DocItemLabel.TEXT, text=f"Body of {heading}")
+    return document
+
+
+def test_stray_number_near_start_does_not_end_splitting():
+    document = _document(["6407 VSH CC SRS", "1 Introduction", "2 Acronyms", "3 Requirements"])
+    sections = document_sections([(0, document)]).sections
+    assert list(sections) == ["## 1 Introduction\n", "## 2 Acronyms\n", "## 3 Requirements\n", COVER_PAGE]
+    assert "6407 VSH CC SRS" in sections[COVER_PAGE]
+
+
+def test_one_skipped_number_still_splits():
+    document = _document(["1 Introduction", "3 Requirements", "2024 Revision history", "4 Interfaces"])
+    sections = document_sections([(0, document)]).sections
+    assert list(sections) == ["## 1 Introduction\n", "## 3 Requirements\n", "## 4 Interfaces\n", COVER_PAGE]
+    assert "2024 Revision history" in sections["## 3 Requirements\n"]
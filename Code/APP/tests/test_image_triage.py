@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from image_triage import DESCRIBE, SKIP, image_stats, triage_image  # noqa: E402
+
+
+def _block_diagram(mode):
+    """Sparse boxes-and-labels diagram: thin black strokes on a white page."""
+    img = Image.new(mode, (800, 500), "white" if mode != "1" else 1)
+    draw = ImageDraw.Draw(img)
+    ink = 0 if mode == "1" else "black"
+    for i, x in enumerate((40, 240, 440)):
+        draw.rectangle([x, 200, x + 140, 280], outline=ink, width=2)
+        draw.text((x + 20, 230), f"Module {i}", fill=ink)
+        if i:
+            draw.line([x - 60, 240, x, 240], fill=ink, width=2)
+    return img
+
+
+def _state_machine():
+    img = Image.new("1", (600, 600), 1)
+    draw = ImageDraw.Draw(img)
+    states = [(100, 100), (400, 100), (250, 400)]
+    for i, (x, y) in enumerate(states):
+        draw.ellipse([x - 50, y - 50, x + 50, y + 50], outline=0, width=2)
+        draw.text((x - 20, y), f"S{i}", fill=0)
+    for (x0, y0), (x1, y1) in zip(states, states[1:] + states[:1]):
+        draw.line([x0, y0, x1, y1], fill=0, width=2)
+    return img
+
+
+def test_line_diagrams_are_described():
+    for img in (_block_diagram("1"), _block_diagram("RGB"), _state_machine()):
+        stats = image_stats(img)
+        assert stats.entropy < 1.0  # the statistics that used to get these skipped
+        assert triage_image(stats)[0] == DESCRIBE
+
+
+def test_solid_fill_is_skipped():
+    for colour in ("white", (200, 200, 200)):
+        stats = image_stats(Image.new("RGB", (400, 300), colour))
+        assert triage_image(stats) == (SKIP, "near-solid fill")
@@ -1,27 +1,20 @@
 import json
+import sys
 from collections import Counter
-import requests
+from pathlib import Path
 import re
 import streamlit as st
 
+# the shared Ollama client lives next to the Streamlit app in Code/APP
+_APP_DIR = Path(__file__).resolve().parents[2] / "Code" / "APP"
+if _APP_DIR.is_dir() and str(_APP_DIR) not in sys.path:
+    sys.path.append(str(_APP_DIR))
+
+from ollama_client import OllamaError, default_client  # noqa: E402
+
 def query_ollama(prompt):
-    """Base single query to Ollama (unchanged)."""
-    try:
-        url = "http://localhost:11434/api/generate"
-        response = requests.post(
-            url,
-            json={
-                "model": "gemma3:4",
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.01},
-            },
-        )
-        result = response.json()
-        return result.get("response", "")
-    except Exception as e:
-        print(f"Error querying Ollama server: {str(e)}")
-        return ""
+    """Base single query to Ollama through the shared client; raises OllamaError when the server fails."""
+    return default_client().generate("gemma3:4", prompt, options={"temperature": 0.01})
 
 def query_ollama_majority(content_to_search, prompt):
     """
@@ -45,7 +38,12 @@ def query_ollama_majority(content_to_search, prompt):
         Return the response strictly in JSON format: {{ "Answer": "Yes/No", "Reason": "..." }}
         """
 
-        raw_resp = query_ollama(full_prompt)
+        try:
+            raw_resp = query_ollama(full_prompt)
+        except OllamaError as e:
+            # vote over the runs that got an answer
+            print(f"[Warning] Run {i+1} failed: {e}")
+            continue
 
         try:
             # Handle ```json blocks
@@ -79,7 +77,12 @@ def query_ollama_majority(content_to_search, prompt):
     {combined_reasons}
     """
 
-    concise_reason = query_ollama(summary_prompt)
+    try:
+        concise_reason = query_ollama(summary_prompt)
+    except OllamaError as e:
+        # keep the vote; fall back to the first run's reason
+        print(f"[Warning] Could not summarize reasons: {e}")
+        concise_reason = reasons[0]
 
     # Optional: clean up the summarized text
     concise_reason = re.sub(r"[\n\r]+", " ", concise_reason).strip()
@@ -69,6 +69,22 @@ if st.session_state.generated_result:
     df = pd.DataFrame(data)
     st.dataframe(df, use_container_width=True)
 
+    # Runner-up matches per extracted heading (from the score matrices, no rescoring)
+    runner_ups = result.get("match_scores", {}).get("runner_ups", {})
+    if runner_ups:
+        with st.expander("🥈 Runner-up matches per extracted heading"):
+            rows = []
+            for heading, candidates in runner_ups.items():
+                for rank, cand in enumerate(candidates, start=1):
+                    rows.append({
+                        "Extracted Heading": heading,
+                        "Rank": rank,
+                        "Target": cand["target"],
+                        "Semantic Score": cand["semantic_score"],
+                        "Fuzzy Score": cand["fuzzy_score"],
+                    })
+            st.dataframe(pd.DataFrame(rows), use_container_width=True)
+
     # Section search functionality
     st.markdown("---")
     st.subheader("🔍 Search for a Section")
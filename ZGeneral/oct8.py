@@ -17,7 +17,7 @@ Notes:
 - This file expects the same external libraries you used previously (docling, ollama, sentence-transformers,
   rapidfuzz, pymupdf). If docling is not available the pipeline will raise a clear error.
 - You can configure certain values via environment variables: OLLAMA_HOST, OLLAMA_MODEL, IMAGE_RESOLUTION_SCALE,
-  SENTENCE_TRANSFORMER_MODEL_PATH.
+  SENTENCE_TRANSFORMER_MODEL_PATH, EMBEDDING_BACKEND (torch | onnx for the int8 ONNX Runtime model).
 
 """
 from __future__ import annotations
@@ -27,15 +27,15 @@ import json
 import logging
 import os
 import re
+import sys
 import time
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 import fitz
-import numpy as np
-import ollama
-from rapidfuzz import fuzz
-from sentence_transformers import SentenceTransformer, util
+
+if TYPE_CHECKING:  # imported by load_embedding_model only for the torch backend
+    from sentence_transformers import SentenceTransformer
 
 # Try importing docling components (optional at runtime)
 try:
@@ -53,6 +53,21 @@ except Exception:
     PdfFormatOption = None  # type: ignore
     DOC_LING_AVAILABLE = False
 
+# Shared pipeline helpers (stage graph, caches, ...) live next to the Streamlit app in Code/APP
+_APP_DIR = Path(__file__).resolve().parents[1] / "Code" / "APP"
+if _APP_DIR.is_dir() and str(_APP_DIR) not in sys.path:
+    sys.path.append(str(_APP_DIR))
+
+from converter_pool import ConverterOptions, convert, converter_stats  # noqa: E402
+from image_describer import DEDUPE_IMAGES, TRIAGE_IMAGES, VISION_CONCURRENCY, describe_image_folder  # noqa: E402
+from image_export import ImageExportOptions, ImageWriter, numbered_images  # noqa: E402
+from onnx_embedder import EMBEDDING_BACKEND, embedding_model_id, load_embedding_model  # noqa: E402
+from parallel_convert import convert_pdf_parallel  # noqa: E402
+from schema_registry import DEFAULT_DOC_TYPE, TargetSchema, get_schema  # noqa: E402
+from section_assignment import ASSIGNMENT_MODE, ASSIGNMENT_MODES, assign_sections  # noqa: E402
+from section_scoring import MatchScores, clean_heading, score_sections  # noqa: E402
+from stage_graph import StageGraph  # noqa: E402
+
 
 # ----------------------
 # Logging
@@ -71,35 +86,47 @@ logger = logging.getLogger(__name__)
 MODEL_NAME = os.environ.get("OLLAMA_MODEL", "gemma3:4b")
 OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
 IMAGE_RESOLUTION_SCALE = float(os.environ.get("IMAGE_RESOLUTION_SCALE", "2.0"))
+DOCLING_WORKERS = int(os.environ.get("DOCLING_WORKERS", "1"))
+OCR_ROUTING = os.environ.get("OCR_ROUTING", "1") == "1"
+IMAGE_EXPORT = ImageExportOptions.from_env()
 SENTENCE_TRANSFORMER_MODEL_PATH = os.environ.get(
     "SENTENCE_TRANSFORMER_MODEL_PATH", "/home/dlpda/Aayush/sep22/model"
 )
+IMAGE_PROMPT = (
+    "You are an assistant that writes clear, objective, and useful descriptions of images. "
+    "Describe the image in 50-150 words with meaningful detail — objects, layout, colors, and apparent purpose. "
+    "Do not make unverifiable claims (e.g. personal identities or private data). Keep the description factual and concise."
+)
 
 
 # ----------------------
 # Lazy-loaded sentence transformer
 # ----------------------
 _sentence_model: Optional[SentenceTransformer] = None
+_sentence_model_id: Optional[str] = None  # path/name actually loaded; keys the embedding cache
 
 
 def get_sentence_model(path: Optional[str] = None) -> SentenceTransformer:
     """Lazy load the sentence transformer. Falls back to 'all-MiniLM-L6-v2' if the configured path fails.
 
-    Keeps the heavy initialization out of module import time.
+    Keeps the heavy initialization out of module import time. With EMBEDDING_BACKEND=onnx an
+    int8 ONNX Runtime model with the same encode() interface is returned instead.
     """
-    global _sentence_model
+    global _sentence_model, _sentence_model_id
     if _sentence_model is not None:
         return _sentence_model
 
     model_path = path or SENTENCE_TRANSFORMER_MODEL_PATH
     try:
-        logger.info("Loading sentence-transformer from: %s", model_path)
-        _sentence_model = SentenceTransformer(model_path)
+        logger.info("Loading sentence-transformer from: %s (%s backend)", model_path, EMBEDDING_BACKEND)
+        _sentence_model = load_embedding_model(model_path)
+        _sentence_model_id = embedding_model_id(model_path)
     except Exception as e:
         logger.warning(
             "Failed to load model from %s: %s. Falling back to 'all-MiniLM-L6-v2'.", model_path, e
         )
-        _sentence_model = SentenceTransformer("all-MiniLM-L6-v2")
+        _sentence_model = load_embedding_model("all-MiniLM-L6-v2")
+        _sentence_model_id = embedding_model_id("all-MiniLM-L6-v2")
     return _sentence_model
 
 
@@ -169,9 +196,21 @@ def crop_pdf_headers_footers(
 # Markdown + Image extraction
 # ----------------------
 
-def md_extract(pdf_path: str, output_dir: Path) -> Path:
+def md_extract(
+    pdf_path: str,
+    output_dir: Path,
+    workers: int = DOCLING_WORKERS,
+    ocr_routing: bool = OCR_ROUTING,
+    image_options: ImageExportOptions = IMAGE_EXPORT,
+) -> Path:
     """Use docling to convert the (cropped) PDF to markdown and extract images.
 
+    With workers > 1 the PDF is split into page ranges that are converted in a process pool
+    and merged back in page order (images keep their global 1.png, 2.png, ... numbering).
+    With ocr_routing only the pages without a usable text layer go through OCR; the per-page
+    decisions are saved to ocr_routing.json. Pictures are downscaled/encoded according to
+    `image_options` and written by a background thread pool.
+
     Returns path to the generated markdown file.
     """
     if not DOC_LING_AVAILABLE:
@@ -184,18 +223,19 @@ def md_extract(pdf_path: str, output_dir: Path) -> Path:
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-    pipeline_options = PdfPipelineOptions(
-        images_scale=IMAGE_RESOLUTION_SCALE,
-        generate_page_images=True,
-        generate_picture_images=True,
-        ocr_options=EasyOcrOptions(),
-    )
-    converter = DocumentConverter(
-        format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
-    )
+    if workers > 1 or ocr_routing:
+        return convert_pdf_parallel(
+            pdf_path,
+            output_dir,
+            workers=workers,
+            ocr_routing=ocr_routing,
+            options=ConverterOptions(images_scale=IMAGE_RESOLUTION_SCALE),
+            image_options=image_options,
+        )
 
+    # converters are pooled per process (see Code/APP/converter_pool.py), so models load once
     try:
-        conv_res = converter.convert(pdf_path)
+        conv_res = convert(pdf_path, ConverterOptions(images_scale=IMAGE_RESOLUTION_SCALE))
     except Exception as e:
         logger.exception("DocumentConverter.convert failed: %s", e)
         raise
@@ -203,21 +243,20 @@ def md_extract(pdf_path: str, output_dir: Path) -> Path:
     doc_filename = conv_res.input.file.stem
     pic_count = 0
 
-    # extract images (PictureItem)
-    for element, _meta in conv_res.document.iterate_items():
-        try:
-            if PictureItem is not None and isinstance(element, PictureItem):
-                pic_count += 1
-                out_file = output_dir / f"{pic_count}.png"
-                try:
-                    img = element.get_image(conv_res.document)
-                    # img should be a PIL image-like object with .save
-                    img.save(out_file, "PNG")
-                except Exception as e:
-                    logger.warning("Failed to save image %s: %s", out_file, e)
-        except Exception:
-            # be defensive; iterate_items can yield unexpected types
-            logger.debug("Skipping non-picture element or unexpected element type.")
+    # extract images (PictureItem); encoding + writing overlap with the document walk
+    with ImageWriter(image_options) as writer:
+        for element, _meta in conv_res.document.iterate_items():
+            try:
+                if PictureItem is not None and isinstance(element, PictureItem):
+                    pic_count += 1
+                    out_file = output_dir / f"{pic_count}{image_options.extension}"
+                    try:
+                        writer.submit(element.get_image(conv_res.document), out_file)
+                    except Exception as e:
+                        logger.warning("Failed to save image %s: %s", out_file, e)
+            except Exception:
+                # be defensive; iterate_items can yield unexpected types
+                logger.debug("Skipping non-picture element or unexpected element type.")
 
     md_file = output_dir / f"{doc_filename}.md"
     try:
@@ -227,6 +266,11 @@ def md_extract(pdf_path: str, output_dir: Path) -> Path:
         raise
 
     logger.info("[md_extract] Exported %d images → %s (%.2fs)", pic_count, md_file, time.time() - start)
+    for stats in converter_stats():
+        logger.info(
+            "[md_extract] Converter pool %s: load %.2fs, convert %.2fs over %d document(s)",
+            stats["options"], stats["load_seconds"], stats["convert_seconds"], stats["conversions"],
+        )
     return md_file
 
 
@@ -234,60 +278,37 @@ def md_extract(pdf_path: str, output_dir: Path) -> Path:
 # Image description generation (via ollama)
 # ----------------------
 
-def process_images(image_folder: Path, output_file: Path, model_name: str = MODEL_NAME, host: str = OLLAMA_HOST) -> Path:
+def process_images(
+    image_folder: Path,
+    output_file: Path,
+    model_name: str = MODEL_NAME,
+    host: str = OLLAMA_HOST,
+    prompt: str = IMAGE_PROMPT,
+    concurrency: int = VISION_CONCURRENCY,
+) -> Path:
     """Generate textual descriptions for images in the target folder using ollama.
 
+    Up to `concurrency` requests are kept in flight (see Code/APP/image_describer.py);
+    match it to the number of parallel slots of the Ollama server.
+
     Writes a JSON list of {"image": filename, "description": text} to output_file.
     Returns output_file (Path).
     """
     start = time.time()
     image_folder = Path(image_folder)
-    image_files = sorted([f for f in os.listdir(image_folder) if f.lower().endswith((".png", ".jpg", ".jpeg"))])
-    client = ollama.Client(host)
+    # numeric order (2.png before 10.png), so a duplicate cluster's representative is its first picture
+    image_files = [p.name for p in numbered_images(image_folder)]
 
     if not image_files:
         logger.warning("[process_images] No images found in %s", image_folder)
         return output_file
 
-    descriptions = []
-    for image_file in image_files:
-        image_path = str(image_folder / image_file)
-        prompt = (
-            "You are an assistant that writes clear, objective, and useful descriptions of images. "
-            "Describe the image in 50-150 words with meaningful detail — objects, layout, colors, and apparent purpose. "
-            "Do not make unverifiable claims (e.g. personal identities or private data). Keep the description factual and concise."
-        )
-
-        # try a few times on transient failure
-        last_err = None
-        for attempt in range(3):
-            try:
-                response = client.generate(model_name, prompt, images=[image_path], stream=False)
-                # ollama responses may have different formats; be defensive
-                description = ""
-                if isinstance(response, dict):
-                    description = response.get("response") or response.get("text") or ""
-                elif hasattr(response, "get"):
-                    description = response.get("response", "")
-                else:
-                    # fallback to str()
-                    description = str(response)
-
-                description = (description or "").strip()
-                if not description:
-                    raise ValueError("empty description")
-
-                descriptions.append({"image": image_file, "description": description})
-                logger.info("[process_images] Processed %s", image_file)
-                last_err = None
-                break
-            except Exception as e:
-                last_err = e
-                logger.warning("[process_images] attempt %d for %s failed: %s", attempt + 1, image_file, e)
-                time.sleep(0.5 * (attempt + 1))
-
-        if last_err is not None:
-            logger.error("[process_images] Failed to generate description for %s after retries: %s", image_file, last_err)
+    # near-duplicates are described once and decorative images skipped; the rest use
+    # shared OllamaClient calls run through asyncio.to_thread with bounded concurrency, a timeout
+    # and retry/backoff; entries keep image order
+    descriptions = describe_image_folder(
+        image_folder, image_files, model_name, prompt, host=host, concurrency=concurrency
+    )
 
     if descriptions:
         output_file.parent.mkdir(parents=True, exist_ok=True)
@@ -317,17 +338,19 @@ def replace_images_in_md(md_input_path: Path, md_output_path: Path, json_file: P
     """
     start = time.time()
     desc_map = get_description_map_from_json(json_file)
+    # placeholders are matched by image number, whatever the export format (1.png, 1.jpg, ...)
+    desc_by_number = {Path(name).stem: desc for name, desc in desc_map.items()}
 
     text = md_input_path.read_text(encoding="utf-8")
 
-    # 1) replace placeholder occurrences sequentially (assumes placeholders correspond to 1.png, 2.png, ...)
+    # 1) replace placeholder occurrences sequentially (assumes placeholders correspond to images 1, 2, ...)
     counter = 1
 
     def _placeholder_repl(_m: re.Match) -> str:
         nonlocal counter
-        img_name = f"{counter}.png"
+        desc = desc_by_number.get(str(counter))
         counter += 1
-        return (desc_map.get(img_name, _m.group(0))) + "\n\n" if desc_map.get(img_name) else _m.group(0)
+        return desc + "\n\n" if desc else _m.group(0)
 
     text = re.sub(r"<!--\s*image\s*-->", _placeholder_repl, text)
 
@@ -422,10 +445,19 @@ def map_sections_to_target(
     target_dict: Dict[str, str],
     semantic_threshold: float = 0.6,
     fuzzy_threshold: float = 60.0,
-) -> Dict[str, Dict[str, Optional[object]]]:
+    return_scores: bool = False,
+    schema: Optional[TargetSchema] = None,
+    mode: str = ASSIGNMENT_MODE,
+):
     """Map sections to target keys using sentence embeddings (cosine similarity) and fuzzy matching.
 
-    Returns a mapping from target_key -> {content, semantic_score, fuzzy_score}
+    mode="greedy" gives every section its own best target; mode="optimal" solves the heading x
+    target assignment over the whole score matrix within the schema's capacities.
+
+    Returns a mapping from target_key -> {content, semantic_score, fuzzy_score}; with
+    return_scores=True, returns (mapping, MatchScores) so the full heading x target matrices
+    (and runner-up matches) are available without rescoring. Pass the `schema` target_dict came
+    from to reuse its cached target artifacts and its fallback key.
     """
     model = get_sentence_model()
     target_keys = list(target_dict.keys())
@@ -435,41 +467,26 @@ def map_sections_to_target(
         k: {"content": "", "semantic_score": None, "fuzzy_score": None} for k in target_keys
     }
 
-    # compute target embeddings once
-    target_embeddings = model.encode(target_keys, convert_to_tensor=True, show_progress_bar=False)
-
-    for section_key, section_content in sections_dict.items():
-        # prefer using the heading text without the leading '##' for embedding
-        cleaned_heading = re.sub(r"^##\s*", "", section_key).strip()
-        if not cleaned_heading:
-            continue
-
-        section_emb = model.encode(cleaned_heading, convert_to_tensor=True)
-        cos_scores = util.cos_sim(section_emb, target_embeddings)[0].cpu().numpy()
-
-        best_idx = int(np.argmax(cos_scores))
-        best_sem_score = float(cos_scores[best_idx])
-        best_sem_key = target_keys[best_idx]
-
-        # fuzzy matching (0-100)
-        norm_section = _normalize_text_for_fuzzy(cleaned_heading)
-        fuzzy_scores = [fuzz.ratio(norm_section, _normalize_text_for_fuzzy(k)) for k in target_keys]
-        best_fuzzy_idx = int(np.argmax(fuzzy_scores))
-        best_fuzzy_score = float(fuzzy_scores[best_fuzzy_idx])
-        best_fuzzy_key = target_keys[best_fuzzy_idx]
-
-        chosen_key = None
-        chosen_sem = None
-        chosen_fuzzy = None
-
-        if best_sem_score >= semantic_threshold:
-            chosen_key = best_sem_key
-            chosen_sem = round(best_sem_score, 3)
-            chosen_fuzzy = int(best_fuzzy_score)
-        elif best_fuzzy_score >= fuzzy_threshold:
-            chosen_key = best_fuzzy_key
-            chosen_sem = round(best_sem_score, 3)
-            chosen_fuzzy = int(best_fuzzy_score)
+    # prefer using the heading text without the leading '##' for embedding
+    sections = [(clean_heading(k), v) for k, v in sections_dict.items()]
+    sections = [(heading, content) for heading, content in sections if heading]
+
+    # one batched encode for all headings (target embeddings come from the schema / on-disk float16 cache)
+    # and one multi-core cdist for the fuzzy ratios (0-100) against pre-normalised targets
+    headings = [heading for heading, _ in sections]
+    if schema is not None and schema.keys == target_keys:
+        scores: MatchScores = schema.score_sections(model, _sentence_model_id, headings, _normalize_text_for_fuzzy)
+    else:
+        scores = score_sections(model, _sentence_model_id, headings, target_keys, _normalize_text_for_fuzzy)
+
+    capacities = schema.capacity_list() if schema is not None and schema.keys == target_keys else None
+    assignment = assign_sections(scores, semantic_threshold, fuzzy_threshold, mode, capacities)
+
+    for row, (cleaned_heading, section_content) in enumerate(sections):
+        target_idx = assignment[row]
+        chosen_key = target_keys[target_idx] if target_idx is not None else None
+        chosen_sem = round(float(scores.semantic[row, target_idx]), 3) if chosen_key else None
+        chosen_fuzzy = int(scores.fuzzy[row, target_idx]) if chosen_key else None
 
         if chosen_key:
             # append if content already exists (helps when multiple sections map to the same key)
@@ -489,15 +506,22 @@ def map_sections_to_target(
                 chosen_fuzzy,
             )
         else:
-            # If not mapped, append to '17 SomethingElse' if present, else create 'SomethingElse'
-            fallback_key = next((k for k in target_keys if "somethingelse" in k.replace(" ", "").lower()), None)
+            # If not mapped, append to the schema's fallback key ('17 SomethingElse' for SRS) if there is one
+            fallback_key = schema.fallback if schema is not None else next(
+                (k for k in target_keys if "somethingelse" in k.replace(" ", "").lower()), None
+            )
             if fallback_key:
                 mapped[fallback_key]["content"] += "\n" + section_content if mapped[fallback_key]["content"] else section_content
                 mapped[fallback_key]["semantic_score"] = mapped[fallback_key].get("semantic_score") or None
                 mapped[fallback_key]["fuzzy_score"] = mapped[fallback_key].get("fuzzy_score") or None
             else:
-                logger.info("Section '%s' left unmapped (sem=%.3f, fuzzy=%.1f)", cleaned_heading, best_sem_score, best_fuzzy_score)
+                logger.info(
+                    "Section '%s' left unmapped (sem=%.3f, fuzzy=%.1f)",
+                    cleaned_heading, float(scores.semantic[row].max()), float(scores.fuzzy[row].max()),
+                )
 
+    if return_scores:
+        return mapped, scores
     return mapped
 
 
@@ -505,52 +529,116 @@ def map_sections_to_target(
 # Main pipeline wrappers
 # ----------------------
 
-def pdf_to_descriptive_mapped_sections(pdf_path: str, output_dir: str) -> Dict[str, object]:
+def pdf_to_descriptive_mapped_sections(
+    pdf_path: str,
+    output_dir: str,
+    image_prompt: str = IMAGE_PROMPT,
+    force: Tuple[str, ...] = (),
+    workers: int = DOCLING_WORKERS,
+    doc_type: str = DEFAULT_DOC_TYPE,
+    assignment: str = ASSIGNMENT_MODE,
+) -> Dict[str, object]:
+    """Run crop -> docling -> ollama -> section mapping as a resumable stage graph.
+
+    Each stage records a manifest under <output_dir>/.stages; rerunning with the same output
+    directory skips stages whose inputs and parameters are unchanged. Stage names listed in
+    `force` are always rerun. Sections are mapped onto the target keys of the `doc_type` schema.
+    """
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    json_file = output_dir / "image_descriptions.json"
+    sections_file = output_dir / "sections.json"
+    mapped_file = output_dir / "mapped_sections.json"
+    scores_file = output_dir / "match_scores.json"
+    graph = StageGraph(output_dir)
+
     # Step 0: crop headers/footers
-    cropped_pdf = crop_pdf_headers_footers(pdf_path, output_dir)
+    graph.add_stage(
+        "crop",
+        lambda: crop_pdf_headers_footers(pdf_path, output_dir),
+        inputs=[pdf_path],
+        params={"top_percent": 0.08, "bottom_percent": 0.1},
+    )
 
     # Step 1: markdown + images
-    md_file = md_extract(str(cropped_pdf), output_dir)
+    def _md_stage() -> List[Path]:
+        for old_image in numbered_images(output_dir):
+            old_image.unlink()
+        md = md_extract(str(graph.outputs("crop")[0]), output_dir, workers=workers)
+        return [md] + numbered_images(output_dir)
+
+    graph.add_stage(
+        "md_extract",
+        _md_stage,
+        deps=["crop"],
+        params={"images_scale": IMAGE_RESOLUTION_SCALE, "ocr_routing": OCR_ROUTING,
+                "image_export": IMAGE_EXPORT.output_settings()},
+    )
 
     # Step 2: image descriptions
-    json_file = output_dir / "image_descriptions.json"
-    process_images(output_dir, json_file)
+    def _images_stage() -> Path:
+        process_images(output_dir, json_file, prompt=image_prompt)
+        if not json_file.exists():
+            json_file.write_text("[]", encoding="utf-8")
+        return json_file
+
+    graph.add_stage(
+        "process_images",
+        _images_stage,
+        deps=["md_extract"],
+        params={"model": MODEL_NAME, "prompt": image_prompt, "dedupe": DEDUPE_IMAGES, "triage": TRIAGE_IMAGES},
+    )
 
     # Step 3: replace placeholders
-    md_with_desc = output_dir / f"{md_file.stem}_with_desc.md"
-    output_path, final_text = replace_images_in_md(md_file, md_with_desc, json_file)
+    def _replace_stage() -> Path:
+        md = graph.outputs("md_extract")[0]
+        out, _text = replace_images_in_md(md, output_dir / f"{md.stem}_with_desc.md", json_file)
+        return out
+
+    graph.add_stage("replace_images", _replace_stage, deps=["md_extract", "process_images"])
 
     # Step 4: headings & sections
-    headings = heading_extraction(md_with_desc)
-    sections = content_extraction(md_with_desc, headings)
-
-    # Step 5: target keys
-    target_dict = {
-        "Cover Page": "",
-        "1 Introduction": "",
-        "2 Acronyms": "",
-        "3 Reference Documents": "",
-        "4 Product Description": "",
-        "5 Assumptions": "",
-        "6 Hardware Requirements": "",
-        "7 States and Mode of Software": "",
-        "8 Detailed Software Requirement": "",
-        "9 Timing Requirements": "",
-        "10 Loadable Data Requirements": "",
-        "11 Internal and External Interface Requirement": "",
-        "12 Safety & Security Requirements": "",
-        "13 Software Testing Requirements": "",
-        "14 General Constraints": "",
-        "15 Traceability Matrix": "",
-        "16 Overview": "",
-        "17 SomethingElse": "",
-    }
+    def _sections_stage() -> Path:
+        md_with_desc = graph.outputs("replace_images")[0]
+        sections = content_extraction(md_with_desc, heading_extraction(md_with_desc))
+        sections_file.write_text(json.dumps(sections, ensure_ascii=False, indent=2), encoding="utf-8")
+        return sections_file
+
+    graph.add_stage("sections", _sections_stage, deps=["replace_images"])
+
+    # Step 5: target keys (schemas/<doc_type>.json)
+    schema = get_schema(doc_type)
 
     # Step 6: mapping
-    mapped_sections = map_sections_to_target(sections, target_dict)
+    def _map_stage() -> List[Path]:
+        sections = json.loads(sections_file.read_text(encoding="utf-8"))
+        mapped, scores = map_sections_to_target(
+            sections, schema.target_dict(), return_scores=True, schema=schema, mode=assignment
+        )
+        mapped_file.write_text(json.dumps(mapped, ensure_ascii=False, indent=2), encoding="utf-8")
+        scores_file.write_text(json.dumps(scores.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        return [mapped_file, scores_file]
+
+    graph.add_stage(
+        "map_sections",
+        _map_stage,
+        deps=["sections"],
+        params={
+            "schema": schema.cache_version,
+            "targets": schema.keys,
+            "capacities": schema.capacity_list(),
+            "assignment": assignment,
+            "sentence_model": SENTENCE_TRANSFORMER_MODEL_PATH,
+            "embedding_backend": EMBEDDING_BACKEND,
+        },
+    )
+
+    outputs = graph.run(force=force)
+    md_file = outputs["md_extract"][0]
+    final_text = outputs["replace_images"][0].read_text(encoding="utf-8")
+    mapped_sections = json.loads(mapped_file.read_text(encoding="utf-8"))
+    match_scores = json.loads(scores_file.read_text(encoding="utf-8"))
 
     logger.info("Extraction and mapping complete. Markdown: %s; Descriptions: %s; Mapped keys: %d", md_file, json_file, len(mapped_sections))
 
@@ -559,10 +647,16 @@ def pdf_to_descriptive_mapped_sections(pdf_path: str, output_dir: str) -> Dict[s
         "image_descriptions_json": str(json_file),
         "md_with_descriptions": final_text,
         "mapped_sections": mapped_sections,
+        "match_scores": match_scores,
     }
 
 
-def pdf_to_descriptive_mapped_sections2(md_path: str, output_dir: Optional[str] = None) -> Dict[str, object]:
+def pdf_to_descriptive_mapped_sections2(
+    md_path: str,
+    output_dir: Optional[str] = None,
+    doc_type: str = DEFAULT_DOC_TYPE,
+    assignment: str = ASSIGNMENT_MODE,
+) -> Dict[str, object]:
     """Process an existing markdown file (with descriptions already) and map sections to the target keys.
 
     Useful when you already have a markdown and don't want to run docling/ollama.
@@ -576,28 +670,8 @@ def pdf_to_descriptive_mapped_sections2(md_path: str, output_dir: Optional[str]
     headings = heading_extraction(md_path)
     sections = content_extraction(md_path, headings)
 
-    target_dict = {
-        "Cover Page": "",
-        "1 Introduction": "",
-        "2 Acronyms": "",
-        "3 Reference Documents": "",
-        "4 Product Description": "",
-        "5 Assumptions": "",
-        "6 Hardware Requirements": "",
-        "7 States and Mode of Software": "",
-        "8 Detailed Software Requirement": "",
-        "9 Timing Requirements": "",
-        "10 Loadable Data Requirements": "",
-        "11 Internal and External Interface Requirement": "",
-        "12 Safety & Security Requirements": "",
-        "13 Software Testing Requirements": "",
-        "14 General Constraints": "",
-        "15 Traceability Matrix": "",
-        "16 Overview": "",
-        "17 SomethingElse": "",
-    }
-
-    mapped_sections = map_sections_to_target(sections, target_dict)
+    schema = get_schema(doc_type)
+    mapped_sections = map_sections_to_target(sections, schema.target_dict(), schema=schema, mode=assignment)
 
     logger.info("Mapped sections from markdown: %s. Keys mapped: %d", md_path, len([k for k, v in mapped_sections.items() if v.get("content")]))
 
@@ -617,6 +691,22 @@ def _build_cli() -> argparse.ArgumentParser:
     g.add_argument("--pdf", help="input PDF to process (this will run crop -> docling -> ollama)")
     g.add_argument("--md", help="existing markdown file already containing image descriptions")
     p.add_argument("--out", default="./out", help="output directory")
+    p.add_argument("--workers", type=int, default=DOCLING_WORKERS, help="docling worker processes (page-parallel if > 1)")
+    p.add_argument("--doc-type", default=DEFAULT_DOC_TYPE, help="target schema to map sections onto (schemas/<doc_type>.json)")
+    p.add_argument(
+        "--assignment",
+        choices=ASSIGNMENT_MODES,
+        default=ASSIGNMENT_MODE,
+        help="greedy: best target per section; optimal: best overall assignment within the schema's capacities",
+    )
+    p.add_argument(
+        "--force",
+        nargs="*",
+        default=(),
+        metavar="STAGE",
+        help="rerun these stages even if their manifest is current "
+        "(crop, md_extract, process_images, replace_images, sections, map_sections)",
+    )
     return p
 
 
@@ -625,12 +715,15 @@ def main() -> None:
     args = parser.parse_args()
 
     if args.pdf:
-        res = pdf_to_descriptive_mapped_sections(args.pdf, args.out)
+        res = pdf_to_descriptive_mapped_sections(
+            args.pdf, args.out, force=tuple(args.force), workers=args.workers,
+            doc_type=args.doc_type, assignment=args.assignment,
+        )
         # save mapped sections as JSON sample
         Path(args.out).joinpath("mapped_sections.json").write_text(json.dumps(res["mapped_sections"], ensure_ascii=False, indent=2), encoding="utf-8")
         logger.info("Saved mapped_sections.json to %s", args.out)
     else:
-        res = pdf_to_descriptive_mapped_sections2(args.md, args.out)
+        res = pdf_to_descriptive_mapped_sections2(args.md, args.out, doc_type=args.doc_type, assignment=args.assignment)
         Path(args.out).joinpath("mapped_sections_from_md.json").write_text(json.dumps(res["mapped_sections"], ensure_ascii=False, indent=2), encoding="utf-8")
         logger.info("Saved mapped_sections_from_md.json to %s", args.out)
 
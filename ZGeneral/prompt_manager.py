@@ -1,8 +1,16 @@
 import streamlit as st
 import json
 import os
-import ollama
+import sys
 from datetime import datetime
+from pathlib import Path
+
+# the shared Ollama client lives next to the Streamlit app in Code/APP
+_APP_DIR = Path(__file__).resolve().parents[1] / "Code" / "APP"
+if _APP_DIR.is_dir() and str(_APP_DIR) not in sys.path:
+    sys.path.append(str(_APP_DIR))
+
+from ollama_client import default_client  # noqa: E402
 
 # ========================
 # STREAMLIT PAGE SETUP
@@ -14,8 +22,9 @@ st.title("🧩 LLM Prompt Evaluator using Ollama")
 # ========================
 # CREATE OLLAMA CLIENT
 # ========================
+# pooled session, timeouts, retries and circuit breaker (see Code/APP/ollama_client.py)
 try:
-    client = ollama.Client()
+    client = default_client()
 except Exception as e:
     st.error(f"❌ Could not initialize Ollama client: {e}")
     st.stop()
@@ -46,8 +55,7 @@ def query_llm_ollama(model, prompt, content):
     """Query Ollama model with a prompt and content."""
     try:
         full_input = f"### PROMPT:\n{prompt}\n\n### CONTENT:\n{content}"
-        response = client.generate(model=model, prompt=full_input)
-        return response.get("response", "").strip()
+        return client.generate(model, full_input).strip()
     except Exception as e:
         st.error(f"Error querying Ollama: {e}")
         return "Error during LLM response."
@@ -64,8 +72,7 @@ def generate_recommendation_prompt(model, original_prompt, content, answer):
             "Suggest a better version of the original prompt (50–100 words) "
             "that would yield a more accurate or detailed response."
         )
-        response = client.generate(model=model, prompt=recom_input)
-        return response.get("response", "").strip()
+        return client.generate(model, recom_input).strip()
     except Exception as e:
         st.error(f"Error generating recommended prompt: {e}")
         return "Error during recommendation prompt generation."